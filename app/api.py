@@ -1,14 +1,23 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Query
 from fastapi.middleware.cors import CORSMiddleware
-import pytesseract
-from PIL import Image
-import io
+from fastapi.responses import StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from pydantic import BaseModel, Field
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional
 import json
 import os
+import shutil
+import tempfile
 import logging
-from .genai_model import GenAIModel
+from .genai_model import ContextCache, GenAIModel, DEFAULT_BATCH_TOKEN_BUDGET
+from .services.bulk_ingest import DEFAULT_CHUNK_ROWS, FORMATS, ColumnMapping, detect_format, ingest_chunks
+from .services.carbon_service import get_carbon_calculator
+from .services.factor_vocabulary import factor_context
+from .services.history_store import HistoryStore
+from .services.rollups import PERIODS
+from .services.ocr import OCRPool, OCRPoolFull
+from .static_assets import STATIC_DIR, build_asset_bundle
 from dotenv import load_dotenv
 
 # Configure logging
@@ -26,11 +35,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+class ImmutableStaticFiles(StaticFiles):
+    """Static files whose names carry a content hash, so they can be cached forever"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+# Versioned UI stylesheets, written by build_asset_bundle at startup
+app.mount("/static", ImmutableStaticFiles(directory=STATIC_DIR, check_dir=False), name="static")
+
 # Load environment variables
 load_dotenv("env1.env")
 # Initialize GenAI Model
 API_KEY = os.getenv("GOOGLE_API_KEY")
-genai_model = GenAIModel(api_key=API_KEY)
+# Factor reference for the model: the compiled vocabulary by default, or the PDF (ECOMATE_FACTOR_CONTEXT=pdf);
+# either way it follows the fixed instructions that are cached server-side
+FACTOR_VOCABULARY, FACTOR_FILES = factor_context()
+genai_model = GenAIModel(
+    api_key=API_KEY,
+    factor_vocabulary=FACTOR_VOCABULARY,
+    factor_files=FACTOR_FILES,
+    context_cache=ContextCache()
+)
+
+@app.on_event("startup")
+def warm_start():
+    """Load the emission factor table once and share the calculator across requests"""
+    app.state.calculator = get_carbon_calculator()
+    app.state.ocr_pool = OCRPool()
+    app.state.assets = build_asset_bundle()
+    app.state.history = HistoryStore()
+
+@app.on_event("shutdown")
+def shutdown_workers():
+    app.state.ocr_pool.shutdown()
+    app.state.history.close()
+    genai_model.context_cache.clear()
 
 # Default schemas
 EMISSION_SCHEMA = {
@@ -116,43 +158,177 @@ async def analyze_receipt(file: UploadFile = File(...)):
             raise HTTPException(status_code=400, detail="File must be an image")
         
         contents = await file.read()
-        image = Image.open(io.BytesIO(contents))
         
-        # Perform OCR
+        # Perform OCR in the worker pool so the event loop stays free
         try:
-            text = pytesseract.image_to_string(image)
+            text = await app.state.ocr_pool.run(contents)
             logger.info(f"OCR extracted text: {text}")
+        except OCRPoolFull as e:
+            logger.warning(str(e))
+            raise HTTPException(status_code=503, detail="OCR service busy, retry shortly", headers={"Retry-After": "1"})
         except Exception as e:
             logger.error(f"OCR failed: {str(e)}")
             raise HTTPException(status_code=500, detail="OCR processing failed")
         
         # Process text with regex
-        activities = analyze_text(text)
+        activities = await analyze_text(text)
         
         return activities
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing receipt: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def stream_activities(text: str, user: Optional[str] = None):
+    """Yield one NDJSON line per activity as soon as the model has produced it, then add the footprint to the user's history"""
+    calculator = app.state.calculator
+    records = []
+    try:
+        async for activity in genai_model.astream_analyze_emissions(
+            text=text,
+            emission_schema=EMISSION_SCHEMA
+        ):
+            footprint = calculator.calculate_records([activity])
+            records.extend(footprint)
+            line = {"activity": activity, "footprint": footprint[0].to_dict() if footprint else None}
+            yield json.dumps(line) + "\n"
+        if user and records:
+            app.state.history.record(user, records)
+    except Exception as e:
+        logger.error(f"Error streaming text analysis: {str(e)}")
+        yield json.dumps({"error": str(e)}) + "\n"
+
 @app.post("/analyze/text")
-async def analyze_text(text: str):
-    """Process text input and extract activities using AI model"""
+async def analyze_text(text: str, stream: bool = False, user: Optional[str] = None):
+    """Process text input and extract activities using AI model; the footprint is added to the user's history when given"""
     try:
         if not text.strip():
             raise HTTPException(status_code=400, detail="Text input cannot be empty")
+
+        if stream:
+            return StreamingResponse(stream_activities(text, user), media_type="application/x-ndjson")
         
-        # Use the genai model to analyze emissions
-        result = genai_model.analyze_emissions(
+        # Use the genai model to analyze emissions without blocking the event loop
+        result = await genai_model.aanalyze_emissions(
             text=text,
-            emission_schema=EMISSION_SCHEMA,
-            context_files=[os.path.join("data", "emission_factor.pdf")]
+            emission_schema=EMISSION_SCHEMA
         )
         
-        return {"activities": result['emission_record']}
+        activities = result['emission_record']
+        records = app.state.calculator.calculate_records(activities)
+        if user and records:
+            app.state.history.record(user, records)
+        return {"activities": activities, "footprint": [record.to_dict() for record in records]}
     except Exception as e:
         logger.error(f"Error processing text: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/trends/{user}")
+async def trends(user: str, period: str = "week", periods: int = 12,
+                 category: Optional[str] = None, by_category: bool = False):
+    """Per-period footprint stats for a user, read from the history rollups"""
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"period must be one of {', '.join(PERIODS)}")
+    if not 1 <= periods <= 366:
+        raise HTTPException(status_code=400, detail="periods must be between 1 and 366")
+    try:
+        points = app.state.history.trend(user, period, periods, category=category, by_category=by_category)
+        return {
+            "user": user,
+            "period": period,
+            "points": [
+                {"period_start": point.period_start, "category": point.category, **point.stats.as_dict()}
+                for point in points
+            ],
+        }
+    except Exception as e:
+        logger.error(f"Error reading trends: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/ingest/bulk")
+def ingest_bulk(file: UploadFile = File(...),
+                input_format: Optional[str] = Query(None, alias="format"),
+                columns: List[str] = Query([], alias="map", description="COLUMN=FIELD renames"),
+                constants: List[str] = Query([], alias="set", description="FIELD=VALUE constants"),
+                chunk_rows: int = Query(DEFAULT_CHUNK_ROWS, gt=0, le=500_000)):
+    """
+    Footprint of every row of an uploaded CSV/Parquet log, streamed back as CSV.
+
+    Factors are resolved locally, without model calls, one chunk at a time;
+    a sync handler so the chunk work runs in the threadpool.
+    """
+    fmt = input_format or detect_format(file.filename)
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(FORMATS)}")
+    # The upload is closed once this handler returns, so stream from a copy we own
+    with tempfile.NamedTemporaryFile(suffix=f".{fmt}", delete=False) as copy:
+        shutil.copyfileobj(file.file, copy)
+    try:
+        mapping = ColumnMapping.parse(columns, constants)
+        chunks = ingest_chunks(copy.name, app.state.calculator, mapping, fmt, chunk_rows)
+        # Pull the first chunk now so mapping and parse errors become a 400, not a broken stream
+        first = next(chunks, None)
+    except (ValueError, ImportError) as e:
+        os.remove(copy.name)
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        os.remove(copy.name)
+        logger.error(f"Error reading bulk upload: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def body():
+        try:
+            if first is None:
+                return
+            yield first.to_csv(index=False)
+            for chunk in chunks:
+                yield chunk.to_csv(index=False, header=False)
+        finally:
+            chunks.close()
+            os.remove(copy.name)
+
+    return StreamingResponse(body(), media_type="text/csv")
+
+class BatchInput(BaseModel):
+    id: str
+    text: str
+
+class BatchAnalyzeRequest(BaseModel):
+    inputs: List[BatchInput] = Field(..., min_length=1)
+    token_budget: int = Field(DEFAULT_BATCH_TOKEN_BUDGET, gt=0)
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalyzeRequest):
+    """Analyze many texts, packing them into as few model calls as the token budget allows"""
+    try:
+        inputs = {item.id: item.text for item in request.inputs if item.text.strip()}
+        if len(inputs) != len(request.inputs):
+            raise HTTPException(status_code=400, detail="Input ids must be unique and texts non-empty")
+
+        records = await genai_model.aanalyze_emissions_batch(
+            inputs=inputs,
+            emission_schema=EMISSION_SCHEMA,
+            token_budget=request.token_budget
+        )
+
+        calculator = app.state.calculator
+        return {
+            "results": [
+                {
+                    "id": input_id,
+                    "activities": activities,
+                    "footprint": calculator.calculate_carbon_footprint(activities)
+                }
+                for input_id, activities in records.items()
+            ]
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing batch: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.post("/extract/tasks")
 async def extract_tasks(text: str):
     """Extract tasks from text using AI model"""
@@ -160,9 +336,9 @@ async def extract_tasks(text: str):
         if not text.strip():
             raise HTTPException(status_code=400, detail="Text input cannot be empty")
         
-        result = genai_model.extract_tasks(
+        result = await genai_model.aextract_tasks(
             text=text,
-            task_schema=TASK_SCHEMA
+            schema=TASK_SCHEMA
         )
         
         return result
@@ -177,7 +353,7 @@ async def generate_suggestions(text: str):
         if not text.strip():
             raise HTTPException(status_code=400, detail="Text input cannot be empty")
         
-        result = genai_model.generate_suggestions(
+        result = await genai_model.agenerate_suggestions(
             text=text,
             suggestion_schema=SUGGESTION_SCHEMA
         )
@@ -0,0 +1,32 @@
+"""
+Compile data/emission_factor.csv into the factor vocabulary embedded in prompts.
+
+The vocabulary keeps only the category/type/activity/unit keys, deduplicated,
+and is written with the table's digest so the app rebuilds it when the table
+changes. Run from the repository root:
+
+    python -m app.build_factor_vocabulary
+"""
+import argparse
+import logging
+import sys
+
+from .genai_model import estimate_tokens
+from .services.carbon_service import EMISSION_FACTOR_PATH
+from .services.factor_vocabulary import DEFAULT_VOCABULARY_PATH, build_vocabulary_file
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=EMISSION_FACTOR_PATH, help="Emission factor CSV")
+    parser.add_argument("--output", default=DEFAULT_VOCABULARY_PATH, help="Vocabulary file to write")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    vocabulary = build_vocabulary_file(args.source, args.output)
+    print(f"{len(vocabulary.splitlines())} lines, {len(vocabulary)} chars, ~{estimate_tokens(vocabulary)} tokens")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
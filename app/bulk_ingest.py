@@ -0,0 +1,49 @@
+"""
+Compute the carbon footprint of a CSV or Parquet activity log, row by row.
+
+Factors come from data/emission_factor.csv only (no model calls), and the
+file is streamed in chunks so memory stays flat however large it is.
+Run from the repository root:
+
+    python -m app.bulk_ingest fleet.csv fleet_footprint.csv \\
+        --map "Fuel=activity" --map "Litres=quantity" \\
+        --set category=Fuels --set type="Liquid fuels" --set unit=litres
+"""
+import argparse
+import json
+import logging
+import sys
+
+from .services.bulk_ingest import DEFAULT_CHUNK_ROWS, FORMATS, INGEST_FIELDS, ColumnMapping, ingest_file
+from .services.carbon_service import get_carbon_calculator
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="CSV or Parquet file to ingest")
+    parser.add_argument("destination", help="Output file; .parquet writes Parquet, anything else CSV")
+    parser.add_argument("--map", action="append", default=[], metavar="COLUMN=FIELD",
+                        help=f"Rename a source column to one of: {', '.join(INGEST_FIELDS)}")
+    parser.add_argument("--set", action="append", default=[], metavar="FIELD=VALUE",
+                        help="Use a fixed value for a field the file does not have")
+    parser.add_argument("--format", choices=FORMATS, help="Input format (default: from the file extension)")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    try:
+        mapping = ColumnMapping.parse(args.map, args.set)
+    except ValueError as e:
+        parser.error(str(e))
+
+    try:
+        stats = ingest_file(args.source, args.destination, get_carbon_calculator(), mapping,
+                            fmt=args.format, chunk_rows=args.chunk_rows)
+    except ValueError as e:
+        parser.error(str(e))
+    print(json.dumps(stats.as_dict(), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
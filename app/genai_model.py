@@ -1,76 +1,1373 @@
 import google.generativeai as genai
-from typing import Dict, Any, Optional, Union, List
+from typing import Dict, Any, Optional, Union, List, Tuple, Iterator, AsyncIterator
 import os
+import asyncio
 import json
+import time
+import hashlib
+import logging
+import re
+import sqlite3
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+# Files uploaded through the File API are deleted remotely after 48 hours.
+# Entries are dropped a little earlier so a cached handle is never stale.
+REMOTE_FILE_LIFETIME = 48 * 60 * 60
+UPLOAD_EXPIRY_MARGIN = 60 * 60
+DEFAULT_UPLOAD_INDEX = os.path.join("data", "cache", "upload_index.json")
+
+# Upper bound on model calls in flight from the async path of one GenAIModel
+DEFAULT_MAX_CONCURRENCY = 32
+# Queued after the last streamed record
+_STREAM_END = object()
+
+# Input tokens packed into one batched analysis call
+DEFAULT_BATCH_TOKEN_BUDGET = 4000
+
+# Cached prompt preambles live this long and are extended once they get
+# within the refresh margin of expiring
+DEFAULT_CONTEXT_TTL = 60 * 60
+CONTEXT_REFRESH_MARGIN = 5 * 60
+# Explicit caching rejects smaller contents (gemini-2.5-flash minimum)
+MIN_CACHED_TOKENS = 1024
+# After a failed create the preamble is sent inline for this long before retrying
+CONTEXT_RETRY_SECONDS = 10 * 60
+
+
+def file_digest(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token) used for batch packing."""
+    return len(text) // 4 + 1
+
+
+def pack_inputs(inputs: Dict[str, str], token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET) -> List[Dict[str, str]]:
+    """
+    Greedily group inputs, in order, into chunks whose estimated tokens fit the budget.
+
+    An input larger than the budget on its own gets a chunk to itself.
+    """
+    chunks: List[Dict[str, str]] = []
+    current: Dict[str, str] = {}
+    used = 0
+    for input_id, text in inputs.items():
+        cost = estimate_tokens(text)
+        if current and used + cost > token_budget:
+            chunks.append(current)
+            current, used = {}, 0
+        current[input_id] = text
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def batch_schema(schema: Dict[str, Any], records_key: str = "emission_record") -> Dict[str, Any]:
+    """Wrap a single-input response schema into one returning a record list per input id."""
+    return {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "input_id": {"type": "string"},
+                        records_key: schema["properties"][records_key]
+                    },
+                    "required": ["input_id", records_key]
+                }
+            }
+        },
+        "required": ["results"]
+    }
+
+
+class IncrementalRecordParser:
+    """
+    Incremental parser that pulls complete objects out of a streamed JSON array.
+
+    Feed it the response text chunk by chunk; every call returns the elements
+    of ``records_key`` that became complete. Each character is scanned once.
+    """
+
+    def __init__(self, records_key: str = "emission_record"):
+        self._key_pattern = re.compile(r'"%s"\s*:\s*\[' % re.escape(records_key))
+        self._buffer = ""
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._start = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        self._buffer += chunk
+        records: List[Dict[str, Any]] = []
+        if self._done:
+            return records
+        if not self._in_array:
+            match = self._key_pattern.search(self._buffer)
+            if match is None:
+                return records
+            self._in_array = True
+            self._pos = match.end()
+
+        buffer = self._buffer
+        for i in range(self._pos, len(buffer)):
+            ch = buffer[i]
+            if self._depth == 0:
+                if ch == "{":
+                    self._start = i
+                    self._depth = 1
+                elif ch == "]":
+                    self._done = True
+                    break
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    records.append(json.loads(buffer[self._start:i + 1]))
+        self._pos = len(buffer)
+        return records
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._buffer
+
+
+class LocalFile:
+    """Minimal stand-in for a remote File API handle."""
+
+    def __init__(self, name: str, display_name: str, uri: str):
+        self.name = name
+        self.display_name = display_name
+        self.uri = uri
+        self.expiration_time = None
+
+
+class LocalUploader:
+    """
+    Offline uploader exposing the same ``upload_file``/``get_file`` calls as
+    ``google.generativeai``. Useful for tests and local runs without a key.
+    """
+
+    def __init__(self):
+        self.files: Dict[str, LocalFile] = {}
+        self.upload_count = 0
+
+    def upload_file(self, path: str, display_name: Optional[str] = None) -> LocalFile:
+        self.upload_count += 1
+        name = f"files/local-{self.upload_count}"
+        handle = LocalFile(name, display_name or os.path.basename(path), f"file://{os.path.abspath(path)}")
+        self.files[name] = handle
+        return handle
+
+    def get_file(self, name: str) -> LocalFile:
+        if name not in self.files:
+            raise KeyError(f"Unknown file: {name}")
+        return self.files[name]
+
+
+class LocalCachedContent:
+    """Minimal stand-in for a ``genai.caching.CachedContent`` handle."""
+
+    def __init__(self, client: "LocalContextCacheClient", name: str, model: str, contents: List[Any], ttl: timedelta):
+        self._client = client
+        self.name = name
+        self.model = model
+        self.contents = contents
+        self.expire_time = datetime.fromtimestamp(client.clock() + ttl.total_seconds())
+
+    def update(self, *, ttl: timedelta) -> None:
+        if self.name not in self._client.contents:
+            raise KeyError(f"Unknown cached content: {self.name}")
+        self._client.update_count += 1
+        self.expire_time = datetime.fromtimestamp(self._client.clock() + ttl.total_seconds())
+
+    def delete(self) -> None:
+        self._client.delete_count += 1
+        self._client.contents.pop(self.name, None)
+
+
+class LocalContextCacheClient:
+    """
+    Offline stand-in for ``genai.caching.CachedContent`` with a controllable
+    clock, for checking how ContextCache creates, refreshes and recreates handles.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.contents: Dict[str, LocalCachedContent] = {}
+        self.create_count = 0
+        self.update_count = 0
+        self.delete_count = 0
+
+    def create(self, model: str, *, display_name: Optional[str] = None, contents: Optional[List[Any]] = None,
+               ttl: timedelta = timedelta(seconds=DEFAULT_CONTEXT_TTL)) -> LocalCachedContent:
+        self.create_count += 1
+        handle = LocalCachedContent(self, f"cachedContents/local-{self.create_count}", model, contents or [], ttl)
+        self.contents[handle.name] = handle
+        return handle
+
+    def live(self, handle: LocalCachedContent) -> bool:
+        """Whether the handle still exists and has not expired at the client's clock."""
+        return handle.name in self.contents and handle.expire_time.timestamp() > self.clock()
+
+
+class UploadCache:
+    """
+    Content-addressed cache of uploaded context files.
+
+    Files are keyed by the SHA-256 of their bytes, so an unchanged file is
+    uploaded once and its remote handle reused until shortly before the
+    remote copy expires. Concurrent requests for the same file wait on one
+    upload, made outside the lock, and expired entries are dropped as the
+    cache is used. The digest → remote name index can be persisted to disk
+    so handles also survive process restarts.
+    """
+
+    def __init__(
+        self,
+        uploader: Any = genai,
+        index_path: Optional[str] = DEFAULT_UPLOAD_INDEX,
+        ttl_seconds: float = REMOTE_FILE_LIFETIME - UPLOAD_EXPIRY_MARGIN
+    ):
+        """
+        Args:
+            uploader: Object exposing ``upload_file`` and ``get_file``
+            index_path (Optional[str]): JSON file used to persist the index, None for memory only
+            ttl_seconds (float): Maximum lifetime of a cached handle
+        """
+        self.uploader = uploader
+        self.index_path = index_path
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._handles: Dict[str, Any] = {}
+        self._index: Dict[str, Dict[str, Any]] = self._read_index()
+        # digest -> upload in progress, shared by every caller asking for that file meanwhile
+        self._inflight: Dict[str, Future] = {}
+        # path -> (mtime, size, digest), so unchanged files are not re-hashed
+        self._digests: Dict[str, Tuple[float, int, str]] = {}
+
+    def digest(self, file_path: str) -> str:
+        """Return the content digest of a file, re-hashing only when it changed on disk."""
+        stat = os.stat(file_path)
+        path = os.path.abspath(file_path)
+        known = self._digests.get(path)
+        if known is not None and known[:2] == (stat.st_mtime, stat.st_size):
+            return known[2]
+        digest = file_digest(file_path)
+        self._digests[path] = (stat.st_mtime, stat.st_size, digest)
+        return digest
+
+    def get(self, file_path: str, display_name: Optional[str] = None) -> Any:
+        """
+        Return a remote handle for the file, uploading it only on a cache miss.
+
+        Args:
+            file_path (str): Local path of the context file
+            display_name (Optional[str]): Display name used when uploading
+
+        Returns:
+            Any: Handle returned by the uploader
+        """
+        digest = self.digest(file_path)
+        now = time.time()
+        with self._lock:
+            self._evict_expired(now)
+            handle = self._handles.get(digest)
+            if handle is not None:
+                self.hits += 1
+                return handle
+            pending = self._inflight.get(digest)
+            if pending is None:
+                self._inflight[digest] = future = Future()
+            else:
+                self.hits += 1
+        if pending is not None:
+            return pending.result()
+
+        # Remote calls run outside the lock, so other files are not held up behind this one
+        try:
+            handle = self._fetch(digest, file_path, display_name, now)
+        except Exception as e:
+            with self._lock:
+                del self._inflight[digest]
+            future.set_exception(e)
+            raise
+        with self._lock:
+            del self._inflight[digest]
+        future.set_result(handle)
+        return handle
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the number of live entries."""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._index)}
+
+    def clear(self) -> None:
+        """Forget every cached handle."""
+        with self._lock:
+            self._handles.clear()
+            self._index.clear()
+            self._digests.clear()
+        self._save_index(clear=True)
+
+    def _fetch(self, digest: str, file_path: str, display_name: Optional[str], now: float) -> Any:
+        # Rehydrate a handle persisted by an earlier process, or upload the file
+        with self._lock:
+            entry = self._index.get(digest)
+        if entry is not None:
+            try:
+                handle = self.uploader.get_file(entry["name"])
+            except Exception as e:
+                logger.info(f"Cached upload {entry['name']} no longer available: {str(e)}")
+            else:
+                with self._lock:
+                    self.hits += 1
+                    self._handles[digest] = handle
+                return handle
+
+        handle = self.uploader.upload_file(
+            path=file_path,
+            display_name=display_name or os.path.basename(file_path)
+        )
+        with self._lock:
+            self.misses += 1
+            self._handles[digest] = handle
+            self._index[digest] = {
+                "name": handle.name,
+                "expires_at": self._expiry_for(handle, now)
+            }
+        self._save_index()
+        return handle
+
+    def _evict_expired(self, now: float) -> None:
+        # Called with the lock held
+        for digest in [digest for digest, entry in self._index.items() if entry["expires_at"] <= now]:
+            del self._index[digest]
+            self._handles.pop(digest, None)
+
+    def _expiry_for(self, handle: Any, now: float) -> float:
+        expires_at = now + self.ttl_seconds
+        remote_expiry = getattr(handle, "expiration_time", None)
+        if remote_expiry is not None:
+            try:
+                expires_at = min(expires_at, remote_expiry.timestamp() - UPLOAD_EXPIRY_MARGIN)
+            except (AttributeError, TypeError, ValueError):
+                pass
+        return expires_at
+
+    def _read_index(self) -> Dict[str, Dict[str, Any]]:
+        if not self.index_path or not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable upload index {self.index_path}: {str(e)}")
+            return {}
+        now = time.time()
+        return {k: v for k, v in index.items() if v.get("expires_at", 0) > now}
+
+    def _save_index(self, clear: bool = False) -> None:
+        """
+        Persist the index, merged with entries other processes wrote meanwhile.
+
+        Each write goes to its own temporary file that replaces the index in
+        one step, so concurrent writers never leave a partial file.
+        """
+        if not self.index_path:
+            return
+        with self._lock:
+            index = dict(self._index)
+        if not clear:
+            index = {**self._read_index(), **index}
+        directory = os.path.dirname(self.index_path) or "."
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(self.index_path)}.", suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(index, f)
+                os.replace(tmp_path, self.index_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            logger.warning(f"Could not persist upload index: {str(e)}")
+
+
+class ResponseCache:
+    """
+    Two-tier cache of parsed model responses.
+
+    The in-memory tier is an LRU bounded by the total size of the stored
+    JSON payloads; the optional SQLite tier keeps results across restarts.
+    With a TTL, responses older than it are misses in both tiers.
+    Values are stored serialized so callers always get a private copy.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, sqlite_path: Optional[str] = None,
+                 ttl_seconds: Optional[float] = None, clock=time.time):
+        """
+        Args:
+            max_bytes (int): Upper bound on the payload bytes held in memory
+            sqlite_path (Optional[str]): SQLite database for the on-disk tier, None to disable
+            ttl_seconds (Optional[float]): Age after which a response is no longer served, None to keep it
+            clock: Time source, replaceable in offline checks
+        """
+        self.max_bytes = max_bytes
+        self.sqlite_path = sqlite_path
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.current_bytes = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        # key -> time the response was stored
+        self._stored_at: Dict[str, float] = {}
+        self._db = None
+        if sqlite_path:
+            os.makedirs(os.path.dirname(sqlite_path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(
+        prompt: str,
+        schema: Dict[str, Any],
+        model_name: str,
+        temperature: float,
+        context_digests: Optional[List[str]] = None
+    ) -> str:
+        """Build a cache key from everything that influences the model output."""
+        normalized_prompt = re.sub(r"\s+", " ", prompt).strip()
+        payload = json.dumps(
+            {
+                "prompt": normalized_prompt,
+                "schema": schema,
+                "model": model_name,
+                "temperature": temperature,
+                "context": context_digests or []
+            },
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached response for ``key`` or None."""
+        now = self.clock()
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None and self._expired(self._stored_at[key], now):
+                self._forget(key)
+                value = None
+            if value is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                row = self._db.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    value = row[0]
+                    self._remember(key, value, row[1])
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(value)
+
+    def put(self, key: str, result: Dict[str, Any]) -> None:
+        """Store a parsed response under ``key``."""
+        value = json.dumps(result)
+        now = self.clock()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created_at) VALUES (?, ?, ?)",
+                    (key, value, now)
+                )
+                self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the in-memory footprint."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self.current_bytes
+        }
+
+    def clear(self) -> None:
+        """Drop every cached response from both tiers."""
+        with self._lock:
+            self._entries.clear()
+            self._stored_at.clear()
+            self.current_bytes = 0
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl_seconds is not None and now - stored_at >= self.ttl_seconds
+
+    def _forget(self, key: str) -> None:
+        previous = self._entries.pop(key, None)
+        self._stored_at.pop(key, None)
+        if previous is not None:
+            self.current_bytes -= len(previous)
+
+    def _remember(self, key: str, value: str, stored_at: float) -> None:
+        self._forget(key)
+        if len(value) > self.max_bytes:
+            return
+        self._entries[key] = value
+        self._stored_at[key] = stored_at
+        self.current_bytes += len(value)
+        while self.current_bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            del self._stored_at[evicted_key]
+            self.current_bytes -= len(evicted)
+
+
+class ContextCache:
+    """
+    Explicit server-side cache of fixed prompt preambles.
+
+    The instructions shared by every call of a prompt (plus its factor files)
+    are stored once as cached content and later calls send only their own
+    input, referencing the handle. Handles are keyed by model, preamble and
+    file digests, extended shortly before they expire and recreated once
+    expired. Preambles too small to cache, or whose creation failed, are
+    reported as uncached so the caller sends them inline.
+    """
+
+    def __init__(
+        self,
+        client: Any = genai.caching.CachedContent,
+        model_factory: Any = genai.GenerativeModel.from_cached_content,
+        ttl_seconds: float = DEFAULT_CONTEXT_TTL,
+        refresh_margin: float = CONTEXT_REFRESH_MARGIN,
+        min_tokens: int = MIN_CACHED_TOKENS,
+        clock=time.time
+    ):
+        """
+        Args:
+            client: Object exposing ``create(model, display_name=, contents=, ttl=)``
+                returning handles with ``name``, ``expire_time``, ``update(ttl=)`` and ``delete()``
+            model_factory: Builds a model bound to a handle
+            ttl_seconds (float): Lifetime requested for cached content
+            refresh_margin (float): Extend handles expiring within this many seconds
+            min_tokens (int): Skip file-less preambles estimated below this many tokens
+            clock: Time source, replaceable in offline checks
+        """
+        self.client = client
+        self.model_factory = model_factory
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = refresh_margin
+        self.min_tokens = min_tokens
+        self.clock = clock
+        self.hits = 0
+        self.creates = 0
+        self.refreshes = 0
+        self.failures = 0
+        self.skipped = 0
+        self._lock = threading.Lock()
+        # key -> [handle, expires_at]
+        self._entries: Dict[str, List[Any]] = {}
+        self._models: Dict[str, Any] = {}
+        self._retry_at: Dict[str, float] = {}
+        # key -> creation or refresh in flight, shared by concurrent callers
+        self._inflight: Dict[str, Future] = {}
+
+    @staticmethod
+    def make_key(model_name: str, preamble: str, file_digests: List[str]) -> str:
+        payload = json.dumps({"model": model_name, "preamble": preamble, "files": file_digests})
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, model_name: str, preamble: str, files: List[Any], file_digests: List[str]) -> Optional[Any]:
+        """
+        Return a live cached-content handle for the preamble, creating or extending it as needed.
+
+        Args:
+            model_name (str): Model the content is cached for
+            preamble (str): Fixed instruction text
+            files (List[Any]): Uploaded file handles that follow the preamble
+            file_digests (List[str]): Content digests of those files
+
+        Returns:
+            Optional[Any]: The handle, or None when the preamble should be sent inline
+        """
+        if not files and estimate_tokens(preamble) < self.min_tokens:
+            self.skipped += 1
+            return None
+        key = self.make_key(model_name, preamble, file_digests)
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now < entry[1] - self.refresh_margin:
+                self.hits += 1
+                return entry[0]
+            if now < self._retry_at.get(key, 0.0):
+                return None
+            pending = self._inflight.get(key)
+            if pending is None:
+                self._inflight[key] = future = Future()
+            else:
+                self.hits += 1
+        if pending is not None:
+            return pending.result()
+
+        # Remote calls run outside the lock, so other preambles are not held up behind this one
+        handle = None
+        try:
+            handle = self._renew(key, entry, model_name, preamble, files, now)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            future.set_result(handle)
+        return handle
+
+    def _renew(self, key: str, entry: Optional[List[Any]], model_name: str, preamble: str,
+               files: List[Any], now: float) -> Optional[Any]:
+        # Extend the handle while it is still live, otherwise create a new one
+        if entry is not None and now < entry[1]:
+            try:
+                entry[0].update(ttl=timedelta(seconds=self.ttl_seconds))
+                expires_at = self._expiry_for(entry[0], now)
+                with self._lock:
+                    entry[1] = expires_at
+                    self.refreshes += 1
+                return entry[0]
+            except Exception as e:
+                logger.info(f"Could not extend cached content {entry[0].name}, recreating it: {str(e)}")
+
+        try:
+            handle = self.client.create(
+                model=f"models/{model_name}",
+                display_name=f"ecomate-{key[:12]}",
+                contents=[preamble, *files],
+                ttl=timedelta(seconds=self.ttl_seconds)
+            )
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                self._retry_at[key] = now + CONTEXT_RETRY_SECONDS
+            logger.warning(f"Context caching unavailable, sending the preamble inline: {str(e)}")
+            return None
+        with self._lock:
+            if entry is not None:
+                self._models.pop(entry[0].name, None)
+            self.creates += 1
+            self._entries[key] = [handle, self._expiry_for(handle, now)]
+        logger.info(f"Created cached content {handle.name} for {model_name}")
+        return handle
+
+    def model(self, handle: Any) -> Any:
+        """Return a model bound to the cached content, built once per handle."""
+        model = self._models.get(handle.name)
+        if model is None:
+            model = self.model_factory(cached_content=handle)
+            self._models[handle.name] = model
+        return model
+
+    def stats(self) -> Dict[str, int]:
+        """Return lifecycle counters and the number of live handles."""
+        return {
+            "hits": self.hits,
+            "creates": self.creates,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "entries": len(self._entries)
+        }
+
+    def clear(self) -> None:
+        """Delete every cached content this process created."""
+        with self._lock:
+            for handle, _ in self._entries.values():
+                try:
+                    handle.delete()
+                except Exception as e:
+                    logger.info(f"Could not delete cached content {handle.name}: {str(e)}")
+            self._entries.clear()
+            self._models.clear()
+            self._retry_at.clear()
+
+    def _expiry_for(self, handle: Any, now: float) -> float:
+        expires_at = now + self.ttl_seconds
+        remote_expiry = getattr(handle, "expire_time", None)
+        if remote_expiry is not None:
+            try:
+                expires_at = min(expires_at, remote_expiry.timestamp())
+            except (AttributeError, TypeError, ValueError):
+                pass
+        return expires_at
+
+
+class ClauseStats:
+    """
+    Running totals of the clause-level extraction cache and fast path.
+
+    ``hits`` counts every clause answered without the model, ``fast_path``
+    the share of them extracted by the rule-based fast path.
+    ``tokens_baseline`` is what sending every input whole would have cost
+    and ``tokens_sent`` what the calls actually made cost (estimated).
+    """
+
+    def __init__(self):
+        self.inputs = 0
+        self.clauses = 0
+        self.hits = 0
+        self.fast_path = 0
+        self.calls = 0
+        self.tokens_baseline = 0
+        self.tokens_sent = 0
+        self._lock = threading.Lock()
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.clauses if self.clauses else 0.0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_baseline - self.tokens_sent
+
+    def record_input(self, clauses: int, hits: int, baseline_tokens: int, fast_path: int = 0) -> None:
+        with self._lock:
+            self.inputs += 1
+            self.clauses += clauses
+            self.hits += hits
+            self.fast_path += fast_path
+            self.tokens_baseline += baseline_tokens
+
+    def record_call(self, tokens: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.tokens_sent += tokens
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "inputs": self.inputs,
+            "clauses": self.clauses,
+            "hits": self.hits,
+            "hit_ratio": self.hit_ratio,
+            "fast_path": self.fast_path,
+            "calls": self.calls,
+            "calls_saved": self.inputs - self.calls,
+            "tokens_sent": self.tokens_sent,
+            "tokens_saved": self.tokens_saved,
+        }
+
 
 class GenAIModel:
-    def __init__(self, api_key: str, model_name: str = "gemini-2.5-flash"):
+    def __init__(
+        self,
+        api_key: str,
+        model_name: str = "gemini-2.5-flash",
+        upload_cache: Optional[UploadCache] = None,
+        response_cache: Optional[ResponseCache] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        factor_vocabulary: Optional[str] = None,
+        factor_files: Optional[List[str]] = None,
+        context_cache: Optional[ContextCache] = None,
+        clause_cache: Optional[Any] = None,
+        fast_path: Optional[Any] = None
+    ):
         """
         Initialize the GenAI model with Google's Generative AI.
         
         Args:
             api_key (str): Google API key
             model_name (str): Name of the model to use
+            upload_cache (Optional[UploadCache]): Cache for uploaded context files
+            response_cache (Optional[ResponseCache]): Cache for parsed responses
+            max_concurrency (int): Maximum number of async model calls in flight
+            factor_vocabulary (Optional[str]): Compiled category/type/activity/unit keys to embed
+                in prompts instead of attaching emission_factor.pdf
+            factor_files (Optional[List[str]]): Factor reference files attached after the prompt preamble
+            context_cache (Optional[ContextCache]): Server-side cache for the fixed preambles, None to send them inline
+            clause_cache (Optional[Any]): Per-clause record cache in front of extract_tasks, exposing
+                ``split``, ``lookup`` and ``add`` (services.clause_cache.ClauseCache)
+            fast_path (Optional[Any]): Rule-based extractor tried on each clause before the cache and the model,
+                exposing ``split`` and ``extract_clause`` (services.fast_path.FastPathExtractor)
         """
         self.api_key = api_key
         self.model_name = model_name
         genai.configure(api_key=self.api_key)
         self.model = genai.GenerativeModel(model_name=self.model_name)
+        self.upload_cache = upload_cache if upload_cache is not None else UploadCache()
+        self.response_cache = response_cache if response_cache is not None else ResponseCache()
+        self.max_concurrency = max_concurrency
+        self.factor_vocabulary = factor_vocabulary
+        self.factor_files = factor_files or []
+        self.context_cache = context_cache
+        self.clause_cache = clause_cache
+        self.fast_path = fast_path
+        self.clause_stats = ClauseStats()
+        self._async_limit: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+        # (factor_vocabulary it was built from, _shared_context result)
+        self._shared: Optional[Tuple[Optional[str], Tuple[str, Dict[str, str]]]] = None
+
+    def _cache_key(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        context_files: List[str],
+        temperature: float,
+        preamble: Optional[str] = None
+    ) -> str:
+        if preamble is not None:
+            prompt = preamble + prompt
+            context_files = self._preamble_files() + context_files
+        return ResponseCache.make_key(
+            prompt,
+            schema,
+            self.model_name,
+            temperature,
+            [self.upload_cache.digest(path) for path in context_files]
+        )
+
+    def _preamble_files(self) -> List[str]:
+        return [path for path in self.factor_files if os.path.exists(path)]
+
+    def _build_content(self, prompt: str, context_files: List[str]) -> List[Any]:
+        # Prepare the content list with prompt and the (cached) uploaded files
+        content = [prompt]
+        for file_path in context_files:
+            file_name = os.path.basename(file_path)
+            content.append(self.upload_cache.get(file_path, display_name=file_name))
+        return content
+
+    def _prepare(self, prompt: str, context_files: List[str], preamble: Optional[str] = None) -> Tuple[Any, List[Any]]:
+        """
+        Return the model to call and the content to send.
+
+        With a context cache the instructions of every task, the vocabulary
+        and the factor files are referenced through one cached content and
+        only the task line, prompt and per-call files are sent; otherwise
+        everything is sent inline, preamble first.
+        """
+        if preamble is None:
+            return self.model, self._build_content(prompt, context_files)
+        factor_files = self._preamble_files()
+        if self.context_cache is not None:
+            shared, selectors = self._shared_context()
+            selector = selectors.get(preamble)
+            cached_preamble, prompt_prefix = (shared, selector) if selector is not None else (preamble, "")
+            handle = self.context_cache.get(
+                self.model_name,
+                cached_preamble,
+                self._build_content(cached_preamble, factor_files)[1:],
+                [self.upload_cache.digest(path) for path in factor_files]
+            )
+            if handle is not None:
+                return self.context_cache.model(handle), self._build_content(prompt_prefix + prompt, context_files)
+        return self.model, self._build_content(preamble + prompt, factor_files + context_files)
+
+    @staticmethod
+    def _generation_config(schema: Dict[str, Any], temperature: float) -> Any:
+        return genai.GenerationConfig(
+            temperature=temperature,
+            response_mime_type="application/json",
+            response_schema=schema
+        )
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # Semaphores belong to one event loop; rebuild it if the loop changed
+        loop = asyncio.get_running_loop()
+        if self._async_limit is None or self._async_limit[0] is not loop:
+            self._async_limit = (loop, asyncio.Semaphore(self.max_concurrency))
+        return self._async_limit[1]
         
     def generate_content(
         self,
         prompt: str,
         schema: Dict[str, Any],
         context_files: Optional[List[str]] = None,
-        temperature: float = 0.0
+        temperature: float = 0.0,
+        preamble: Optional[str] = None
     ) -> Dict[str, Any]:
 
         try:
-            # Prepare the content list with prompt
-            content = [prompt]
-            
-            # Add context files if provided
-            if context_files:
-                for file_path in context_files:
-                    if os.path.exists(file_path):
-                        file_name = os.path.basename(file_path)
-                        file_content = genai.upload_file(path=file_path, display_name=file_name)
-                        content.append(file_content)
+            existing_files = [path for path in (context_files or []) if os.path.exists(path)]
+
+            # Serve repeated requests from the response cache
+            cache_key = self._cache_key(prompt, schema, existing_files, temperature, preamble)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            model, content = self._prepare(prompt, existing_files, preamble)
             
             # Generate response
-            response = self.model.generate_content(
+            response = model.generate_content(
                 content,
-                generation_config=genai.GenerationConfig(
-                    temperature=temperature,
-                    response_mime_type="application/json",
-                    response_schema=schema
-                )
+                generation_config=self._generation_config(schema, temperature)
             )
-            print(json.loads(response.text))
             # Parse and return the response
-            return json.loads(response.text)
+            result = json.loads(response.text)
+            logger.debug(f"Model response: {result}")
+            self.response_cache.put(cache_key, result)
+            return result
             
         except Exception as e:
             raise Exception(f"Error in content generation: {str(e)}")
-            
-    def extract_tasks(self, text: str, schema: Dict[str, Any],context_files: Optional[List[str]] = None) -> Dict[str, Any]:
-        prompt = f'''
+
+    async def agenerate_content(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        context_files: Optional[List[str]] = None,
+        temperature: float = 0.0,
+        preamble: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Async counterpart of ``generate_content`` that never blocks the event loop.
+
+        Model calls go through the SDK's async client and are bounded by
+        ``max_concurrency``; file hashing and uploads run in a worker thread.
+        """
+        try:
+            existing_files = [path for path in (context_files or []) if os.path.exists(path)]
+
+            cache_key = await asyncio.to_thread(self._cache_key, prompt, schema, existing_files, temperature, preamble)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+            model, content = await asyncio.to_thread(self._prepare, prompt, existing_files, preamble)
+
+            async with self._semaphore():
+                response = await model.generate_content_async(
+                    content,
+                    generation_config=self._generation_config(schema, temperature)
+                )
+            result = json.loads(response.text)
+            logger.debug(f"Model response: {result}")
+            self.response_cache.put(cache_key, result)
+            return result
+
+        except Exception as e:
+            raise Exception(f"Error in content generation: {str(e)}")
+
+    def stream_records(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        context_files: Optional[List[str]] = None,
+        temperature: float = 0.0,
+        records_key: str = "emission_record",
+        preamble: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the elements of ``records_key`` as soon as each one is complete.
+
+        Uses the SDK's streamed generation; the full response is cached at the
+        end, so a repeated request replays from the response cache.
+        """
+        try:
+            existing_files = [path for path in (context_files or []) if os.path.exists(path)]
+            cache_key = self._cache_key(prompt, schema, existing_files, temperature, preamble)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield from cached.get(records_key, [])
+                return
+
+            parser = IncrementalRecordParser(records_key)
+            model, content = self._prepare(prompt, existing_files, preamble)
+            response = model.generate_content(
+                content,
+                generation_config=self._generation_config(schema, temperature),
+                stream=True
+            )
+            for chunk in response:
+                yield from parser.feed(chunk.text)
+            self.response_cache.put(cache_key, json.loads(parser.text))
+
+        except Exception as e:
+            raise Exception(f"Error in content generation: {str(e)}")
+
+    async def astream_records(
+        self,
+        prompt: str,
+        schema: Dict[str, Any],
+        context_files: Optional[List[str]] = None,
+        temperature: float = 0.0,
+        records_key: str = "emission_record",
+        preamble: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of ``stream_records``."""
+        try:
+            existing_files = [path for path in (context_files or []) if os.path.exists(path)]
+            cache_key = await asyncio.to_thread(self._cache_key, prompt, schema, existing_files, temperature, preamble)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                for record in cached.get(records_key, []):
+                    yield record
+                return
+
+            model, content = await asyncio.to_thread(self._prepare, prompt, existing_files, preamble)
+            parser = IncrementalRecordParser(records_key)
+            records: asyncio.Queue = asyncio.Queue()
+
+            async def read_stream() -> None:
+                # Holds a concurrency slot only while the model streams, not while the consumer reads
+                async with self._semaphore():
+                    response = await model.generate_content_async(
+                        content,
+                        generation_config=self._generation_config(schema, temperature),
+                        stream=True
+                    )
+                    async for chunk in response:
+                        for record in parser.feed(chunk.text):
+                            records.put_nowait(record)
+
+            reader = asyncio.create_task(read_stream())
+            reader.add_done_callback(lambda _: records.put_nowait(_STREAM_END))
+            try:
+                while (record := await records.get()) is not _STREAM_END:
+                    yield record
+                await reader
+            finally:
+                reader.cancel()
+            self.response_cache.put(cache_key, json.loads(parser.text))
+
+        except Exception as e:
+            raise Exception(f"Error in content generation: {str(e)}")
+
+    def _factor_source(self) -> str:
+        # How the prompts refer to the factor reference the model should match against
+        return "factor vocabulary below" if self.factor_vocabulary else "emission pdf file provided"
+
+    def _factor_vocabulary_section(self) -> str:
+        if not self.factor_vocabulary:
+            return ""
+        return f'''
+Factor vocabulary (category > type: activities [units]):
+{self.factor_vocabulary}
+'''
+
+    def _shared_context(self) -> Tuple[str, Dict[str, str]]:
+        """
+        Return the preamble cached for every task and, per task preamble, the line that selects it.
+
+        Each task's preamble alone is smaller than the API's minimum cacheable
+        size in vocabulary mode, so the instructions of all tasks and the
+        vocabulary are cached as one prefix and each call names its task.
+        Built once, and again only if the vocabulary is replaced.
+        """
+        if self._shared is not None and self._shared[0] is self.factor_vocabulary:
+            return self._shared[1]
+        # Task -> (preamble sent inline, its section of the shared preamble)
+        tasks = {
+            "extract_tasks": (self._extract_tasks_instructions(), self._extract_tasks_instructions(vocabulary=False)),
+            "extract_tasks_clause": (self._extract_tasks_clause_instructions(),
+                                     f"As extract_tasks, for one clause of a description.\n{self._extract_tasks_clause_rules()}"),
+            "extract_tasks_batch": (self._extract_tasks_batch_instructions(),
+                                    f"As extract_tasks, for clauses of a description.\n{self._extract_tasks_batch_rules()}"),
+            "extract_entities": (self._extract_entities_instructions(), self._extract_entities_instructions(vocabulary=False)),
+            "analyze_emissions": (self._analyze_emissions_instructions(), self._analyze_emissions_instructions(vocabulary=False)),
+            "analyze_emissions_batch": (self._analyze_emissions_batch_instructions(),
+                                        f"As analyze_emissions, for several inputs.\n{self._analyze_emissions_batch_rules()}"),
+        }
+        sections = "\n".join(f"Task: {task}\n{section.strip()}\n" for task, (_, section) in tasks.items())
+        shared = f'''Every request starts with a "Task:" line naming one of the tasks below; follow the instructions of that task.
+
+{sections}{self._factor_vocabulary_section()}'''
+        selectors = {inline: f"Task: {task}\n" for task, (inline, _) in tasks.items()}
+        self._shared = (self.factor_vocabulary, (shared, selectors))
+        return self._shared[1]
+
+    def _extract_tasks_instructions(self, vocabulary: bool = True) -> str:
+        if self.factor_vocabulary:
+            attachments = "If you are provided any image or doc, use it to extract text from it and use that as your input source text."
+            factor_rule = "co2e_per_unit: Best estimate in kg CO2e per unit; factors of activities in the vocabulary are filled in locally."
+        else:
+            attachments = "If you are provided any image or doc other than emission_factor.pdf, use it to extract text from it and use that as your input source text."
+            factor_rule = "co2e_per_unit: Extract co2e_per_unit basis pdf emission file provided. If not in file, give best estimate."
+        return f'''
         You are a smart carbon emission expert who will give the below details from the daily task of a person.
         Extract tasks and relevant information from the following text. 
-        If you are provided any image or doc other than emission_factor.pdf, use it to extract text from it and use that as your input source text.
+        {attachments}
         
         Return the information in a structured format according to the provided schema and below description.
-        category,type,activity as best match from emission pdf file provided. If not found give closest result for these attributes.
+        category,type,activity as best match from the {self._factor_source()}. If not found give closest result for these attributes.
         quantity: Amount or quantity of activity extracted. If not found, then give normalized quantity by default.
         unit: S.I. unit of the task
-        co2e_per_unit: Extract co2e_per_unit basis pdf emission file provided. If not in file, give best estimate.
+        {factor_rule}
         co2e_impact_level: strictly categorize into the following 4 category: (LOW),(MEDIUM),(HIGH),(VERY HIGH) based on category. If not able to identify, then give LOW by default.
         suggestion: according to the co2e_impact_level, give a suggestion for an alternative task with low co2 impact.
-        
-        InputText: {text}
+        {self._factor_vocabulary_section() if vocabulary else ""}
         '''
-        return self.generate_content(prompt, schema,context_files=context_files)
-        
+
+    @staticmethod
+    def _input_text_prompt(text: str) -> str:
+        return f'''InputText: {text}
+'''
+            
+    def extract_tasks(self, text: str, schema: Dict[str, Any], context_files: Optional[List[str]] = None,
+                      by_clause: bool = True) -> Dict[str, Any]:
+        """
+        Extract emission records from a description of someone's day.
+
+        With a fast path or clause cache and no attachments the text is split
+        into activity clauses. Formulaic clauses ("drove 20 km in a small
+        car") are extracted by the rule-based fast path, clauses seen before
+        (or near duplicates of them) reuse their cached records, and only the
+        rest are sent to the model, together in one batched call. Records
+        come back in clause order. Text that is not a description of a day,
+        such as OCR'd receipts, should pass ``by_clause=False`` to be
+        extracted whole.
+        """
+        clauses, cached, fast = self._plan_clauses(text, context_files, by_clause)
+        if not clauses:
+            return self.generate_content(self._input_text_prompt(text), schema, context_files=context_files,
+                                         preamble=self._extract_tasks_instructions())
+        fresh = self._extract_clauses(text, self._missing_clauses(clauses, cached), schema)
+        return self._merge_clauses(text, clauses, cached, fresh, fast)
+
+    async def aextract_tasks(self, text: str, schema: Dict[str, Any], context_files: Optional[List[str]] = None,
+                             by_clause: bool = True) -> Dict[str, Any]:
+        """Async counterpart of ``extract_tasks``."""
+        clauses, cached, fast = self._plan_clauses(text, context_files, by_clause)
+        if not clauses:
+            return await self.agenerate_content(self._input_text_prompt(text), schema, context_files=context_files,
+                                                preamble=self._extract_tasks_instructions())
+        fresh = await self._aextract_clauses(text, self._missing_clauses(clauses, cached), schema)
+        return self._merge_clauses(text, clauses, cached, fresh, fast)
+
+    @staticmethod
+    def _extract_tasks_clause_rules() -> str:
+        return '''The input is a Description followed by one activity clause of it as InputText.
+Return the emission_record list of the activities that clause names (empty if it names none).
+Read the clause in the context of the whole description: a quantity, vehicle or fuel given elsewhere in it applies to the clause it belongs to. Only fall back to a default quantity when the description gives none.
+'''
+
+    def _extract_tasks_clause_instructions(self) -> str:
+        return self._extract_tasks_instructions() + self._extract_tasks_clause_rules()
+
+    @staticmethod
+    def _extract_tasks_batch_rules() -> str:
+        return '''The input is a Description followed by activity clauses of it, each tagged with an input_id.
+Return exactly one entry per input_id in results, with the emission_record list of the activities that clause names (empty if it names none).
+Read each clause in the context of the whole description: a quantity, vehicle or fuel given elsewhere in it applies to the clause it belongs to. Only fall back to a default quantity when the description gives none.
+'''
+
+    def _extract_tasks_batch_instructions(self) -> str:
+        return self._extract_tasks_instructions() + self._extract_tasks_batch_rules()
+
+    @staticmethod
+    def _extract_tasks_batch_prompt(text: str, clauses: Dict[str, str]) -> str:
+        sources = "\n".join(f"[input_id: {clause_id}] {clause}" for clause_id, clause in clauses.items())
+        return f'''Description: {text}
+
+{sources}
+'''
+
+    def _clause_request(self, text: str, clauses: Dict[str, str], schema: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        # One clause is asked for with the plain schema, so its answer cannot miss an input id;
+        # several go in one batch with their description
+        if len(clauses) > 1:
+            return self._extract_tasks_batch_instructions(), self._extract_tasks_batch_prompt(text, clauses), batch_schema(schema)
+        clause = next(iter(clauses.values()))
+        if clause == text.strip():
+            return self._extract_tasks_instructions(), self._input_text_prompt(text), schema
+        return self._extract_tasks_clause_instructions(), f"Description: {text}\n\n{self._input_text_prompt(clause)}", schema
+
+    @staticmethod
+    def _clause_records(clauses: Dict[str, str], result: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        if len(clauses) == 1:
+            return {next(iter(clauses)): result.get("emission_record", [])}
+        return {str(item.get("input_id")): item.get("emission_record", []) for item in result.get("results", [])}
+
+    def _extract_clauses(self, text: str, clauses: Dict[str, str], schema: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        """Records per clause id for the clauses missing from the cache, in one call where possible."""
+        if not clauses:
+            return {}
+        preamble, prompt, request_schema = self._clause_request(text, clauses, schema)
+        try:
+            result = self.generate_content(prompt, request_schema, preamble=preamble)
+            records = self._clause_records(clauses, result)
+        except Exception as e:
+            if len(clauses) == 1:
+                raise
+            logger.warning(f"Batched extraction of {len(clauses)} clauses failed, sending them one by one: {str(e)}")
+            records = {}
+        else:
+            # Only calls that answered count, so a failed batch and its retries are not both billed
+            self.clause_stats.record_call(estimate_tokens(preamble + prompt))
+        # Single-clause calls always cover their clause, so this recurses at most one level
+        for clause_id in [clause_id for clause_id in clauses if clause_id not in records]:
+            records.update(self._extract_clauses(text, {clause_id: clauses[clause_id]}, schema))
+        return records
+
+    async def _aextract_clauses(self, text: str, clauses: Dict[str, str], schema: Dict[str, Any]) -> Dict[str, List[Dict[str, Any]]]:
+        if not clauses:
+            return {}
+        preamble, prompt, request_schema = self._clause_request(text, clauses, schema)
+        try:
+            result = await self.agenerate_content(prompt, request_schema, preamble=preamble)
+            records = self._clause_records(clauses, result)
+        except Exception as e:
+            if len(clauses) == 1:
+                raise
+            logger.warning(f"Batched extraction of {len(clauses)} clauses failed, sending them one by one: {str(e)}")
+            records = {}
+        else:
+            self.clause_stats.record_call(estimate_tokens(preamble + prompt))
+        uncovered = [clause_id for clause_id in clauses if clause_id not in records]
+        for retried in await asyncio.gather(*(
+            self._aextract_clauses(text, {clause_id: clauses[clause_id]}, schema) for clause_id in uncovered
+        )):
+            records.update(retried)
+        return records
+
+    def _plan_clauses(self, text: str, context_files: Optional[List[str]],
+                      by_clause: bool = True) -> Tuple[List[str], List[Any], int]:
+        """Split the text and answer what can be answered locally: (clauses, records or None, fast path hits)."""
+        # Attachments may carry the activities themselves, so those inputs bypass the local paths
+        splitter = self.fast_path or self.clause_cache
+        if splitter is None or context_files or not by_clause:
+            return [], [], 0
+        clauses = splitter.split(text)
+        cached, fast = [], 0
+        for clause in clauses:
+            records = self.fast_path.extract_clause(clause) if self.fast_path is not None else None
+            if records is not None:
+                fast += 1
+            elif self.clause_cache is not None:
+                records = self.clause_cache.lookup(clause)
+            cached.append(records)
+        return clauses, cached, fast
+
+    @staticmethod
+    def _missing_clauses(clauses: List[str], cached: List[Any]) -> Dict[str, str]:
+        # Clause ids are positions, so fresh records can be put back in order
+        return {str(i): clause for i, (clause, records) in enumerate(zip(clauses, cached)) if records is None}
+
+    def _merge_clauses(
+        self,
+        text: str,
+        clauses: List[str],
+        cached: List[Any],
+        fresh: Dict[str, List[Dict[str, Any]]],
+        fast: int = 0
+    ) -> Dict[str, Any]:
+        # Local and freshly extracted records, in clause order
+        records: List[Dict[str, Any]] = []
+        for i, (clause, records_of_clause) in enumerate(zip(clauses, cached)):
+            if records_of_clause is None:
+                records_of_clause = fresh[str(i)]
+                if self.clause_cache is not None:
+                    self.clause_cache.add(clause, records_of_clause)
+            records.extend(records_of_clause)
+        self.clause_stats.record_input(
+            len(clauses),
+            len(clauses) - len(fresh),
+            estimate_tokens(self._extract_tasks_instructions() + self._input_text_prompt(text)),
+            fast
+        )
+        return {"emission_record": records}
+
+    def _extract_entities_instructions(self, vocabulary: bool = True) -> str:
+        reference = "factor vocabulary" if self.factor_vocabulary else "emission factor file"
+        return f'''Extract every carbon-emitting activity (food, travel, energy, fuel use) from the text below.
+For each one give category, type and activity as the closest match from the {reference}, plus quantity and unit.
+Do not estimate emission factors.
+{self._factor_vocabulary_section() if vocabulary else ""}
+'''
+
+    def extract_entities(self, text: str, schema: Dict[str, Any], context_files: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Extract activity entities only; emission factors are resolved locally by CarbonCalculator.
+
+        Args:
+            text (str): Input text describing activities
+            schema (Dict[str, Any]): Schema with category, type, activity, quantity and unit fields
+            context_files (Optional[List[str]]): Files to attach to the prompt
+
+        Returns:
+            Dict[str, Any]: Extracted entities based on the schema
+        """
+        return self.generate_content(self._input_text_prompt(text), schema, context_files=context_files,
+                                     preamble=self._extract_entities_instructions())
+
+    async def aextract_entities(self, text: str, schema: Dict[str, Any], context_files: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Async counterpart of ``extract_entities``."""
+        return await self.agenerate_content(self._input_text_prompt(text), schema, context_files=context_files,
+                                            preamble=self._extract_entities_instructions())
+
+    @staticmethod
+    def _analyze_emissions_prompt(text: str) -> str:
+        return f'''Input source_text: {text}
+'''
+
+    @staticmethod
+    def _analyze_emissions_batch_rules() -> str:
+        return '''The inputs are independent descriptions, each tagged with an input_id.
+Analyze each one separately and return exactly one entry per input_id in results, with that input's own emission_record list (empty if it has none).
+'''
+
+    def _analyze_emissions_batch_instructions(self) -> str:
+        return self._analyze_emissions_instructions() + self._analyze_emissions_batch_rules()
+
+    @staticmethod
+    def _analyze_emissions_batch_prompt(inputs: Dict[str, str]) -> str:
+        sources = "\n\n".join(f"[input_id: {input_id}]\n{text}" for input_id, text in inputs.items())
+        return f'''{sources}
+'''
+
+    def _analyze_emissions_instructions(self, vocabulary: bool = True) -> str:
+        # Fixed for the life of the model, so it can be cached server-side as the preamble
+        if self.factor_vocabulary:
+            source_rule = "The category,activity,type must be closest from the factor vocabulary below. Give best estimate of the fields if you are not able to find it in the vocabulary."
+        else:
+            source_rule = "The category,activity,type must be closest from the emission files provided to you below. Give best estimate of the fields if you are not able to find it in the pdf emission file provided."
+        return f'''You are a smart assistant helping calculate carbon emissions from user activities.
+
+Given a natural language input describing someone's day, extract all relevant real-world activities that produce carbon emissions — such as food consumption, travel, and energy usage.
+Your goal is to extract at least one activity per applicable category (Food, Transport, Energy), if mentioned.
+Return a list of structured JSON objects according to the provided schema.
+
+Be strict:
+Only include activities directly related to carbon-emitting actions
+If the text mentions more than one activity, include each, even from different categories
+{source_rule}
+{self._factor_vocabulary_section() if vocabulary else ""}'''
 
     def analyze_emissions(self, text: str, emission_schema: Dict[str, Any], context_files: Optional[List[str]] = None) -> Dict[str, Any]:
         """
@@ -84,17 +1381,108 @@ class GenAIModel:
         Returns:
             Dict[str, Any]: Emission analysis results based on the schema
         """
-        prompt = f'''You are a smart assistant helping calculate carbon emissions from user activities.
+        return self.generate_content(self._analyze_emissions_prompt(text), emission_schema, context_files,
+                                     preamble=self._analyze_emissions_instructions())
 
-Given a natural language input describing someone's day, extract all relevant real-world activities that produce carbon emissions — such as food consumption, travel, and energy usage.
-Your goal is to extract at least one activity per applicable category (Food, Transport, Energy), if mentioned.
-Return a list of structured JSON objects according to the provided schema.
+    async def aanalyze_emissions(self, text: str, emission_schema: Dict[str, Any], context_files: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Async counterpart of ``analyze_emissions``."""
+        return await self.agenerate_content(self._analyze_emissions_prompt(text), emission_schema, context_files,
+                                            preamble=self._analyze_emissions_instructions())
 
-Be strict:
-Only include activities directly related to carbon-emitting actions
-If the text mentions more than one activity, include each, even from different categories
-The category,activity,type must be closest from the emission files provided to you below. Give best estimate of the fields if you are not able to find it in the pdf emission file provided.
+    def stream_analyze_emissions(self, text: str, emission_schema: Dict[str, Any], context_files: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield emission records for the text as the model produces them."""
+        return self.stream_records(self._analyze_emissions_prompt(text), emission_schema, context_files,
+                                   preamble=self._analyze_emissions_instructions())
+
+    def astream_analyze_emissions(self, text: str, emission_schema: Dict[str, Any], context_files: Optional[List[str]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Async counterpart of ``stream_analyze_emissions``."""
+        return self.astream_records(self._analyze_emissions_prompt(text), emission_schema, context_files,
+                                    preamble=self._analyze_emissions_instructions())
+
+    async def aanalyze_emissions_batch(
+        self,
+        inputs: Dict[str, str],
+        emission_schema: Dict[str, Any],
+        context_files: Optional[List[str]] = None,
+        token_budget: int = DEFAULT_BATCH_TOKEN_BUDGET
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Analyze many independent inputs with as few model calls as the token budget allows.
+
+        Inputs are packed into chunks under ``token_budget`` and the chunks run
+        concurrently. A chunk whose response fails or misses some inputs is
+        split in half and retried, down to single-input calls.
+
+        Args:
+            inputs (Dict[str, str]): Input id -> text describing activities
+            emission_schema (Dict[str, Any]): Single-input schema with an emission_record array
+            context_files (Optional[List[str]]): List of emission factor files
+            token_budget (int): Estimated input tokens per model call
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: Input id -> emission records
+        """
+        schema = batch_schema(emission_schema)
+        chunk_results = await asyncio.gather(*(
+            self._aanalyze_chunk(chunk, emission_schema, schema, context_files)
+            for chunk in pack_inputs(inputs, token_budget)
+        ))
+        merged: Dict[str, List[Dict[str, Any]]] = {}
+        for result in chunk_results:
+            merged.update(result)
+        return {input_id: merged[input_id] for input_id in inputs}
+
+    async def _aanalyze_chunk(
+        self,
+        chunk: Dict[str, str],
+        emission_schema: Dict[str, Any],
+        schema: Dict[str, Any],
+        context_files: Optional[List[str]]
+    ) -> Dict[str, List[Dict[str, Any]]]:
+        if len(chunk) == 1:
+            [(input_id, text)] = chunk.items()
+            result = await self.aanalyze_emissions(text, emission_schema, context_files)
+            return {input_id: result.get("emission_record", [])}
+
+        try:
+            result = await self.agenerate_content(self._analyze_emissions_batch_prompt(chunk), schema, context_files,
+                                                  preamble=self._analyze_emissions_batch_instructions())
+            records = {str(item.get("input_id")): item.get("emission_record", []) for item in result.get("results", [])}
+            if all(input_id in records for input_id in chunk):
+                return {input_id: records[input_id] for input_id in chunk}
+            logger.warning(f"Batch response covered {len(records)} of {len(chunk)} inputs, splitting")
+        except Exception as e:
+            logger.warning(f"Batch of {len(chunk)} inputs failed, splitting: {str(e)}")
+
+        ids = list(chunk)
+        halves = [{i: chunk[i] for i in ids[:len(ids) // 2]}, {i: chunk[i] for i in ids[len(ids) // 2:]}]
+        left, right = await asyncio.gather(*(
+            self._aanalyze_chunk(half, emission_schema, schema, context_files) for half in halves
+        ))
+        return {**left, **right}
+
+    @staticmethod
+    def _suggestions_prompt(text: str) -> str:
+        return f'''You are a sustainability coach.
+Suggest practical, lower-carbon alternatives for the activities described below.
+Keep every suggestion short and specific to the activities mentioned.
 
 Input source_text: {text}
 '''
-        return self.generate_content(prompt, emission_schema, context_files) 
\ No newline at end of file
+
+    def generate_suggestions(self, text: str, suggestion_schema: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Generate sustainability suggestions for activities described in the text.
+
+        Args:
+            text (str): Input text describing activities
+            suggestion_schema (Dict[str, Any]): Schema for the suggestions
+
+        Returns:
+            Dict[str, Any]: Suggestions based on the schema
+        """
+        return self.generate_content(self._suggestions_prompt(text), suggestion_schema)
+
+    async def agenerate_suggestions(self, text: str, suggestion_schema: Dict[str, Any]) -> Dict[str, Any]:
+        """Async counterpart of ``generate_suggestions``."""
+        return await self.agenerate_content(self._suggestions_prompt(text), suggestion_schema)
@@ -3,20 +3,80 @@ import pandas as pd
 import plotly.express as px
 from PIL import Image
 import io
+import functools
 import json
+import logging
 import os
+import re
+import uuid
 from dotenv import load_dotenv
-from genai_model import GenAIModel  # Import the GenAI model directly
-import pytesseract
+from genai_model import ContextCache, GenAIModel  # Import the GenAI model directly
+from services.activity_record import ActivityRecord
+from services.carbon_service import get_carbon_calculator
+from services.clause_cache import ClauseCache
+from services.factor_vocabulary import factor_context
+from services.fast_path import FastPathExtractor
+from services.history_store import HistoryStore, analysis_digest
+from services.receipt_store import ReceiptStore
+from services.results_view import ResultsView, build_results_view, co2e_equivalents
+from services.ocr import DEFAULT_CONFIDENCE_THRESHOLD, TierStats, ocr_with_confidence
+from static_assets import AssetBundle, build_asset_bundle
+import time
 import google.generativeai as genai
 import streamlit.components.v1 as components
-from typing import Dict, Any, Optional, Union, List
-# Load environment variables
-load_dotenv("env1.env")
+from typing import Dict, Any, Optional, Union, List, Tuple
 
-# Initialize GenAI Model
-API_KEY = os.getenv("GOOGLE_API_KEY")
-genai_model = GenAIModel(api_key=API_KEY)
+logger = logging.getLogger(__name__)
+
+@st.cache_resource
+def get_genai_model() -> GenAIModel:
+    """Model client and its caches, built once per process rather than on every rerun"""
+    # Load environment variables
+    load_dotenv("env1.env")
+    vocabulary, factor_files = factor_context()
+    return GenAIModel(
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        factor_vocabulary=vocabulary,
+        factor_files=factor_files,
+        context_cache=ContextCache(),
+        clause_cache=ClauseCache(),
+        fast_path=FastPathExtractor()
+    )
+
+@st.cache_resource
+def get_asset_bundle() -> AssetBundle:
+    """Versioned stylesheet bundle, built once per process; linked when ECOMATE_ASSET_URL is set"""
+    load_dotenv("env1.env")
+    return build_asset_bundle()
+
+def stylesheet(name: str) -> str:
+    """Markup applying one of the bundle's section stylesheets"""
+    return get_asset_bundle().stylesheet(name)
+
+# st.fragment (Streamlit 1.37+) reruns a section on its own when a widget inside it changes
+fragment = st.fragment
+
+def record_section_timing(name: str, elapsed_ms: float):
+    """Keep per-section render timings in session state"""
+    timings = st.session_state.setdefault("section_timings", {})
+    stats = timings.setdefault(name, {"runs": 0, "last_ms": 0.0, "total_ms": 0.0})
+    stats["runs"] += 1
+    stats["last_ms"] = elapsed_ms
+    stats["total_ms"] += elapsed_ms
+    logger.debug(f"Rendered {name} in {elapsed_ms:.1f} ms")
+
+def results_section(name: str):
+    """Render a results section as its own fragment and time each run"""
+    def decorate(render):
+        @functools.wraps(render)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return render(*args, **kwargs)
+            finally:
+                record_section_timing(name, (time.perf_counter() - start) * 1000)
+        return fragment(timed)
+    return decorate
 
 # Define schemas (moved from api.py)
 EMISSION_SCHEMA = {
@@ -50,185 +110,108 @@ st.set_page_config(
     layout="wide"
 )
 
-# Custom CSS
-st.markdown("""
-    <style>
-        /* Global background and text color fixes */
-        .stApp {
-            background-color: #1E1E1E !important;
-        }
-        .main .block-container {
-            background-color: #1E1E1E !important;
-            padding-top: 2rem;
-        }
-        /* Ensure form labels are visible */
-        .stForm label {
-            color: #FFFFFF !important;
-        }
-        /* Ensure error messages are visible */
-        .stAlert {
-            color: #FFFFFF !important;
-        }
-        
-        @keyframes fadeIn {
-            from { opacity: 0; transform: translateY(20px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-        @keyframes float {
-            0% { transform: translateY(0px); }
-            50% { transform: translateY(-10px); }
-            100% { transform: translateY(0px); }
-        }
-        @keyframes pulse {
-            0% { transform: scale(1); }
-            50% { transform: scale(1.05); }
-            100% { transform: scale(1); }
-        }
-        
-        .welcome-section {
-            padding: 8rem 2rem;
-            background: linear-gradient(135deg, #1B5E20 0%, #2E7D32 100%);
-            border-radius: 20px;
-            margin: 2rem 0;
-            box-shadow: 0 8px 16px rgba(0, 0, 0, 0.1);
-            color: white;
-            text-align: center;
-            position: relative;
-            overflow: hidden;
-        }
-        .welcome-section::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: url('data:image/svg+xml,<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 100 100"><path fill="rgba(255,255,255,0.1)" d="M0,0 L100,0 L100,100 L0,100 Z"/></svg>');
-            opacity: 0.1;
-            animation: pulse 4s infinite;
-        }
-        .main-title {
-            font-size: 4.5rem;
-            font-weight: 800;
-            color: white;
-            margin-bottom: 1rem;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.2);
-            letter-spacing: 1px;
-            animation: fadeIn 1s ease-out;
-        }
-        .slogan {
-            font-size: 2.2rem;
-            color: #E8F5E9;
-            font-weight: 500;
-            margin-bottom: 3rem;
-            letter-spacing: 1px;
-            text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.1);
-            animation: fadeIn 1s ease-out 0.3s;
-        }
-        .eco-icon {
-            font-size: 4rem;
-            margin-bottom: 1.5rem;
-            text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.2);
-            animation: float 3s ease-in-out infinite;
-        }
-        .input-container {
-            max-width: 500px;
-            margin: 0 auto;
-            padding: 2rem;
-            animation: fadeIn 1s ease-out 0.6s;
-        }
-        .stTextInput > div > div > input {
-            border: 2px solid rgba(255, 255, 255, 0.2) !important;
-            border-radius: 12px !important;
-            padding: 1rem 1.5rem !important;
-            font-size: 1.2rem !important;
-            transition: all 0.3s ease;
-            background-color: rgba(45, 45, 45, 0.9) !important;
-            color: #FFFFFF !important;
-            backdrop-filter: blur(5px);
-        }
-        .stTextInput > div > div > input:focus {
-            border-color: #E8F5E9 !important;
-            box-shadow: 0 0 0 3px rgba(232, 245, 233, 0.3) !important;
-            background-color: rgba(45, 45, 45, 0.95) !important;
-            color: #FFFFFF !important;
-        }
-        .stTextInput > div > div > input::placeholder {
-            color: rgba(255, 255, 255, 0.7) !important;
-        }
-        .stTextInput > div > div > label {
-            font-size: 1.1rem !important;
-            color: #E8F5E9 !important;
-            font-weight: 500 !important;
-        }
-        .stButton > button {
-            width: 100%;
-            margin: 1.5rem auto 0;
-            display: block;
-            background-color: #E8F5E9 !important;
-            color: #1B5E20 !important;
-            border: none !important;
-            padding: 1rem 2rem !important;
-            border-radius: 12px !important;
-            font-size: 1.2rem !important;
-            font-weight: 600 !important;
-            transition: all 0.3s ease;
-            text-transform: uppercase !important;
-            letter-spacing: 1px !important;
-            animation: fadeIn 1s ease-out 0.9s;
-        }
-        .stButton > button:hover {
-            background-color: #FFFFFF !important;
-            color: #1B5E20 !important;
-            transform: translateY(-2px);
-            box-shadow: 0 6px 12px rgba(0, 0, 0, 0.15);
-        }
-        .leaf-decoration {
-            position: absolute;
-            font-size: 2rem;
-            opacity: 0.3;
-            animation: float 4s ease-in-out infinite;
-        }
-        .leaf-1 { top: 20%; left: 10%; animation-delay: 0s; }
-        .leaf-2 { top: 40%; right: 15%; animation-delay: 1s; }
-        .leaf-3 { bottom: 20%; left: 15%; animation-delay: 2s; }
-        .leaf-4 { bottom: 40%; right: 10%; animation-delay: 3s; }
-    </style>
-""", unsafe_allow_html=True)
+# Custom CSS: every stylesheet in one bundle, sections turn theirs on with stylesheet(name)
+st.markdown(get_asset_bundle().tag(), unsafe_allow_html=True)
 
 # Initialize session state
 if 'page' not in st.session_state:
     st.session_state.page = 'welcome'
 if 'user_name' not in st.session_state:
     st.session_state.user_name = ''
+if 'user_id' not in st.session_state:
+    # Random history key kept in the URL, so a bookmarked page keeps its history and namesakes don't share one
+    uid = st.query_params.get('uid', '')
+    st.session_state.user_id = uid if re.fullmatch(r'[0-9a-f]{32}', uid) else uuid.uuid4().hex
+    st.query_params['uid'] = st.session_state.user_id
 if 'user_surname' not in st.session_state:
     st.session_state.user_surname = ''
 if 'carbon_data' not in st.session_state:
     st.session_state.carbon_data = []
+if 'results_view' not in st.session_state:
+    st.session_state.results_view = None
 if 'suggestions' not in st.session_state:
     st.session_state.suggestions = []
 
-def analyze_text(text: str,context_files:Optional[List[str]] = []) -> list:
-    """Analyze text directly using GenAI model"""
+@st.cache_resource
+def get_calculator():
+    """Shared CarbonCalculator; the factor table is parsed once per process"""
+    return get_carbon_calculator()
+
+@st.cache_resource
+def get_receipt_store():
+    """Content-addressed receipt cache shared by all sessions"""
+    return ReceiptStore()
+
+@st.cache_resource
+def get_history_store():
+    """Footprint history database shared by all sessions"""
+    return HistoryStore()
+
+def current_user() -> str:
+    """History key for the person using this session"""
+    return st.session_state.user_id
+
+def analyze_text(text: str,context_files:Optional[List[str]] = [], by_clause: bool = True) -> list:
+    """Analyze text directly using GenAI model; by_clause=False extracts non-narrative text such as receipts whole"""
     try:
-        result = genai_model.extract_tasks(
+        result = get_genai_model().extract_tasks(
             text=text,
             schema=EMISSION_SCHEMA,
-            context_files=[os.path.join("data", "emission_factor.pdf")]+context_files
+            context_files=context_files,
+            by_clause=by_clause
         )
         return result['emission_record']
     except Exception as e:
         st.error(f"Error analyzing text: {str(e)}")
         return []
 
-def analyze_receipt(image) -> list:
-    """Process receipt image and extract activities"""
+@st.cache_resource
+def get_receipt_tier_stats():
+    """Latency per receipt tier across sessions"""
+    return TierStats()
+
+def analyze_receipt(image_path: str, prompt: str) -> Tuple[list, Dict]:
+    """
+    Process receipt image and extract activities.
+
+    Local OCR runs first; when its confidence is high only the extracted text
+    is sent to the model, otherwise the image itself is attached.
+
+    Returns:
+        Tuple[list, Dict]: Activities and a report with the tier used, OCR
+        confidence, bytes and (estimated) latency saved
+    """
+    start = time.perf_counter()
+    image_bytes = os.path.getsize(image_path)
     try:
-        text = pytesseract.image_to_string(image)
-        return analyze_text(text)
+        with Image.open(image_path) as image:
+            text, confidence = ocr_with_confidence(image)
     except Exception as e:
-        st.error(f"Error processing receipt: {str(e)}")
-        return []
+        # e.g. tesseract is not installed: fall back to the multimodal path
+        text, confidence = "", 0.0
+        st.info(f"Local OCR unavailable, sending the image instead ({str(e)})")
+
+    if text.strip() and confidence >= DEFAULT_CONFIDENCE_THRESHOLD:
+        tier = "ocr_text"
+        # Receipt lines are not activity clauses, so the receipt goes to the model in one piece
+        activities = analyze_text(f"Receipt text:\n{text}", by_clause=False)
+        bytes_saved = max(image_bytes - len(text.encode("utf-8")), 0)
+    else:
+        tier = "image_upload"
+        activities = analyze_text(prompt, context_files=[image_path])
+        bytes_saved = 0
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    tier_stats = get_receipt_tier_stats()
+    tier_stats.record(tier, elapsed_ms)
+    image_tier_ms = tier_stats.mean("image_upload")
+    return activities, {
+        "tier": tier,
+        "ocr_confidence": round(confidence, 1),
+        "bytes_saved": bytes_saved,
+        "elapsed_ms": round(elapsed_ms),
+        "latency_saved_ms": round(image_tier_ms - elapsed_ms) if tier == "ocr_text" and image_tier_ms else None
+    }
 
 def welcome_page():
     st.markdown("""
@@ -250,32 +233,7 @@ def welcome_page():
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
             # Custom styled input field
-            st.markdown("""
-                <style>
-                    .stTextInput > div > div > input {
-                        background-color: rgba(45, 45, 45, 0.9) !important;
-                        border: 2px solid rgba(255, 255, 255, 0.3) !important;
-                        border-radius: 12px !important;
-                        color: #FFFFFF !important;
-                        font-size: 1.2rem !important;
-                        text-align: center !important;
-                        padding: 1rem !important;
-                    }
-                    .stTextInput > div > div > input:focus {
-                        border-color: #E8F5E9 !important;
-                        box-shadow: 0 0 0 2px rgba(232, 245, 233, 0.3) !important;
-                        background-color: rgba(45, 45, 45, 0.95) !important;
-                        color: #FFFFFF !important;
-                    }
-                    .stTextInput > div > div > input::placeholder {
-                        color: rgba(255, 255, 255, 0.7) !important;
-                    }
-                    .stTextInput > div > div > label {
-                        color: #E8F5E9 !important;
-                        font-weight: 500 !important;
-                    }
-                </style>
-            """, unsafe_allow_html=True)
+            st.markdown(stylesheet("welcome_input"), unsafe_allow_html=True)
             
             # Create a form to handle both Enter key and button click
             with st.form("name_form"):
@@ -301,215 +259,8 @@ def main_page():
         st.session_state.input_method_selected = None
     
     # Welcome banner with user's name
+    st.markdown(stylesheet("main_banner"), unsafe_allow_html=True)
     st.markdown(f"""
-        <style>
-            @keyframes slideUp {{
-                from {{ transform: translateY(30px); opacity: 0; }}
-                to {{ transform: translateY(0); opacity: 1; }}
-            }}
-            @keyframes sparkle {{
-                0% {{ opacity: 0.5; transform: scale(1); }}
-                50% {{ opacity: 1; transform: scale(1.2); }}
-                100% {{ opacity: 0.5; transform: scale(1); }}
-            }}
-            @keyframes buttonPulse {{
-                0%, 100% {{
-                    transform: scale(1);
-                    box-shadow: 0 0 30px rgba(76, 175, 80, 0.5),
-                                0 0 60px rgba(76, 175, 80, 0.3),
-                                0 0 90px rgba(76, 175, 80, 0.1);
-                }}
-                50% {{
-                    transform: scale(1.05);
-                    box-shadow: 0 0 40px rgba(76, 175, 80, 0.7),
-                                0 0 80px rgba(76, 175, 80, 0.5),
-                                0 0 120px rgba(76, 175, 80, 0.3);
-                }}
-            }}
-            @keyframes buttonShine {{
-                0% {{
-                    background-position: -200% center;
-                }}
-                100% {{
-                    background-position: 200% center;
-                }}
-            }}
-            .fun-banner {{
-                background: radial-gradient(circle at top left, #81C784, #388E3C);
-                padding: 3rem 2rem;
-                border-radius: 25px;
-                box-shadow: 0 12px 30px rgba(0, 0, 0, 0.25);
-                margin-bottom: 2.5rem;
-                position: relative;
-                animation: slideUp 1s ease;
-                overflow: hidden;
-            }}
-            .fun-banner h2 {{
-                font-size: 2.8rem;
-                font-weight: 900;
-                color: #FFFFFF;
-                text-align: center;
-                margin: 0;
-                letter-spacing: 1px;
-                text-shadow: 2px 2px 6px rgba(0,0,0,0.3);
-                position: relative;
-                z-index: 2;
-            }}
-            .fun-banner p {{
-                font-size: 1.5rem;
-                color: #F1F8E9;
-                text-align: center;
-                margin-top: 1rem;
-                z-index: 2;
-                position: relative;
-                font-weight: 500;
-            }}
-            .emoji-sparkle {{
-                position: absolute;
-                font-size: 2.5rem;
-                animation: sparkle 3s ease-in-out infinite;
-                opacity: 0.6;
-            }}
-            .sparkle-1 {{ top: 15%; left: 5%; animation-delay: 0s; }}
-            .sparkle-2 {{ top: 40%; right: 8%; animation-delay: 1.5s; }}
-            .sparkle-3 {{ bottom: 10%; left: 10%; animation-delay: 2.5s; }}
-            .sparkle-4 {{ bottom: 25%; right: 12%; animation-delay: 3s; }}
-            /* Big Flashy Selection Buttons */
-            .selection-container {{
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                gap: 2rem;
-                padding: 3rem 2rem;
-                margin: 2rem 0;
-            }}
-            .selection-title {{
-                color: #FFFFFF;
-                font-size: 2.5rem;
-                font-weight: 900;
-                text-align: center;
-                margin-bottom: 1rem;
-                text-shadow: 2px 2px 4px rgba(0,0,0,0.3);
-            }}
-            .selection-subtitle {{
-                color: #E8F5E9;
-                font-size: 1.3rem;
-                text-align: center;
-                margin-bottom: 2rem;
-            }}
-            .button-grid {{
-                display: grid;
-                grid-template-columns: repeat(3, 1fr);
-                gap: 2rem;
-                width: 100%;
-                max-width: 1200px;
-            }}
-            .method-button {{
-                background: linear-gradient(135deg, #4CAF50, #66BB6A);
-                border: 4px solid #81C784;
-                border-radius: 25px;
-                padding: 3rem 2rem;
-                color: #FFFFFF;
-                font-size: 2rem;
-                font-weight: 900;
-                text-align: center;
-                cursor: pointer;
-                transition: all 0.3s ease;
-                position: relative;
-                overflow: hidden;
-                box-shadow: 0 10px 30px rgba(0, 0, 0, 0.3);
-                animation: buttonPulse 2s ease-in-out infinite;
-                text-decoration: none;
-                display: flex;
-                flex-direction: column;
-                align-items: center;
-                justify-content: center;
-                gap: 1rem;
-                min-height: 250px;
-            }}
-            .method-button::before {{
-                content: '';
-                position: absolute;
-                top: 0;
-                left: -100%;
-                width: 100%;
-                height: 100%;
-                background: linear-gradient(
-                    90deg,
-                    transparent,
-                    rgba(255, 255, 255, 0.3),
-                    transparent
-                );
-                transition: left 0.5s;
-            }}
-            .method-button:hover {{
-                transform: scale(1.1) translateY(-5px);
-                box-shadow: 0 15px 40px rgba(76, 175, 80, 0.6),
-                            0 0 60px rgba(76, 175, 80, 0.4);
-                border-color: #A5D6A7;
-            }}
-            .method-button:hover::before {{
-                left: 100%;
-            }}
-            .method-button:active {{
-                transform: scale(1.05) translateY(-2px);
-            }}
-            .method-icon {{
-                font-size: 4rem;
-                margin-bottom: 0.5rem;
-            }}
-            .method-label {{
-                font-size: 2rem;
-                font-weight: 900;
-                letter-spacing: 1px;
-            }}
-            .method-description {{
-                font-size: 1rem;
-                opacity: 0.9;
-                font-weight: 500;
-            }}
-            .button-text {{
-                background: linear-gradient(135deg, #66B2FF, #4A90E2);
-                border-color: #90CAF9;
-            }}
-            .button-text:hover {{
-                box-shadow: 0 15px 40px rgba(102, 178, 255, 0.6),
-                            0 0 60px rgba(102, 178, 255, 0.4);
-            }}
-            .button-image {{
-                background: linear-gradient(135deg, #FF6B6B, #FF8E8E);
-                border-color: #FFB3BA;
-            }}
-            .button-image:hover {{
-                box-shadow: 0 15px 40px rgba(255, 107, 107, 0.6),
-                            0 0 60px rgba(255, 107, 107, 0.4);
-            }}
-            .button-audio {{
-                background: linear-gradient(135deg, #9B59B6, #8E44AD);
-                border-color: #BB8FCE;
-            }}
-            .button-audio:hover {{
-                box-shadow: 0 15px 40px rgba(155, 89, 182, 0.6),
-                            0 0 60px rgba(155, 89, 182, 0.4);
-            }}
-            @media (max-width: 768px) {{
-                .button-grid {{
-                    grid-template-columns: 1fr;
-                    gap: 1.5rem;
-                }}
-                .method-button {{
-                    padding: 2rem 1.5rem;
-                    min-height: 200px;
-                }}
-                .method-icon {{
-                    font-size: 3rem;
-                }}
-                .method-label {{
-                    font-size: 1.5rem;
-                }}
-            }}
-        </style>
-
         <div class="fun-banner">
             <div class="emoji-sparkle sparkle-1">🌿</div>
             <div class="emoji-sparkle sparkle-2">✨</div>
@@ -530,80 +281,7 @@ def main_page():
         """, unsafe_allow_html=True)
         
         # Create styled buttons for each method with enhanced CSS
-        st.markdown("""
-            <style>
-                /* Target all buttons in the selection columns */
-                .stButton > button {
-                    min-height: 280px !important;
-                    font-size: 1.8rem !important;
-                    font-weight: 900 !important;
-                    padding: 2.5rem 1.5rem !important;
-                    border-radius: 25px !important;
-                    border: 4px solid !important;
-                    white-space: pre-line !important;
-                    line-height: 1.6 !important;
-                    transition: all 0.3s ease !important;
-                    position: relative !important;
-                    overflow: hidden !important;
-                    box-shadow: 0 10px 30px rgba(0, 0, 0, 0.3) !important;
-                    animation: buttonPulse 2s ease-in-out infinite !important;
-                }
-                /* Make emojis bigger - target first line which contains emoji */
-                .stButton > button {
-                    font-size: 1.8rem !important;
-                }
-                .stButton > button::first-line {
-                    font-size: 6rem !important;
-                    line-height: 1.3 !important;
-                    display: block !important;
-                    margin-bottom: 0.3rem !important;
-                }
-                .stButton > button:hover {
-                    transform: scale(1.08) translateY(-8px) !important;
-                    box-shadow: 0 20px 50px rgba(0, 0, 0, 0.4) !important;
-                }
-                /* Text button styling - blue gradient */
-                div[data-testid*="column"]:nth-of-type(1) .stButton > button {
-                    background: linear-gradient(135deg, #66B2FF, #4A90E2) !important;
-                    border-color: #90CAF9 !important;
-                    color: #FFFFFF !important;
-                }
-                div[data-testid*="column"]:nth-of-type(1) .stButton > button:hover {
-                    box-shadow: 0 20px 50px rgba(102, 178, 255, 0.6),
-                                0 0 80px rgba(102, 178, 255, 0.4) !important;
-                    background: linear-gradient(135deg, #7BC3FF, #5BA0F2) !important;
-                }
-                /* Image button styling - red gradient */
-                div[data-testid*="column"]:nth-of-type(2) .stButton > button {
-                    background: linear-gradient(135deg, #FF6B6B, #FF8E8E) !important;
-                    border-color: #FFB3BA !important;
-                    color: #FFFFFF !important;
-                }
-                div[data-testid*="column"]:nth-of-type(2) .stButton > button:hover {
-                    box-shadow: 0 20px 50px rgba(255, 107, 107, 0.6),
-                                0 0 80px rgba(255, 107, 107, 0.4) !important;
-                    background: linear-gradient(135deg, #FF7B7B, #FF9E9E) !important;
-                }
-                /* Audio button styling - purple gradient */
-                div[data-testid*="column"]:nth-of-type(3) .stButton > button {
-                    background: linear-gradient(135deg, #9B59B6, #8E44AD) !important;
-                    border-color: #BB8FCE !important;
-                    color: #FFFFFF !important;
-                }
-                div[data-testid*="column"]:nth-of-type(3) .stButton > button:hover {
-                    box-shadow: 0 20px 50px rgba(155, 89, 182, 0.6),
-                                0 0 80px rgba(155, 89, 182, 0.4) !important;
-                    background: linear-gradient(135deg, #AB69C6, #9E54BD) !important;
-                }
-                @media (max-width: 768px) {
-                    .stButton > button {
-                        min-height: 220px !important;
-                        font-size: 1.5rem !important;
-                        padding: 2rem 1rem !important;
-                    }
-                }
-            </style>
-        """, unsafe_allow_html=True)
+        st.markdown(stylesheet("method_selection"), unsafe_allow_html=True)
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -623,159 +301,12 @@ def main_page():
     
     
     # Show input section based on selected method
-    st.markdown("""
-        <style>
-        /* Fade and bounce in */
-        @keyframes fadeInBounce {
-            0% { opacity: 0; transform: translateY(20px); }
-            60% { transform: translateY(-10px); }
-            100% { opacity: 1; transform: translateY(0); }
-        }
-
-        /* Glowing border pulse */
-        @keyframes pulse-glow {
-            0% { box-shadow: 0 0 0 0 rgba(76, 175, 80, 0.4); }
-            70% { box-shadow: 0 0 0 10px rgba(76, 175, 80, 0); }
-            100% { box-shadow: 0 0 0 0 rgba(76, 175, 80, 0); }
-        }
-
-        .input-section {
-            background: linear-gradient(135deg, #2E7D32, #1B5E20);
-            border-radius: 20px;
-            padding: 2.5rem;
-            margin: 2rem 0;
-            box-shadow: 0 12px 28px rgba(0, 0, 0, 0.2);
-            animation: fadeInBounce 1s ease;
-            transition: all 0.3s ease-in-out;
-        }
-
-        .input-title {
-            color: #FFFFFF;
-            font-size: 2rem;
-            font-weight: 900;
-            text-align: center;
-            margin-bottom: 0.5rem;
-            letter-spacing: 1px;
-            text-shadow: 1px 1px 3px rgba(0,0,0,0.3);
-        }
-
-        .input-description {
-            color: #E8F5E9;
-            font-size: 1.2rem;
-            text-align: center;
-            margin-bottom: 2rem;
-            font-weight: 500;
-        }
-
-        /* Upload section styling */
-        .upload-section {
-            text-align: center;
-            padding: 2rem;
-            border: 3px dashed #81C784;
-            border-radius: 20px;
-            margin-top: 1.5rem;
-            background: rgba(255, 255, 255, 0.05);
-        }
-
-        .upload-icon {
-            font-size: 3rem;
-            color: #81C784;
-            margin-bottom: 1rem;
-            animation: pulse-glow 2s infinite;
-        }
-
-        /* Text input section */
-        .text-input-section {
-            background: rgba(255, 255, 255, 0.05);
-            padding: 2rem;
-            border-radius: 15px;
-            box-shadow: 0 8px 18px rgba(0,0,0,0.15);
-            margin: 1rem 0;
-            animation: fadeInBounce 1s ease;
-        }
-
-        .stTextArea > div > div > textarea {
-            border: 2px solid #81C784 !important;
-            border-radius: 12px !important;
-            padding: 1.2rem !important;
-            font-size: 1.1rem !important;
-            background: #2D2D2D !important;
-            color: #FFFFFF !important;
-            transition: all 0.3s ease-in-out;
-        }
-
-        .stTextArea > div > div > textarea:focus {
-            border-color: #A5D6A7 !important;
-            box-shadow: 0 0 10px #A5D6A7 !important;
-            background: #2D2D2D !important;
-            color: #FFFFFF !important;
-        }
-        
-        .stTextArea > div > div > textarea::placeholder {
-            color: rgba(255, 255, 255, 0.7) !important;
-        }
-        
-        .stTextArea > div > div > label {
-            color: #FFFFFF !important;
-            font-weight: 500 !important;
-        }
-
-        /* Analyze button */
-        .stButton > button {
-            background-color: #66BB6A !important;
-            color: #FFFFFF !important;
-            padding: 1rem 2rem !important;
-            border-radius: 12px !important;
-            font-size: 1.2rem !important;
-            font-weight: 700 !important;
-            margin-top: 1rem !important;
-            cursor: pointer;
-            transition: background 0.3s ease;
-            border: none !important;
-        }
-
-        .stButton > button:hover {
-            background-color: #81C784 !important;
-            color: #FFFFFF !important;
-        }
-
-        /* Audio section */
-        .audio-section {
-            text-align: center;
-            padding: 2rem;
-            background: rgba(255, 255, 255, 0.05);
-            border-radius: 15px;
-            margin: 1rem 0;
-            box-shadow: 0 5px 10px rgba(0, 0, 0, 0.1);
-        }
-
-        .audio-icon {
-            font-size: 3rem;
-            color: #66BB6A;
-            margin-bottom: 1rem;
-        }
-        </style>
-        """, unsafe_allow_html=True)
+    st.markdown(stylesheet("input_section"), unsafe_allow_html=True)
 
     st.markdown('<div class="input-section">', unsafe_allow_html=True)
     
     # Show back button to change selection
-    st.markdown("""
-        <style>
-            button[data-testid*="back_to_selection"] {
-                background-color: rgba(100, 100, 100, 0.3) !important;
-                color: #FFFFFF !important;
-                border: 2px solid rgba(255, 255, 255, 0.3) !important;
-                padding: 0.5rem 1.5rem !important;
-                font-size: 1rem !important;
-                margin-bottom: 1rem !important;
-            }
-            button[data-testid*="back_to_selection"]:hover {
-                background-color: rgba(120, 120, 120, 0.5) !important;
-                border-color: rgba(255, 255, 255, 0.5) !important;
-            }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(stylesheet("back_button"), unsafe_allow_html=True)
     
     if st.button("← Back to Selection", key="back_to_selection"):
         st.session_state.input_method_selected = None
@@ -797,6 +328,7 @@ def main_page():
     attached_file_path=[]
     user_input=None
     uploaded_file=None
+    receipt_digest=None
     audio_file=None
     
     if input_method == "Text Input":
@@ -822,15 +354,12 @@ def main_page():
         if uploaded_file is not None:
             
             user_input=f"Extract text from Image attached:{uploaded_file.name}"
-            # Create cache directory if it doesn't exist
-            cache_dir = os.path.join('data', 'cache')
-            os.makedirs(cache_dir, exist_ok=True)
-            
-            # Save the uploaded file in cache
-            file_path = os.path.join(cache_dir, uploaded_file.name)
+            # Save the uploaded file under the hash of its bytes, so duplicates share one file
+            receipt_digest, file_path = get_receipt_store().put(
+                uploaded_file.getvalue(),
+                os.path.splitext(uploaded_file.name)[1]
+            )
             attached_file_path.append(file_path)
-            with open(file_path, 'wb') as f:
-                f.write(uploaded_file.getbuffer())
             
             # Display the saved image
             image = Image.open(uploaded_file)
@@ -855,46 +384,6 @@ def main_page():
             # TODO: Process audio with speech-to-text
         st.markdown('</div>', unsafe_allow_html=True)
     
-    # Add JavaScript to scroll down when spinner appears
-    st.markdown("""
-        <script>
-            (function() {
-                function scrollToSpinner() {
-                    // Wait for spinner to appear, then scroll
-                    setTimeout(function() {
-                        const spinner = document.querySelector('[data-testid="stSpinner"]');
-                        if (spinner) {
-                            const spinnerPosition = spinner.getBoundingClientRect().top;
-                            const streamlitNavbarHeight = 56;
-                            const customNavbarHeight = 80;
-                            const totalNavbarHeight = streamlitNavbarHeight + customNavbarHeight;
-                            const scrollPosition = window.pageYOffset + spinnerPosition - totalNavbarHeight - 50;
-                            window.scrollTo({ top: Math.max(0, scrollPosition), behavior: 'smooth' });
-                        } else {
-                            // Fallback: scroll down by a fixed amount
-                            window.scrollBy({ top: 300, behavior: 'smooth' });
-                        }
-                    }, 200);
-                }
-                
-                // Watch for spinner appearance
-                const observer = new MutationObserver(function() {
-                    const spinner = document.querySelector('[data-testid="stSpinner"]');
-                    if (spinner && !window.spinnerScrolled) {
-                        window.spinnerScrolled = true;
-                        scrollToSpinner();
-                    }
-                });
-                
-                observer.observe(document.body, { childList: true, subtree: true });
-                
-                // Also check immediately in case spinner already exists
-                if (document.querySelector('[data-testid="stSpinner"]')) {
-                    scrollToSpinner();
-                }
-            })();
-        </script>
-    """, unsafe_allow_html=True)
     
     if st.button("Analyze", key="analyze_button"):
         if input_method == "Text Input" and user_input:
@@ -904,32 +393,46 @@ def main_page():
                 for each_attached_file_path in attached_file_path:
                     if os.path.exists(each_attached_file_path):
                         os.remove(each_attached_file_path)
+                clause_stats = get_genai_model().clause_stats
+                if clause_stats.clauses:
+                    st.caption(
+                        f"Clause cache: {clause_stats.hit_ratio:.0%} of activity clauses answered locally "
+                        f"({clause_stats.fast_path:,} by the fast path) · "
+                        f"~{max(clause_stats.tokens_saved, 0):,} prompt tokens saved so far"
+                    )
                 if activities:
                     # Calculate carbon footprint
-                    from services.carbon_service import CarbonCalculator
-                    calculator = CarbonCalculator()
-                    results = calculator.calculate_carbon_footprint(activities)
+                    calculator = get_calculator()
+                    results = calculator.calculate_records(activities)
 
                     # Update session state
-                    st.session_state.carbon_data = results
+                    store_results(results)
                 else:
                     st.warning("No activities were detected in your input. Please try again with more specific details.")
                 
         elif input_method == "Upload Receipt" and uploaded_file:
             with st.spinner("Analyzing your receipt..."):
-                # Get activities from backend
-                activities = analyze_text(user_input, context_files=attached_file_path)
-                for each_attached_file_path in attached_file_path:
-                    if os.path.exists(each_attached_file_path):
-                        os.remove(each_attached_file_path)
+                # Reuse the analysis of an identical receipt, otherwise ask the backend
+                receipt_store = get_receipt_store()
+                activities = receipt_store.get_result(receipt_digest)
+                if activities is None:
+                    activities, receipt_report = analyze_receipt(attached_file_path[0], user_input)
+                    if activities:
+                        receipt_store.put_result(receipt_digest, activities)
+                else:
+                    receipt_report = {"tier": "cache", "bytes_saved": uploaded_file.size}
+                st.caption(
+                    f"Receipt tier: {receipt_report['tier']} · "
+                    f"{receipt_report['bytes_saved'] / 1024:.0f} KB not uploaded"
+                    + (f" · ~{receipt_report['latency_saved_ms']} ms saved" if receipt_report.get('latency_saved_ms') else "")
+                )
                 if activities:
                     # Calculate carbon footprint
-                    from services.carbon_service import CarbonCalculator
-                    calculator = CarbonCalculator()
-                    results = calculator.calculate_carbon_footprint(activities)
+                    calculator = get_calculator()
+                    results = calculator.calculate_records(activities)
 
                     # Update session state
-                    st.session_state.carbon_data = results
+                    store_results(results)
                 else:
                     st.warning("No activities were detected in your receipt. Please try again with a clearer image.")
         elif input_method == "Audio Input" and audio_file:
@@ -943,66 +446,6 @@ def main_page():
         display_results()
 
 def main():
-    # Set dark theme by default
-    st.markdown("""
-        <style>
-            /* Force dark theme */
-            .stApp {
-                background-color: #1E1E1E;
-                color: #FFFFFF;
-            }
-            /* Override Streamlit's default light theme - ensure white text on dark background */
-            .stTextInput > div > div > input {
-                background-color: #2D2D2D !important;
-                color: #FFFFFF !important;
-                border-color: #3D3D3D !important;
-            }
-            .stTextArea > div > div > textarea {
-                background-color: #2D2D2D !important;
-                color: #FFFFFF !important;
-                border-color: #3D3D3D !important;
-            }
-            .stSelectbox > div > div > div {
-                background-color: #2D2D2D !important;
-                color: #FFFFFF !important;
-                border-color: #3D3D3D !important;
-            }
-            .stRadio > div > div > label {
-                color: #FFFFFF !important;
-            }
-            /* Ensure text is visible in input fields */
-            .stTextInput > div > div > input::placeholder,
-            .stTextArea > div > div > textarea::placeholder {
-                color: rgba(255, 255, 255, 0.7) !important;
-            }
-            .stTextInput > div > div > input:focus,
-            .stTextArea > div > div > textarea:focus {
-                color: #FFFFFF !important;
-                background-color: #2D2D2D !important;
-            }
-            /* Button styling - white background with dark text for visibility */
-            .stButton > button {
-                background-color: #FFFFFF !important;
-                color: #000000 !important;
-                border: 1px solid #3D3D3D !important;
-            }
-            .stButton > button:hover {
-                background-color: #F0F0F0 !important;
-                color: #000000 !important;
-            }
-            /* Custom dark theme styles */
-            .text-color {
-                color: #FFFFFF;
-            }
-            .card-background {
-                background: rgba(45, 45, 45, 0.8);
-            }
-            .background-color {
-                background: rgba(30, 30, 30, 0.9);
-            }
-        </style>
-    """, unsafe_allow_html=True)
-    
     # Add padding to prevent content from being hidden behind the fixed button
     st.markdown('<div class="main-content">', unsafe_allow_html=True)
     
@@ -1013,15 +456,15 @@ def main():
     
     st.markdown('</div>', unsafe_allow_html=True)
 
-def validate_and_sanitize_carbon_data(carbon_data: List[Dict]) -> List[Dict]:
+def validate_and_sanitize_carbon_data(carbon_data: List[Union[ActivityRecord, Dict]]) -> List[ActivityRecord]:
     """
     Validate and sanitize carbon data to handle edge cases.
     
     Args:
-        carbon_data: List of carbon emission dictionaries
+        carbon_data: Activity records from the calculator, or carbon emission dictionaries
         
     Returns:
-        List of validated and sanitized carbon emission dictionaries
+        List of validated and sanitized activity records
     """
     if not carbon_data or not isinstance(carbon_data, list):
         return []
@@ -1032,17 +475,14 @@ def validate_and_sanitize_carbon_data(carbon_data: List[Dict]) -> List[Dict]:
     validated_data = []
     
     for item in carbon_data:
-        if not isinstance(item, dict):
+        if isinstance(item, dict):
+            item = ActivityRecord.from_dict(item)
+        elif not isinstance(item, ActivityRecord):
             continue
             
         try:
-            # Extract and validate co2e
-            co2e = item.get('co2e', 0)
-            if not isinstance(co2e, (int, float)):
-                try:
-                    co2e = float(co2e)
-                except (ValueError, TypeError):
-                    co2e = 0
+            # Missing or non-numeric co2e is read as NaN
+            co2e = 0 if pd.isna(item.co2e) else item.co2e
             
             # Cap ridiculously large numbers
             if co2e > MAX_CO2E_PER_ITEM:
@@ -1053,15 +493,18 @@ def validate_and_sanitize_carbon_data(carbon_data: List[Dict]) -> List[Dict]:
                 co2e = 0
             
             # Validate other required fields
-            validated_item = {
-                'co2e': co2e,
-                'text': str(item.get('text', item.get('activity', 'Unknown Activity'))),
-                'category': str(item.get('category', 'Unknown')),
-                'quantity': float(item.get('quantity', 0)) if isinstance(item.get('quantity'), (int, float)) else 0,
-                'unit': str(item.get('unit', '')),
-                'co2e_impact_level': str(item.get('co2e_impact_level', '1')),
-                'suggestion': str(item.get('suggestion', 'Consider alternatives'))
-            }
+            validated_item = ActivityRecord(
+                text=str(item.text if item.text is not None else 'Unknown Activity'),
+                category=str(item.category if item.category is not None else 'Unknown'),
+                type=item.type,
+                quantity=0 if pd.isna(item.quantity) else item.quantity,
+                unit=str(item.unit if item.unit is not None else ''),
+                co2e_per_unit=item.co2e_per_unit,
+                factor_source=item.factor_source,
+                co2e=co2e,
+                co2e_impact_level=str(item.co2e_impact_level if item.co2e_impact_level is not None else '1'),
+                suggestion=str(item.suggestion if item.suggestion is not None else 'Consider alternatives')
+            )
             
             validated_data.append(validated_item)
             
@@ -1070,26 +513,41 @@ def validate_and_sanitize_carbon_data(carbon_data: List[Dict]) -> List[Dict]:
             continue
     
     # Check total CO2e
-    total_co2 = sum(item['co2e'] for item in validated_data)
+    total_co2 = sum(item.co2e for item in validated_data)
     if total_co2 > MAX_TOTAL_CO2E:
         # Scale down proportionally if total is too large
         scale_factor = MAX_TOTAL_CO2E / total_co2
         for item in validated_data:
-            item['co2e'] = item['co2e'] * scale_factor
+            item.co2e = item.co2e * scale_factor
     
     return validated_data
 
+def store_results(results: List[Union[ActivityRecord, Dict]], persist: bool = True) -> ResultsView:
+    """Sanitize a new analysis once, keep it with its view-model in session state and add it to the history"""
+    st.session_state.carbon_data = validate_and_sanitize_carbon_data(results)
+    st.session_state.results_view = build_results_view(st.session_state.carbon_data)
+    if persist and st.session_state.carbon_data:
+        try:
+            records = st.session_state.carbon_data
+            # Analyzing the same activities again the same day must not count them twice
+            get_history_store().record(current_user(), records, digest=analysis_digest(records))
+        except Exception as e:
+            logger.error(f"Error saving analysis to history: {str(e)}")
+    return st.session_state.results_view
+
 
 def display_results():
-    # Validate and sanitize data first
+    # The view-model is built once per analysis by store_results
     try:
         if not hasattr(st.session_state, 'carbon_data') or not st.session_state.carbon_data:
             st.error("⚠️ No carbon data available. Please analyze your activities first.")
             return
         
-        st.session_state.carbon_data = validate_and_sanitize_carbon_data(st.session_state.carbon_data)
+        view = st.session_state.get('results_view')
+        if view is None:
+            view = store_results(st.session_state.carbon_data, persist=False)
         
-        if not st.session_state.carbon_data:
+        if not view.rows:
             st.error("⚠️ No valid carbon data found. Please try analyzing again.")
             return
             
@@ -1097,282 +555,7 @@ def display_results():
         st.error(f"⚠️ Error validating data: {str(e)}")
         return
     
-    st.markdown("""
-        <style>
-            /* Navigation Menubar - Fixed position at top, covering Streamlit's menubar */
-            .nav-menubar {
-                position: fixed;
-                top: 0; /* Start from the very top */
-                left: 0;
-                right: 0;
-                background: rgba(30, 30, 30, 0.98); /* Match the theme color */
-                backdrop-filter: blur(10px);
-                padding: 3.5rem 2rem 1rem 2rem; /* Top padding for Streamlit menubar area, then menu items */
-                z-index: 999;
-                box-shadow: 0 4px 6px rgba(0, 0, 0, 0.3);
-                border-bottom: 2px solid rgba(76, 175, 80, 0.3);
-                width: 100%;
-                box-sizing: border-box;
-            }
-            /* Add padding to body to account for our custom navbar */
-            .main .block-container {
-                padding-top: 9rem; /* Streamlit menubar area (3.5rem) + our menubar content (5.5rem) */
-            }
-            .nav-menu {
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                gap: 1.5rem;
-                flex-wrap: wrap;
-            }
-            .nav-menu-left {
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                gap: 1.5rem;
-                flex-wrap: wrap;
-                flex: 1;
-            }
-            .nav-menu-right {
-                display: flex;
-                align-items: center;
-                margin-left: auto;
-            }
-            /* Glowing Report Ready Button */
-            .report-ready-button {
-                padding: 0.6rem 1.5rem;
-                background: linear-gradient(135deg, #4CAF50, #66BB6A);
-                border: 2px solid #81C784;
-                border-radius: 25px;
-                color: #FFFFFF;
-                font-size: 0.95rem;
-                font-weight: 700;
-                text-decoration: none;
-                white-space: nowrap;
-                pointer-events: none; /* Non-clickable */
-                cursor: default;
-                position: relative;
-                overflow: hidden;
-                box-shadow: 0 0 20px rgba(76, 175, 80, 0.6),
-                            0 0 40px rgba(76, 175, 80, 0.4),
-                            0 0 60px rgba(76, 175, 80, 0.2);
-                animation: glow-pulse 2s ease-in-out infinite;
-                z-index: 1;
-            }
-            .report-ready-button > * {
-                position: relative;
-                z-index: 2;
-            }
-            @keyframes glow-pulse {
-                0%, 100% {
-                    box-shadow: 0 0 20px rgba(76, 175, 80, 0.6),
-                                0 0 40px rgba(76, 175, 80, 0.4),
-                                0 0 60px rgba(76, 175, 80, 0.2);
-                }
-                50% {
-                    box-shadow: 0 0 30px rgba(76, 175, 80, 0.8),
-                                0 0 60px rgba(76, 175, 80, 0.6),
-                                0 0 90px rgba(76, 175, 80, 0.4);
-                }
-            }
-            .report-ready-button::before {
-                content: '';
-                position: absolute;
-                top: -50%;
-                left: -50%;
-                width: 200%;
-                height: 200%;
-                background: linear-gradient(
-                    45deg,
-                    transparent,
-                    rgba(255, 255, 255, 0.3),
-                    transparent
-                );
-                animation: shine 3s infinite;
-            }
-            @keyframes shine {
-                0% {
-                    transform: translateX(-100%) translateY(-100%) rotate(45deg);
-                }
-                100% {
-                    transform: translateX(100%) translateY(100%) rotate(45deg);
-                }
-            }
-            .nav-item {
-                padding: 0.6rem 1.2rem;
-                background: rgba(76, 175, 80, 0.2);
-                border: 1px solid rgba(76, 175, 80, 0.4);
-                border-radius: 20px;
-                color: #FFFFFF;
-                text-decoration: none;
-                font-size: 0.9rem;
-                font-weight: 600;
-                cursor: pointer;
-                transition: all 0.3s ease;
-                white-space: nowrap;
-            }
-            .nav-item:hover {
-                background: rgba(76, 175, 80, 0.4);
-                border-color: rgba(76, 175, 80, 0.6);
-                transform: translateY(-2px);
-                box-shadow: 0 4px 8px rgba(76, 175, 80, 0.3);
-            }
-            .nav-item:active {
-                transform: translateY(0);
-            }
-            /* Responsive design for mobile */
-            @media (max-width: 768px) {
-                .nav-menubar {
-                    padding: 3.5rem 1rem 0.8rem 1rem;
-                }
-                .nav-menu {
-                    flex-direction: column;
-                    gap: 0.8rem;
-                }
-                .nav-menu-left {
-                    gap: 0.8rem;
-                }
-                .nav-menu-right {
-                    margin-left: 0;
-                    width: 100%;
-                    justify-content: center;
-                }
-                .nav-item {
-                    padding: 0.5rem 0.8rem;
-                    font-size: 0.8rem;
-                }
-                .report-ready-button {
-                    padding: 0.5rem 1.2rem;
-                    font-size: 0.85rem;
-                }
-            }
-            /* Section anchors with offset for our custom navbar */
-            .section-anchor {
-                scroll-margin-top: 136px; /* Streamlit menubar area (56px) + our menubar content (80px) */
-                display: block;
-            }
-            /* Ensure smooth scrolling is enabled */
-            html {
-                scroll-behavior: smooth;
-            }
-            body {
-                scroll-behavior: smooth;
-            }
-            
-            .header-text {
-                color: #FFFFFF;
-                font-size: 2rem;
-                font-weight: bold;
-                margin-bottom: 1rem;
-            }
-            .metric-text {
-                color: #FFFFFF;
-                font-size: 1.5rem;
-                font-weight: bold;
-            }
-            .carbon-number {
-                color: #FFFFFF;
-                font-size: 3.5rem;
-                font-weight: 900;
-                text-align: center;
-                margin: 1rem 0;
-                text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.3);
-            }
-            .carbon-label {
-                color: #FFFFFF;
-                font-size: 1.2rem;
-                font-weight: bold;
-                text-align: center;
-                margin-bottom: 0.5rem;
-            }
-            .section-title {
-                color: #FFFFFF;
-                font-size: 2rem;
-                font-weight: 700;
-                text-align: center;
-                margin-bottom: 2rem;
-                padding-bottom: 1rem;
-                border-bottom: 3px solid #90CAF9;
-                text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.1);
-            }
-            .card-header {
-                color: #FFFFFF;
-                font-size: 1.4rem;
-                font-weight: 700;
-                margin-bottom: 1.5rem;
-                padding-bottom: 0.8rem;
-                border-bottom: 2px solid #90CAF9;
-                display: flex;
-                align-items: center;
-                gap: 0.5rem;
-            }
-            .content-label {
-                color: #FFFFFF;
-                font-size: 0.9rem;
-                font-weight: 600;
-                text-transform: uppercase;
-                letter-spacing: 0.5px;
-                margin-bottom: 0.3rem;
-            }
-            .content-value {
-                color: #FFFFFF;
-                font-size: 1.1rem;
-                font-weight: 500;
-                margin-bottom: 1rem;
-                padding: 0.8rem;
-                background: rgba(45, 45, 45, 0.8);
-                border-radius: 8px;
-                border-left: 3px solid #1976D2;
-            }
-            .suggestion-text {
-                color: #FFFFFF;
-                font-size: 1.1rem;
-                line-height: 1.5;
-            }
-            .suggestion-box {
-                background: rgba(45, 45, 45, 0.8);
-                padding: 1.2rem;
-                border-radius: 12px;
-                margin-top: 1rem;
-                border-left: 4px solid #1976D2;
-                position: relative;
-                box-shadow: 0 2px 10px rgba(0, 0, 0, 0.05);
-            }
-            .graph-title {
-                color: #FFFFFF;
-                font-size: 1.5rem;
-                font-weight: bold;
-                text-align: center;
-                margin-bottom: 1rem;
-            }
-            .confetti {
-                position: fixed;
-                top: 0;
-                left: 0;
-                width: 100%;
-                height: 100%;
-                pointer-events: none;
-                z-index: 9999;
-            }
-            .confetti-piece {
-                position: absolute;
-                width: 10px;
-                height: 10px;
-                background-color: #f00;
-                opacity: 0;
-            }
-            @keyframes confetti-fall {
-                0% {
-                    transform: translateY(-100vh) rotate(0deg);
-                    opacity: 1;
-                }
-                100% {
-                    transform: translateY(100vh) rotate(360deg);
-                    opacity: 0;
-                }
-            }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(stylesheet("results"), unsafe_allow_html=True)
     
     # Navigation Menubar
     st.markdown("""
@@ -1389,181 +572,19 @@ def display_results():
                 </div>
             </div>
         </div>
-        <script>
-            (function() {
-                // Wait for DOM to be ready
-                function initSmoothScroll() {
-                    // Smooth scroll with offset for fixed navbar
-                    document.querySelectorAll('.nav-item').forEach(item => {
-                        item.addEventListener('click', function(e) {
-                            e.preventDefault();
-                            e.stopPropagation();
-                            const targetId = this.getAttribute('href').substring(1);
-                            const targetElement = document.getElementById(targetId);
-                            if (targetElement) {
-                                const streamlitNavbarArea = 56; // Streamlit's default menubar area (covered by black)
-                                const customNavbarContent = 80; // Our custom navbar content height
-                                const totalNavbarHeight = streamlitNavbarArea + customNavbarContent;
-                                const elementPosition = targetElement.getBoundingClientRect().top;
-                                const offsetPosition = elementPosition + window.pageYOffset - totalNavbarHeight;
-                                
-                                // Use smooth scroll
-                                window.scrollTo({
-                                    top: Math.max(0, offsetPosition),
-                                    behavior: 'smooth'
-                                });
-                            }
-                        });
-                    });
-                }
-                
-                // Initialize when DOM is ready
-                if (document.readyState === 'loading') {
-                    document.addEventListener('DOMContentLoaded', initSmoothScroll);
-                } else {
-                    initSmoothScroll();
-                }
-                
-                // Re-initialize after Streamlit reruns (for dynamic content)
-                setTimeout(initSmoothScroll, 100);
-                setTimeout(initSmoothScroll, 500);
-            })();
-            
-        </script>
     """, unsafe_allow_html=True)
     
     st.markdown('<div id="overview" class="section-anchor"><div class="header-text">Your Carbon Footprint Analysis</div></div>', unsafe_allow_html=True)
     
-    # Auto-scroll to overview section when report is ready - placed after overview element
-    st.markdown("""
-        <script>
-            (function() {
-                // Use a unique key to prevent multiple scrolls
-                if (window.overviewScrolled) return;
-                
-                function scrollToOverview() {
-                    const overviewElement = document.getElementById('overview');
-                    if (overviewElement) {
-                        // Wait for element to be fully rendered
-                        const rect = overviewElement.getBoundingClientRect();
-                        const isVisible = rect.height > 0 || rect.width > 0 || overviewElement.offsetHeight > 0;
-                        
-                        if (isVisible) {
-                            const streamlitNavbarArea = 56;
-                            const customNavbarContent = 80;
-                            const totalNavbarHeight = streamlitNavbarArea + customNavbarContent;
-                            
-                            // Calculate scroll position
-                            let scrollPosition;
-                            if (overviewElement.offsetTop !== undefined) {
-                                scrollPosition = overviewElement.offsetTop - totalNavbarHeight;
-                            } else {
-                                const elementTop = overviewElement.getBoundingClientRect().top + window.pageYOffset;
-                                scrollPosition = elementTop - totalNavbarHeight;
-                            }
-                            
-                            // Scroll smoothly
-                            window.scrollTo({
-                                top: Math.max(0, scrollPosition),
-                                behavior: 'smooth'
-                            });
-                            
-                            window.overviewScrolled = true;
-                            return true;
-                        }
-                    }
-                    return false;
-                }
-                
-                // Try scrolling immediately
-                if (scrollToOverview()) return;
-                
-                // Try multiple times with increasing delays
-                function attemptScroll(attempts) {
-                    if (window.overviewScrolled) return;
-                    
-                    if (scrollToOverview()) {
-                        return;
-                    }
-                    
-                    if (attempts > 0) {
-                        setTimeout(function() {
-                            attemptScroll(attempts - 1);
-                        }, 200);
-                    }
-                }
-                
-                // Start attempting to scroll
-                attemptScroll(20); // Try for 4 seconds (20 * 200ms)
-                
-                // Also use MutationObserver as backup
-                const observer = new MutationObserver(function() {
-                    if (!window.overviewScrolled) {
-                        scrollToOverview();
-                    }
-                });
-                
-                observer.observe(document.body, {
-                    childList: true,
-                    subtree: true
-                });
-                
-                // Also try on window load
-                if (document.readyState === 'complete') {
-                    setTimeout(scrollToOverview, 100);
-                } else {
-                    window.addEventListener('load', function() {
-                        setTimeout(scrollToOverview, 100);
-                    });
-                }
-                
-                // Disconnect observer after 6 seconds
-                setTimeout(function() {
-                    observer.disconnect();
-                }, 6000);
-            })();
-        </script>
-    """, unsafe_allow_html=True)
-    
-    # Calculate total CO2e with error handling
-    try:
-        total_co2 = sum(item.get('co2e', 0) for item in st.session_state.carbon_data)
-        # Ensure total_co2 is a valid number
-        if not isinstance(total_co2, (int, float)) or not (0 <= total_co2 <= 1000000):
-            total_co2 = 0
-    except Exception as e:
-        st.warning(f"⚠️ Error calculating total CO2: {str(e)}")
-        total_co2 = 0
+    total_co2 = view.total_co2e
     
     # Add congratulatory message if carbon emission is 0
     try:
         if abs(total_co2) < 0.1:  # Using a small epsilon to account for floating point precision
             st.markdown("""
-                <div id="congrats-message" style="
-                    position: fixed;
-                    top: 136px; /* Streamlit menubar (56px) + our menubar (80px) */
-                    left: 0;
-                    right: 0;
-                    background: rgba(46, 125, 50, 0.9);
-                    color: white;
-                    padding: 1rem;
-                    text-align: center;
-                    z-index: 998;
-                    opacity: 1;
-                    transition: opacity 0.5s ease-out;
-                ">
+                <div id="congrats-message">
                     <span style="font-size: 1.2rem;">🎉 Congratulations! Your activities have no carbon emission. Thanks for Saving our world and being a good example!!!</span>
                 </div>
-                <script>
-                    // Auto-close after 5 seconds
-                    setTimeout(function() {
-                        var element = document.getElementById('congrats-message');
-                        element.style.opacity = '0';
-                        setTimeout(function() {
-                            element.style.display = 'none';
-                        }, 500);
-                    }, 5000);
-                </script>
             """, unsafe_allow_html=True)
     except Exception as e:
         pass  # Silently handle any errors in congratulatory message
@@ -1571,6 +592,7 @@ def display_results():
     # st.markdown('<div class="carbon-label">Total Carbon Footprint</div>', unsafe_allow_html=True)
     # st.markdown(f'<div class="carbon-number">{total_co2:.2f} kg CO₂e</div>', unsafe_allow_html=True)
 
+    @st.cache_data(max_entries=64)
     def generate_dynamic_summary(co2: float) -> str:
         # Validate input
         if not isinstance(co2, (int, float)) or co2 < 0:
@@ -1580,27 +602,7 @@ def display_results():
         
         global_average = 12
         
-        # Calculate equivalents with error handling
-        try:
-            smartphones = (co2 * 1000 / 404) if co2 > 0 else 0
-            if not isinstance(smartphones, (int, float)) or smartphones < 0:
-                smartphones = 0
-        except (ZeroDivisionError, ValueError, TypeError):
-            smartphones = 0
-        
-        try:
-            tshirts = (co2 * 1000 / 190) if co2 > 0 else 0
-            if not isinstance(tshirts, (int, float)) or tshirts < 0:
-                tshirts = 0
-        except (ZeroDivisionError, ValueError, TypeError):
-            tshirts = 0
-        
-        try:
-            car_km = (co2 * 1000 / 200) if co2 > 0 else 0
-            if not isinstance(car_km, (int, float)) or car_km < 0:
-                car_km = 0
-        except (ZeroDivisionError, ValueError, TypeError):
-            car_km = 0
+        smartphones, tshirts, car_km = co2e_equivalents(co2)
         
         try:
             percent_diff = ((co2 - global_average) / global_average) * 100
@@ -1650,122 +652,8 @@ def display_results():
             status_icon = "🚨"
 
         return f"""
-        <style>
-            .summary-box {{
-                background: {bg_gradient};
-                color: white;
-                padding: 1.5rem;
-                border-radius: 20px;
-                box-shadow: 0 10px 25px rgba(0, 0, 0, 0.2);
-                font-family: 'Segoe UI', sans-serif;
-                animation: fadeIn 1s ease-in-out;
-                display: flex;
-                flex-direction: column;
-                margin: 0.5rem;
-                position: relative;
-                overflow: visible;
-            }}
-            .summary-header {{
-                display: flex;
-                align-items: center;
-                gap: 0.5rem;
-                font-size: 1.5rem;
-                font-weight: bold;
-                margin-bottom: 0.5rem;
-            }}
-            .summary-tone {{
-                font-size: 1.1rem;
-                margin-bottom: 1rem;
-            }}
-            .summary-grid {{
-                display: grid;
-                grid-template-columns: repeat(2, 1fr);
-                gap: 1rem;
-                margin-bottom: 1rem;
-                flex-grow: 1;
-            }}
-            .summary-column {{
-                background: rgba(255, 255, 255, 0.1);
-                padding: 1rem;
-                border-radius: 12px;
-                box-shadow: 0 3px 10px rgba(0,0,0,0.1);
-                display: flex;
-                flex-direction: column;
-            }}
-            .column-title {{
-                font-size: 1.1rem;
-                font-weight: bold;
-                margin-bottom: 0.8rem;
-                padding-bottom: 0.3rem;
-                border-bottom: 2px solid rgba(255, 255, 255, 0.2);
-                text-align: center;
-            }}
-            .summary-card {{
-                background: rgba(255, 255, 255, 0.05);
-                padding: 0.8rem;
-                border-radius: 8px;
-                margin-bottom: 0.8rem;
-                flex-grow: 1;
-            }}
-            .summary-card h4 {{
-                margin: 0;
-                font-size: 0.9rem;
-                font-weight: bold;
-                color: rgba(255, 255, 255, 0.9);
-            }}
-            .summary-card p {{
-                margin: 0.2rem 0 0;
-                font-size: 1.1rem;
-                font-weight: bold;
-            }}
-            .status-section {{
-                background: rgba(255, 255, 255, 0.1);
-                padding: 1rem;
-                border-radius: 12px;
-                margin-bottom: 1rem;
-                text-align: center;
-            }}
-            .status-icon {{
-                font-size: 2rem;
-                margin-bottom: 0.5rem;
-            }}
-            .status-title {{
-                font-size: 1.3rem;
-                font-weight: bold;
-                margin-bottom: 0.3rem;
-            }}
-            .status-description {{
-                font-size: 1rem;
-                opacity: 0.9;
-                margin-bottom: 0.3rem;
-            }}
-            .impact-badge {{
-                background-color: rgba(255, 255, 255, 0.2);
-                padding: 0.4rem 0.8rem;
-                border-radius: 20px;
-                display: inline-block;
-                font-weight: bold;
-                font-size: 1.4rem;
-                box-shadow: inset 0 0 5px rgba(255,255,255,0.3);
-                text-align: center;
-                margin: 0.3rem 0;
-            }}
-            .impact-footer {{
-                text-align: center;
-                font-size: 1rem;
-                margin-top: 1rem;
-                padding: 1rem 0;
-                border-top: 2px solid rgba(255, 255, 255, 0.2);
-                position: relative;
-                z-index: 1;
-            }}
-            @keyframes fadeIn {{
-                from {{ opacity: 0; transform: translateY(20px); }}
-                to {{ opacity: 1; transform: translateY(0); }}
-            }}
-        </style>
-
-        <div class="summary-box">
+        {get_asset_bundle().embedded("summary")}
+        <div class="summary-box" style="--summary-bg: {bg_gradient};">
             <div class="summary-header">🧠 Personalized Sustainability Reflection</div>
             <div class="summary-tone">{tone}</div>
 
@@ -1834,16 +722,30 @@ def display_results():
         </div>
         """
 
+    # Each section renders on its own from the view-model; charts are cached by its digest
+    render_overview(total_co2, generate_dynamic_summary(total_co2))
+    render_riskometer(total_co2)
+    render_metrics(view)
+    render_statistics(view)
+    render_activity_analysis(view)
+    render_impact_comparison(view)
+    render_explanation()
+
+@results_section("overview")
+def render_overview(total_co2: float, summary_html: str):
     # Overview Summary Section
     try:
         st.markdown('<div id="sustainability" class="section-anchor"></div>', unsafe_allow_html=True)
         if total_co2 >= 0 and total_co2 <= 1000000:  # Valid range check
-            components.html(generate_dynamic_summary(total_co2), height=1100)
+            components.html(summary_html, height=1100)
         else:
             st.warning("⚠️ Unable to display summary due to invalid data.")
     except Exception as e:
         st.warning(f"⚠️ Error displaying overview summary: {str(e)}")
-    
+
+
+@results_section("riskometer")
+def render_riskometer(total_co2: float):
     # Riskometer Section
     try:
         # Calculate risk level and fill percentage with exponential scaling
@@ -1879,68 +781,7 @@ def display_results():
             risk_level = "LOW"
             risk_color = "#4CAF50"  # Green
         
-        st.markdown("""
-            <style>
-                .riskometer-container {
-                    width: 100%;
-                    margin: 2rem 0;
-                    padding: 1rem;
-                    background: rgba(45, 45, 45, 0.8);
-                    border-radius: 15px;
-                }
-                .riskometer-title {
-                    color: #FFFFFF;
-                    font-size: 1.2rem;
-                    text-align: center;
-                    margin-bottom: 1rem;
-                }
-                .riskometer-bar-container {
-                    width: 100%;
-                    height: 30px;
-                    background: rgba(255, 255, 255, 0.1);
-                    border-radius: 15px;
-                    position: relative;
-                    overflow: hidden;
-                }
-                .riskometer-fill {
-                    height: 100%;
-                    border-radius: 15px;
-                    transition: width 1s ease-in-out;
-                }
-                .riskometer-marker {
-                    position: absolute;
-                    top: 0;
-                    height: 100%;
-                    width: 2px;
-                    background: #FFFFFF;
-                    box-shadow: 0 0 5px rgba(255, 255, 255, 0.8);
-                }
-                .riskometer-arrow {
-                    position: absolute;
-                    top: -20px;
-                    width: 0;
-                    height: 0;
-                    border-left: 10px solid transparent;
-                    border-right: 10px solid transparent;
-                    border-bottom: 20px solid #FFFFFF;
-                    transition: left 1s ease-in-out;
-                }
-                .riskometer-labels {
-                    display: flex;
-                    justify-content: space-between;
-                    margin-top: 0.5rem;
-                    color: #FFFFFF;
-                    font-size: 1rem;
-                }
-                .riskometer-level {
-                    color: #FFFFFF;
-                    font-size: 1.2rem;
-                    text-align: center;
-                    margin-top: 1rem;
-                    font-weight: bold;
-                }
-            </style>
-        """, unsafe_allow_html=True)
+        st.markdown(stylesheet("riskometer"), unsafe_allow_html=True)
         
         # Calculate arrow position based on fill percentage
         arrow_position = max(0, min(100, fill_percentage))  # Clamp between 0 and 100
@@ -1965,20 +806,24 @@ def display_results():
         """, unsafe_allow_html=True)
     except Exception as e:
         st.warning(f"⚠️ Error displaying impact level: {str(e)}")
-    
+
+
+@results_section("metrics")
+def render_metrics(view: ResultsView):
     # Metrics Section
     try:
-        # Recalculate total_co2 for metrics (in case it was modified)
-        total_co2 = sum(item.get('co2e', 0) for item in st.session_state.carbon_data)
-        if not isinstance(total_co2, (int, float)) or total_co2 < 0:
-            total_co2 = 0
+        total_co2 = view.total_co2e
+        # Mean over the days in the user's history; this analysis alone until there is one
+        daily_average = get_history_store().daily_average(current_user())
+        if daily_average is None:
+            daily_average = total_co2
         
         # Create metrics row
         col1, col2, col3 = st.columns(3)
         with col1:
             st.metric("Total Carbon Footprint", f"{total_co2:.2f} kg CO₂e")
         with col2:
-            st.metric("Daily Average", f"{total_co2/1:.2f} kg CO₂e/day")
+            st.metric("Daily Average", f"{daily_average:.2f} kg CO₂e/day", help="Mean of your last 30 days with recorded activities")
         with col3:
             global_average = 12
             try:
@@ -1994,13 +839,119 @@ def display_results():
     except Exception as e:
         st.warning(f"⚠️ Error displaying metrics: {str(e)}")
 
+
+@st.cache_data(max_entries=64)
+def category_pie_chart(results_key: str, _view: ResultsView):
+    """Category pie chart, rebuilt only when the results change"""
+    df = pd.DataFrame([total for total in _view.categories if total.co2e > 0])
+    fig_pie = px.pie(
+        df,
+        values='co2e',
+        names='category',
+        title='Carbon Footprint Distribution',
+        color='category',
+        color_discrete_map={
+            'Food': '#FF9999',
+            'Transport': '#66B2FF',
+            'Energy': '#99FF99',
+            'Shopping': '#FFCC99'
+        }
+    )
+    fig_pie.update_traces(textposition='inside', textinfo='percent+label')
+    fig_pie.update_layout(
+        showlegend=True,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.2,
+            xanchor="center",
+            x=0.5
+        ),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig_pie
+
+
+@st.cache_data(max_entries=64)
+def activity_bar_chart(results_key: str, _view: ResultsView):
+    """Per-activity bar chart, rebuilt only when the results change"""
+    # Limit number of activities shown to prevent overcrowding
+    df = pd.DataFrame(_view.positive_rows[:20])
+
+    fig_bar = px.bar(
+        df,
+        x='co2e',
+        y='text',
+        orientation='h',
+        color='category',
+        color_discrete_map={
+            'Food': '#FF9999',
+            'Transport': '#66B2FF',
+            'Energy': '#99FF99',
+            'Shopping': '#FFCC99'
+        },
+        title='Emissions by Individual Activity'
+    )
+    fig_bar.update_layout(
+        xaxis_title="CO₂e (kg)",
+        yaxis_title="Activity",
+        showlegend=True,
+        legend_title="Category",
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=-0.5,
+            xanchor="center",
+            x=0.5
+        ),
+        height=400,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    fig_bar.update_traces(texttemplate='%{x:.1f} kg', textposition='outside')
+    return fig_bar
+
+
+@st.cache_data(max_entries=64)
+def history_trend_chart(points: Tuple[Tuple[str, str, float], ...]):
+    """Stacked weekly totals per category, rebuilt only when the history changes"""
+    df = pd.DataFrame(points, columns=['week', 'category', 'co2e'])
+    fig_trend = px.bar(
+        df,
+        x='week',
+        y='co2e',
+        color='category',
+        color_discrete_map={
+            'Food': '#FF9999',
+            'Transport': '#66B2FF',
+            'Energy': '#99FF99',
+            'Shopping': '#FFCC99'
+        },
+        title='CO₂e per Week (last 12 weeks)'
+    )
+    fig_trend.update_layout(
+        xaxis_title="Week starting",
+        yaxis_title="CO₂e (kg)",
+        legend_title="Category",
+        height=350,
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+    )
+    return fig_trend
+
+
+@results_section("statistics")
+def render_statistics(view: ResultsView):
     # Statistics Section - Combined Distribution and Activities
     try:
         st.markdown('<div id="statistics" class="section-anchor"></div>', unsafe_allow_html=True)
         st.markdown('<h2 style="color: #FFFFFF; font-size: 2rem; font-weight: bold; text-align: center; margin: 2rem 0;">📊 Statistics</h2>', unsafe_allow_html=True)
         
+        total_co2 = view.total_co2e
+        
         # Validate data before creating charts
-        if not st.session_state.carbon_data:
+        if not view.rows:
             st.warning("⚠️ No data available for statistics.")
         else:
             # Create two columns for charts
@@ -2010,47 +961,13 @@ def display_results():
             with col1:
                 try:
                     st.subheader("Distribution by Category")
-                    if total_co2 > 0 and len(st.session_state.carbon_data) > 0:
+                    if total_co2 > 0:
                         # Regular pie chart for non-zero emissions
-                        df = pd.DataFrame(st.session_state.carbon_data)
-                        
-                        # Validate DataFrame
-                        if 'co2e' not in df.columns or 'category' not in df.columns:
-                            st.warning("⚠️ Missing required data columns for pie chart.")
+                        if view.positive_rows:
+                            fig_pie = category_pie_chart(view.digest, view)
+                            st.plotly_chart(fig_pie, use_container_width=True, config={'displayModeBar': False})
                         else:
-                            # Filter out invalid values
-                            df = df[df['co2e'] > 0].copy()
-                            
-                            if len(df) > 0:
-                                fig_pie = px.pie(
-                                    df,
-                                    values='co2e',
-                                    names='category',
-                                    title='Carbon Footprint Distribution',
-                                    color='category',
-                                    color_discrete_map={
-                                        'Food': '#FF9999',
-                                        'Transport': '#66B2FF',
-                                        'Energy': '#99FF99',
-                                        'Shopping': '#FFCC99'
-                                    }
-                                )
-                                fig_pie.update_traces(textposition='inside', textinfo='percent+label')
-                                fig_pie.update_layout(
-                                    showlegend=True,
-                                    legend=dict(
-                                        orientation="h",
-                                        yanchor="bottom",
-                                        y=-0.2,
-                                        xanchor="center",
-                                        x=0.5
-                                    ),
-                                    paper_bgcolor='rgba(0,0,0,0)',
-                                    plot_bgcolor='rgba(0,0,0,0)',
-                                )
-                                st.plotly_chart(fig_pie, use_container_width=True, config={'displayModeBar': False})
-                            else:
-                                st.info("No valid data points for pie chart.")
+                            st.info("No valid data points for pie chart.")
                     else:
                         # Zero emission pie chart (all green)
                         fig_pie = px.pie(
@@ -2073,54 +990,12 @@ def display_results():
             with col2:
                 try:
                     st.subheader("Emissions by Activity")
-                    if total_co2 > 0 and len(st.session_state.carbon_data) > 0:
-                        df = pd.DataFrame(st.session_state.carbon_data)
-                        
-                        # Validate DataFrame
-                        if 'co2e' not in df.columns or 'text' not in df.columns or 'category' not in df.columns:
-                            st.warning("⚠️ Missing required data columns for bar chart.")
+                    if total_co2 > 0:
+                        if view.positive_rows:
+                            fig_bar = activity_bar_chart(view.digest, view)
+                            st.plotly_chart(fig_bar, use_container_width=True)
                         else:
-                            # Filter out invalid values
-                            df = df[df['co2e'] > 0].copy()
-                            
-                            if len(df) > 0:
-                                # Limit number of activities shown to prevent overcrowding
-                                df = df.nlargest(20, 'co2e')
-                                
-                                fig_bar = px.bar(
-                                    df,
-                                    x='co2e',
-                                    y='text',
-                                    orientation='h',
-                                    color='category',
-                                    color_discrete_map={
-                                        'Food': '#FF9999',
-                                        'Transport': '#66B2FF',
-                                        'Energy': '#99FF99',
-                                        'Shopping': '#FFCC99'
-                                    },
-                                    title='Emissions by Individual Activity'
-                                )
-                                fig_bar.update_layout(
-                                    xaxis_title="CO₂e (kg)",
-                                    yaxis_title="Activity",
-                                    showlegend=True,
-                                    legend_title="Category",
-                                    legend=dict(
-                                        orientation="h",
-                                        yanchor="bottom",
-                                        y=-0.5,
-                                        xanchor="center",
-                                        x=0.5
-                                    ),
-                                    height=400,
-                                    paper_bgcolor='rgba(0,0,0,0)',
-                                    plot_bgcolor='rgba(0,0,0,0)',
-                                )
-                                fig_bar.update_traces(texttemplate='%{x:.1f} kg', textposition='outside')
-                                st.plotly_chart(fig_bar, use_container_width=True)
-                            else:
-                                st.info("No valid data points for bar chart.")
+                            st.info("No valid data points for bar chart.")
                     else:
                         # Display a message for zero emissions
                         st.markdown(
@@ -2134,131 +1009,28 @@ def display_results():
                         )
                 except Exception as e:
                     st.warning(f"⚠️ Error displaying bar chart: {str(e)}")
+
+            # Weekly trend from the history rollups
+            try:
+                points = tuple(
+                    (point.period_start, point.category, point.stats.total)
+                    for point in get_history_store().trend(current_user(), 'week', 12, by_category=True)
+                )
+                if len({start for start, _, _ in points}) > 1:
+                    st.subheader("Your Weekly Trend")
+                    st.plotly_chart(history_trend_chart(points), use_container_width=True)
+            except Exception as e:
+                st.warning(f"⚠️ Error displaying trend chart: {str(e)}")
     except Exception as e:
         st.warning(f"⚠️ Error displaying statistics section: {str(e)}")
     # st.markdown('<div class="graph-title" style="text-align: left;">Carbon Footprint by Category</div>', unsafe_allow_html=True)
     # st.plotly_chart(fig, use_container_width=True)
-   
+
+
+@results_section("activity_analysis")
+def render_activity_analysis(view: ResultsView):
     # Activity Impact Analysis Section
-    st.markdown("""
-        <style>
-            .section-header {
-                font-size: 4.5rem;
-                font-weight: bold;
-                color: #FFFFFF;
-                text-align: center;
-                margin: 2rem 0;
-                text-shadow: 2px 2px 4px rgba(0, 0, 0, 0.3);
-            }
-            .stExpander {
-                background: rgba(45, 45, 45, 0.8);
-                border-radius: 20px;
-                padding: 1rem;
-                margin: 1rem 0;
-            }
-            .stExpander > div > div > div {
-                padding: 1.5rem;
-                font-size: 1.8rem;
-                font-weight: bold;
-                color: #FFFFFF;
-                text-align: center;
-            }
-            .activity-card {
-                position: relative;
-                padding: 1rem;
-                border-radius: 12px;
-                margin-bottom: 0.8rem;
-                transition: all 0.3s ease;
-            }
-            .activity-card:hover {
-                transform: translateY(-2px);
-                box-shadow: 0 4px 8px rgba(0, 0, 0, 0.2);
-            }
-            .impact-button {
-                position: absolute;
-                top: 0.5rem;
-                right: 0.5rem;
-                padding: 0.3rem 0.8rem;
-                border-radius: 15px;
-                font-size: 0.9rem;
-                font-weight: bold;
-                border: none;
-                cursor: pointer;
-                box-shadow: 0 2px 4px rgba(0, 0, 0, 0.2);
-            }
-            .activity-line {
-                display: flex;
-                flex-wrap: wrap;
-                gap: 0.5rem;
-                margin-bottom: 0.5rem;
-                padding-right: 5rem;
-            }
-            .activity-label {
-                font-size: 0.9rem;
-                color: rgba(255, 255, 255, 0.8);
-                min-width: 80px;
-            }
-            .activity-value {
-                font-size: 1rem;
-                color: #FFFFFF;
-            }
-            .suggestion-line {
-                background: rgba(255, 255, 255, 0.1);
-                padding: 0.8rem;
-                border-radius: 8px;
-                margin-top: 0.5rem;
-            }
-            /* Impact level color themes */
-            .card-low {
-                background: linear-gradient(135deg, rgba(76, 175, 80, 0.2), rgba(45, 45, 45, 0.8));
-                border-left: 4px solid #4CAF50;
-            }
-            .card-medium {
-                background: linear-gradient(135deg, rgba(255, 193, 7, 0.2), rgba(45, 45, 45, 0.8));
-                border-left: 4px solid #FFC107;
-            }
-            .card-high {
-                background: linear-gradient(135deg, rgba(255, 87, 34, 0.2), rgba(45, 45, 45, 0.8));
-                border-left: 4px solid #FF5722;
-            }
-            .card-very-high {
-                background: linear-gradient(135deg, rgba(244, 67, 54, 0.2), rgba(45, 45, 45, 0.8));
-                border-left: 4px solid #F44336;
-            }
-            .button-low {
-                background: #4CAF50;
-                color: white;
-            }
-            .button-medium {
-                background: #FFC107;
-                color: #000000;
-            }
-            .button-high {
-                background: #FF5722;
-                color: white;
-            }
-            .button-very-high {
-                background: #F44336;
-                color: white;
-            }
-            @media (max-width: 768px) {
-                .activity-line {
-                    flex-direction: column;
-                    gap: 0.2rem;
-                    padding-right: 0;
-                }
-                .activity-label {
-                    min-width: auto;
-                }
-                .impact-button {
-                    position: relative;
-                    top: 0;
-                    right: 0;
-                    margin-bottom: 0.5rem;
-                }
-            }
-        </style>
-    """, unsafe_allow_html=True)
+    st.markdown(stylesheet("activity_analysis"), unsafe_allow_html=True)
 
     # Activity Impact Analysis Section
     try:
@@ -2267,7 +1039,7 @@ def display_results():
         st.markdown('<div class="section-header">🌱 Activity Impact Analysis</div>', unsafe_allow_html=True)
 
         # Get the number of tasks
-        num_tasks = len(st.session_state.carbon_data) if st.session_state.carbon_data else 0
+        num_tasks = len(view.rows)
 
         if num_tasks == 0:
             st.info("No activities to display.")
@@ -2275,14 +1047,10 @@ def display_results():
             # Create the expander with task count in the header
             with st.expander(f"📋 {num_tasks} Activities Analyzed", expanded=True):
                 # Create compact rows for each activity
-                for idx, activity in enumerate(st.session_state.carbon_data):
+                for activity in view.rows:
                     try:
-                        # Validate activity data
-                        if not isinstance(activity, dict):
-                            continue
-                        
                         # Map impact levels and get color class
-                        impact_level = str(activity.get('co2e_impact_level', '1')).lower()
+                        impact_level = activity.co2e_impact_level.lower()
                         impact_mapping = {
                             '1': ('LOW', 'low'),
                             '2': ('MEDIUM', 'medium'),
@@ -2296,17 +1064,7 @@ def display_results():
                         }
                         display_impact, impact_class = impact_mapping.get(impact_level, ('LOW', 'low'))
                         
-                        # Get safe values with defaults
-                        activity_text = str(activity.get("text", activity.get("activity", "Unknown Activity")))
-                        category = str(activity.get("category", "Unknown"))
-                        quantity = activity.get("quantity", 0)
-                        unit = str(activity.get("unit", ""))
-                        co2e = activity.get("co2e", 0)
-                        suggestion = str(activity.get('suggestion', 'Consider alternatives'))
-                        
-                        # Validate co2e
-                        if not isinstance(co2e, (int, float)) or co2e < 0:
-                            co2e = 0
+                        activity_text, category, quantity, unit, co2e, _, suggestion = activity
                         
                         st.markdown(f"""
                             <div class="activity-card card-{impact_class}">
@@ -2335,105 +1093,17 @@ def display_results():
     except Exception as e:
         st.warning(f"⚠️ Error displaying activity analysis: {str(e)}")
 
+
+@results_section("impact_comparison")
+def render_impact_comparison(view: ResultsView):
     # Impact comparison with colorful flash cards
     try:
-        st.markdown("""
-            <style>
-                @keyframes slideIn {
-                    from { transform: translateY(20px); opacity: 0; }
-                    to { transform: translateY(0); opacity: 1; }
-                }
-                @keyframes float {
-                    0% { transform: translateY(0px); }
-                    50% { transform: translateY(-5px); }
-                    100% { transform: translateY(0px); }
-                }
-                .impact-container {
-                    display: flex;
-                    justify-content: space-between;
-                    gap: 2rem;
-                    padding: 2rem;
-                    margin: 2rem 0;
-                }
-                .impact-card {
-                    flex: 1;
-                    border-radius: 15px;
-                    padding: 2rem;
-                    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-                    animation: slideIn 0.5s ease-out;
-                    transition: all 0.3s ease;
-                    min-width: 250px;
-                    display: flex;
-                    flex-direction: column;
-                    align-items: center;
-                    text-align: center;
-                }
-                .impact-card:hover {
-                    transform: translateY(-5px);
-                    box-shadow: 0 6px 12px rgba(0, 0, 0, 0.15);
-                }
-                .impact-icon {
-                    font-size: 2.5rem;
-                    margin-bottom: 1.5rem;
-                    animation: float 3s ease-in-out infinite;
-                }
-                .impact-title {
-                    font-size: 1.2rem;
-                    font-weight: bold;
-                    margin-bottom: 1rem;
-                    color: #FFFFFF;
-                }
-                .impact-value {
-                    font-size: 2.5rem;
-                    font-weight: bold;
-                    margin: 1.5rem 0;
-                    color: #FFFFFF;
-                }
-                .impact-description {
-                    font-size: 1.2rem;
-                    color: rgba(255, 255, 255, 0.9);
-                    margin-top: 1.5rem;
-                }
-                .impact-card-1 {
-                    background: linear-gradient(135deg, #FF6B6B 0%, #FF8E8E 100%);
-                }
-                .impact-card-2 {
-                    background: linear-gradient(135deg, #4ECDC4 0%, #6EE7E7 100%);
-                }
-                .impact-card-3 {
-                    background: linear-gradient(135deg, #45B7D1 0%, #7AD7F0 100%);
-                }
-            </style>
-        """, unsafe_allow_html=True)
+        st.markdown(stylesheet("impact_comparison"), unsafe_allow_html=True)
         
         st.header("🌍 Impact Comparison")
         st.markdown('<div class="impact-container">', unsafe_allow_html=True)
         
-        # Validate total_co2 before calculations
-        if not isinstance(total_co2, (int, float)) or total_co2 < 0:
-            total_co2 = 0
-        
-        # Calculate equivalents with error handling
-        try:
-            smartphones = (total_co2 * 1000 / 404) if total_co2 > 0 else 0
-            if not isinstance(smartphones, (int, float)) or smartphones < 0:
-                smartphones = 0
-        except (ZeroDivisionError, ValueError, TypeError):
-            smartphones = 0
-        
-        try:
-            tshirts = (total_co2 * 1000 / 190) if total_co2 > 0 else 0
-            if not isinstance(tshirts, (int, float)) or tshirts < 0:
-                tshirts = 0
-        except (ZeroDivisionError, ValueError, TypeError):
-            tshirts = 0
-        
-        try:
-            car_km = (total_co2 * 1000 / 200) if total_co2 > 0 else 0
-            if not isinstance(car_km, (int, float)) or car_km < 0:
-                car_km = 0
-        except (ZeroDivisionError, ValueError, TypeError):
-            car_km = 0
+        smartphones, tshirts, car_km = view.equivalents
         
         # Smartphones card
         st.markdown(f"""
@@ -2468,30 +1138,14 @@ def display_results():
         st.markdown('</div>', unsafe_allow_html=True)
     except Exception as e:
         st.warning(f"⚠️ Error displaying impact comparison: {str(e)}")
-    
+
+
+@results_section("explanation")
+def render_explanation():
     # Detailed Explanation Section
     try:
+        st.markdown(stylesheet("explanation"), unsafe_allow_html=True)
         st.markdown("""
-            <style>
-                .summary-section {
-                    margin-top: 2rem;
-                    background: rgba(45, 45, 45, 0.9);
-                    padding: 2rem;
-                    border-radius: 20px;
-                    box-shadow: 0 4px 15px rgba(0, 0, 0, 0.2);
-                }
-                .summary-title {
-                    font-size: 1.8rem;
-                    font-weight: bold;
-                    margin-bottom: 1rem;
-                    color: #E8F5E9;
-                }
-                .summary-text {
-                    font-size: 1.1rem;
-                    line-height: 1.6;
-                    color: #FFFFFF;
-                }
-            </style>
             <div class="summary-section">
                 <div class="summary-title">📘 What Do These Equivalents Mean?</div>
                 <div class="summary-text">
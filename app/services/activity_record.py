@@ -0,0 +1,273 @@
+import logging
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Field order shared by ActivityRecord, ActivityRecordView and ActivityBatch
+RECORD_FIELDS = (
+    'text', 'category', 'type', 'quantity', 'unit', 'co2e_per_unit',
+    'factor_source', 'co2e', 'co2e_impact_level', 'suggestion',
+)
+# Stored as float64 arrays; missing values are NaN
+NUMERIC_FIELDS = ('quantity', 'co2e_per_unit', 'co2e')
+# Low-cardinality labels, stored dictionary-encoded (int codes + one copy of each label)
+CATEGORICAL_FIELDS = ('category', 'type', 'unit', 'factor_source', 'co2e_impact_level')
+# Free text, stored as object arrays
+TEXT_FIELDS = ('text', 'suggestion')
+
+
+def _first(data: Dict, *keys: str) -> Any:
+    for key in keys:
+        value = data.get(key)
+        if value is not None:
+            return value
+    return None
+
+
+class ActivityRecord:
+    """
+    One analyzed activity.
+
+    Uses ``__slots__`` so a record costs a fixed handful of pointers instead
+    of a per-instance dict; the model's and the calculator's key names
+    (``activity``/``text``, ``type_obj``/``type``) are reconciled once in
+    ``from_dict``.
+    """
+
+    __slots__ = RECORD_FIELDS
+
+    def __init__(self, text: str, category: Optional[str] = None, type: Optional[str] = None,
+                 quantity: float = float('nan'), unit: Optional[str] = None,
+                 co2e_per_unit: float = float('nan'), factor_source: Optional[str] = None,
+                 co2e: float = float('nan'), co2e_impact_level: Optional[str] = None,
+                 suggestion: Optional[str] = None):
+        self.text = text
+        self.category = category
+        self.type = type
+        self.quantity = quantity
+        self.unit = unit
+        self.co2e_per_unit = co2e_per_unit
+        self.factor_source = factor_source
+        self.co2e = co2e
+        self.co2e_impact_level = co2e_impact_level
+        self.suggestion = suggestion
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ActivityRecord":
+        """
+        Build a record from a model or calculator activity dict.
+
+        Args:
+            data (Dict): Activity with either model keys (activity, type_obj)
+                or result keys (text, type).
+
+        Returns:
+            ActivityRecord: The record; absent numbers become NaN.
+        """
+        values = {
+            'text': _first(data, 'text', 'activity'),
+            'type': _first(data, 'type', 'type_obj'),
+        }
+        for field in RECORD_FIELDS:
+            if field not in values:
+                values[field] = data.get(field)
+        for field in NUMERIC_FIELDS:
+            values[field] = _to_float(values[field])
+        return cls(**values)
+
+    def to_dict(self) -> Dict:
+        """Plain dict with the result keys used by the UI and the API."""
+        return {field: getattr(self, field) for field in RECORD_FIELDS}
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, (ActivityRecord, ActivityRecordView)):
+            return NotImplemented
+        return all(_same(getattr(self, field), getattr(other, field)) for field in RECORD_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"ActivityRecord(text={self.text!r}, category={self.category!r}, co2e={self.co2e!r})"
+
+
+class ActivityRecordView:
+    """
+    Read-only record interface over one row of an ActivityBatch.
+
+    Holds only the batch and a row number; attribute reads go straight to
+    the batch columns, so iterating a batch never copies its data.
+    """
+
+    __slots__ = ('_batch', '_row')
+
+    def __init__(self, batch: "ActivityBatch", row: int):
+        self._batch = batch
+        self._row = row
+
+    def __getattr__(self, name: str) -> Any:
+        if name not in RECORD_FIELDS:
+            raise AttributeError(name)
+        return self._batch.value(name, self._row)
+
+    def to_record(self) -> ActivityRecord:
+        """Copy the row out into a standalone ActivityRecord."""
+        return ActivityRecord(**{field: getattr(self, field) for field in RECORD_FIELDS})
+
+    def to_dict(self) -> Dict:
+        return {field: getattr(self, field) for field in RECORD_FIELDS}
+
+    __eq__ = ActivityRecord.__eq__
+
+    def __repr__(self) -> str:
+        return f"ActivityRecordView(row={self._row}, text={self.text!r}, co2e={self.co2e!r})"
+
+
+class ActivityBatch:
+    """
+    Columnar (struct-of-arrays) store for many activities.
+
+    Numbers live in float64 arrays, repeated labels such as category and unit
+    are dictionary-encoded, and only the free text keeps one object per row.
+    ``to_frame`` and ``from_frame`` hand the same arrays to and from pandas
+    without copying, and indexing returns ActivityRecordView rows.
+    """
+
+    def __init__(self, columns: Dict[str, Union[np.ndarray, pd.Categorical]]):
+        lengths = {len(column) for column in columns.values()}
+        if len(lengths) > 1:
+            raise ValueError(f"Columns have different lengths: {sorted(lengths)}")
+        missing = set(RECORD_FIELDS) - set(columns)
+        if missing:
+            raise ValueError(f"Missing columns: {sorted(missing)}")
+        self.columns = columns
+        self._length = lengths.pop() if lengths else 0
+        # Categorical codes/labels pulled out once so row reads stay cheap
+        self._labels = {
+            field: (columns[field].codes, columns[field].categories.to_numpy(dtype=object))
+            for field in CATEGORICAL_FIELDS
+        }
+
+    @classmethod
+    def from_records(cls, records: Iterable[Union[ActivityRecord, Dict]]) -> "ActivityBatch":
+        """
+        Pack records or activity dicts into columns.
+
+        Args:
+            records: ActivityRecord instances, views or activity dicts.
+
+        Returns:
+            ActivityBatch: The packed batch.
+        """
+        records = [record if not isinstance(record, dict) else ActivityRecord.from_dict(record)
+                   for record in records]
+        columns = {}
+        for field in RECORD_FIELDS:
+            values = [getattr(record, field) for record in records]
+            columns[field] = _column(field, values)
+        return cls(columns)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "ActivityBatch":
+        """
+        Wrap the columns of a DataFrame, e.g. the output of CarbonCalculator.calculate_batch.
+
+        Columns already in the batch dtype (float64, categorical, object) are
+        shared rather than copied; ``activity``/``type_obj`` are accepted for
+        ``text``/``type`` and absent columns are filled with missing values.
+
+        Args:
+            frame (pd.DataFrame): Activities, one per row.
+
+        Returns:
+            ActivityBatch: A batch over the frame's data.
+        """
+        aliases = {'text': ('text', 'activity'), 'type': ('type', 'type_obj')}
+        columns = {}
+        for field in RECORD_FIELDS:
+            source = next((name for name in aliases.get(field, (field,)) if name in frame.columns), None)
+            if source is None:
+                columns[field] = _column(field, [None] * len(frame))
+            else:
+                columns[field] = _column(field, frame[source])
+        return cls(columns)
+
+    def to_frame(self) -> pd.DataFrame:
+        """DataFrame over the batch columns, sharing their memory."""
+        return pd.DataFrame({field: self.columns[field] for field in RECORD_FIELDS}, copy=False)
+
+    def value(self, field: str, row: int) -> Any:
+        """Single cell, decoded to the plain Python value."""
+        if field in CATEGORICAL_FIELDS:
+            codes, labels = self._labels[field]
+            code = codes[row]
+            return labels[code] if code >= 0 else None
+        value = self.columns[field][row]
+        return float(value) if field in NUMERIC_FIELDS else value
+
+    def to_dicts(self) -> List[Dict]:
+        """Materialize every row as a result dict."""
+        return [view.to_dict() for view in self]
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the columns, including the strings."""
+        total = 0
+        for field in RECORD_FIELDS:
+            column = self.columns[field]
+            if field in CATEGORICAL_FIELDS:
+                total += column.codes.nbytes + _object_nbytes(self._labels[field][1])
+            elif field in NUMERIC_FIELDS:
+                total += column.nbytes
+            else:
+                total += _object_nbytes(column)
+        return total
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, row: int) -> ActivityRecordView:
+        if row < 0:
+            row += self._length
+        if not 0 <= row < self._length:
+            raise IndexError(row)
+        return ActivityRecordView(self, row)
+
+    def __iter__(self) -> Iterator[ActivityRecordView]:
+        return (ActivityRecordView(self, row) for row in range(self._length))
+
+
+def _to_float(value: Any) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and np.isnan(a) and np.isnan(b):
+        return True
+    return a == b
+
+
+def _column(field: str, values: Union[List, pd.Series]) -> Union[np.ndarray, pd.Categorical]:
+    if field in NUMERIC_FIELDS:
+        if isinstance(values, pd.Series) and values.dtype == np.float64:
+            return values.to_numpy(copy=False)
+        return pd.to_numeric(pd.Series(values, dtype=object), errors='coerce').to_numpy(dtype=np.float64)
+    if field in CATEGORICAL_FIELDS:
+        if isinstance(values, pd.Series) and isinstance(values.dtype, pd.CategoricalDtype):
+            return values.array
+        series = pd.Series(values, dtype=object)
+        return pd.Categorical(series.where(series.notna(), None))
+    if isinstance(values, pd.Series) and values.dtype == object:
+        return values.to_numpy(copy=False)
+    column = np.empty(len(values), dtype=object)
+    column[:] = list(values)
+    return column
+
+
+def _object_nbytes(column: np.ndarray) -> int:
+    # Pointer array plus each distinct string object once
+    seen = {id(value): value for value in column}
+    return column.nbytes + sum(sys.getsizeof(value) for value in seen.values())
@@ -0,0 +1,229 @@
+import logging
+import os
+import time
+from typing import IO, Any, Dict, Iterable, Iterator, NamedTuple, Optional, Union
+
+import pandas as pd
+
+from .carbon_service import CarbonCalculator
+
+logger = logging.getLogger(__name__)
+
+# Columns every chunk must have once the mapping is applied
+INGEST_FIELDS = ('category', 'type', 'activity', 'unit', 'quantity')
+DEFAULT_CHUNK_ROWS = 50_000
+FORMATS = ('csv', 'parquet')
+
+Source = Union[str, IO]
+
+
+class ColumnMapping(NamedTuple):
+    """
+    How the columns of an exported log map onto activity fields.
+
+    ``columns`` renames source columns (e.g. ``{"Litres": "quantity"}``) and
+    ``constants`` fills fields the file does not carry (e.g. every row of a
+    fuel log is in ``litres``).
+    """
+    columns: Dict[str, str]
+    constants: Dict[str, Any]
+
+    @classmethod
+    def parse(cls, columns: Iterable[str] = (), constants: Iterable[str] = ()) -> "ColumnMapping":
+        """
+        Build a mapping from ``source=field`` and ``field=value`` strings.
+
+        Args:
+            columns: Column renames, e.g. ["Fuel Type=activity", "Litres=quantity"]
+            constants: Fixed values, e.g. ["category=Fuels", "unit=litres"]
+
+        Returns:
+            ColumnMapping: The parsed mapping
+        """
+        renames = dict(_split_pair(item) for item in columns)
+        fixed = dict(_split_pair(item) for item in constants)
+        unknown = (set(renames.values()) | set(fixed)) - set(INGEST_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown activity fields: {', '.join(sorted(unknown))}; expected {', '.join(INGEST_FIELDS)}")
+        return cls(renames, fixed)
+
+    def apply(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """Rename and fill one chunk; raises ValueError if a field is still missing."""
+        frame = chunk.rename(columns=self.columns)
+        if self.constants:
+            frame = frame.assign(**self.constants)
+        missing = [field for field in INGEST_FIELDS if field not in frame.columns]
+        if missing:
+            raise ValueError(f"Missing activity fields after mapping: {', '.join(missing)}")
+        return frame
+
+
+class IngestStats:
+    """Running totals of a bulk ingest."""
+
+    def __init__(self):
+        self.rows = 0
+        self.matched = 0
+        # Of the matched rows, those priced from a fuzzy match onto another table activity
+        self.fuzzy = 0
+        self.co2e = 0.0
+        self.chunks = 0
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            'rows': self.rows,
+            'matched': self.matched,
+            'unmatched': self.rows - self.matched,
+            'fuzzy': self.fuzzy,
+            'co2e': self.co2e,
+            'chunks': self.chunks,
+            'seconds': self.seconds,
+            'rows_per_second': self.rows_per_second,
+        }
+
+
+def detect_format(name: Optional[str]) -> str:
+    """File format from a file name's extension, defaulting to CSV."""
+    if name and os.path.splitext(name)[1].lower() in ('.parquet', '.pq'):
+        return 'parquet'
+    return 'csv'
+
+
+def read_chunks(source: Source, fmt: str = 'csv', chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Read a CSV or Parquet file as DataFrames of at most ``chunk_rows`` rows.
+
+    Only one chunk is held in memory at a time. Parquet needs pyarrow.
+
+    Args:
+        source: Path or binary file object
+        fmt (str): "csv" or "parquet"
+        chunk_rows (int): Rows per chunk
+
+    Returns:
+        Iterator[pd.DataFrame]: The chunks in file order
+    """
+    if fmt == 'csv':
+        with pd.read_csv(source, chunksize=chunk_rows) as reader:
+            yield from reader
+    elif fmt == 'parquet':
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Parquet ingest requires pyarrow: pip install pyarrow") from e
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported format: {fmt}; expected one of {', '.join(FORMATS)}")
+
+
+def ingest_chunks(source: Source, calculator: CarbonCalculator, mapping: ColumnMapping,
+                  fmt: str = 'csv', chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                  stats: Optional[IngestStats] = None) -> Iterator[pd.DataFrame]:
+    """
+    Compute the footprint of a log file chunk by chunk, without calling the model.
+
+    Each chunk is mapped onto activity fields and run through
+    CarbonCalculator.calculate_batch, so factors (and unit conversions) come
+    from the local emission factor table only. Rows the table only matches
+    fuzzily are priced from the closest activity, marked ``factor_source``
+    "fuzzy" with the activity used in ``matched_activity``, and counted in
+    ``stats.fuzzy``.
+
+    Args:
+        source: Path or binary file object
+        calculator (CarbonCalculator): Calculator with local factors enabled
+        mapping (ColumnMapping): Column mapping for the file
+        fmt (str): "csv" or "parquet"
+        chunk_rows (int): Rows per chunk
+        stats (Optional[IngestStats]): Updated as chunks are produced
+
+    Returns:
+        Iterator[pd.DataFrame]: calculate_batch output per chunk
+    """
+    stats = stats if stats is not None else IngestStats()
+    # Reading and computing are timed; time spent by the consumer between chunks is not
+    started = time.perf_counter()
+    for chunk in read_chunks(source, fmt, chunk_rows):
+        result = calculator.calculate_batch(mapping.apply(chunk))
+        stats.rows += len(result)
+        stats.matched += int(result['has_factor'].sum())
+        stats.fuzzy += int((result['has_factor'] & (result['factor_source'] == 'fuzzy')).sum())
+        stats.co2e += float(result['co2e'].sum())
+        stats.chunks += 1
+        stats.seconds += time.perf_counter() - started
+        yield result
+        started = time.perf_counter()
+
+
+class ChunkWriter:
+    """Appends result chunks to a CSV or Parquet file as they are produced."""
+
+    def __init__(self, path: str, fmt: Optional[str] = None):
+        self.path = path
+        self.fmt = fmt or detect_format(path)
+        self._parquet = None
+        self._started = False
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.fmt == 'csv':
+            chunk.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table.cast(self._parquet.schema))
+        self._started = True
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def ingest_file(source: Source, destination: str, calculator: CarbonCalculator, mapping: ColumnMapping,
+                fmt: Optional[str] = None, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> IngestStats:
+    """
+    Ingest a whole log file and write the per-row footprint to ``destination``.
+
+    Memory stays bounded by ``chunk_rows`` whatever the file size.
+
+    Args:
+        source: Path or binary file object
+        destination (str): Output path; .parquet/.pq writes Parquet, anything else CSV
+        calculator (CarbonCalculator): Calculator with local factors enabled
+        mapping (ColumnMapping): Column mapping for the file
+        fmt (Optional[str]): Input format, detected from the source name when omitted
+        chunk_rows (int): Rows per chunk
+
+    Returns:
+        IngestStats: Row counts, total CO2e and throughput
+    """
+    fmt = fmt or detect_format(source if isinstance(source, str) else getattr(source, 'name', None))
+    stats = IngestStats()
+    with ChunkWriter(destination) as writer:
+        for result in ingest_chunks(source, calculator, mapping, fmt, chunk_rows, stats):
+            started = time.perf_counter()
+            writer.write(result)
+            stats.seconds += time.perf_counter() - started
+    logger.info(f"Ingested {stats.rows} rows ({stats.matched} with a factor, {stats.fuzzy} of them fuzzy) at {stats.rows_per_second:,.0f} rows/s")
+    return stats
+
+
+def _split_pair(item: str):
+    key, sep, value = item.partition('=')
+    if not sep or not key.strip() or not value.strip():
+        raise ValueError(f"Expected NAME=VALUE, got {item!r}")
+    return key.strip(), value.strip()
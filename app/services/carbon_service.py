@@ -1,23 +1,19 @@
+import numpy as np
 import pandas as pd
 import os
-from typing import Dict, List
+from typing import Any, Dict, List, Optional, Union
 import re
 import logging
-import sys
-from dotenv import load_dotenv
-
-# Add the parent directory to system path to allow imports from app directory
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from genai_model import GenAIModel
+import threading
+from .activity_record import ActivityBatch, ActivityRecord
+from .emission_factors import EmissionFactorIndex, FactorMatch, labels_agree, tokenize
 
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv("env1.env")
+EMISSION_FACTOR_PATH = os.path.join('data', 'emission_factor.csv')
 
-# Initialize GenAI Model
-API_KEY = os.getenv("GOOGLE_API_KEY")
-genai_model = GenAIModel(api_key=API_KEY)
+# Columns identifying the factor of an activity in a batch frame
+FACTOR_KEY_COLUMNS = ['category', 'type', 'activity', 'unit']
 
 # Define the suggestion schema
 SUGGESTION_SCHEMA = {
@@ -33,37 +29,158 @@ SUGGESTION_SCHEMA = {
     "required": ["suggestions"]
 }
 
-class CarbonCalculator:
-    def __init__(self):
-        try:
-            self.emission_factors = pd.read_csv('data/emission_factor.csv')
+def is_trusted_match(
+    match: FactorMatch, category: Optional[str], type_: Optional[str], activity: Optional[str]
+) -> bool:
+    """
+    Whether a local factor may replace the model's: an exact key match, or the same
+    activity name (up to case, punctuation and plurals) and labels through a unit conversion.
+
+    Fuzzy matches onto another activity ("Beef" -> Beef Burger) or onto the same name
+    in another category/type ("Small" car -> "Small" motorbike) are not trusted.
+    """
+    return match.exact or (
+        tokenize(match.activity) == tokenize(activity) and labels_agree(match, category, type_)
+    )
+
+
+class FactorRegistry:
+    """
+    Process-wide holder of the emission factor table and its lookup index.
+
+    The CSV is parsed once and re-parsed only when its modification time
+    changes, so every caller shares one warm copy.
+    """
+
+    def __init__(self, path: str = EMISSION_FACTOR_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._emission_factors: Optional[pd.DataFrame] = None
+        self._index: Optional[EmissionFactorIndex] = None
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Reload the table if the file changed since it was last parsed."""
+        mtime = os.stat(self.path).st_mtime
+        if mtime == self._mtime:
+            return
+        with self._lock:
+            if mtime == self._mtime:
+                return
+            try:
+                emission_factors = pd.read_csv(self.path)
+                index = EmissionFactorIndex(emission_factors)
+            except Exception as e:
+                logger.error(f"Failed to load emission factors: {str(e)}")
+                raise
+            self._emission_factors, self._index, self._mtime = emission_factors, index, mtime
             logger.info("Successfully loaded emission factors")
-        except Exception as e:
-            logger.error(f"Failed to load emission factors: {str(e)}")
-            raise
+
+    @property
+    def emission_factors(self) -> pd.DataFrame:
+        self.refresh()
+        return self._emission_factors
+
+    @property
+    def index(self) -> EmissionFactorIndex:
+        self.refresh()
+        return self._index
+
+
+_registry: Optional[FactorRegistry] = None
+_calculator: Optional["CarbonCalculator"] = None
+_singleton_lock = threading.RLock()
+
+
+def get_factor_registry() -> FactorRegistry:
+    """Return the shared factor registry, loading it on first use."""
+    global _registry
+    if _registry is None:
+        with _singleton_lock:
+            if _registry is None:
+                _registry = FactorRegistry()
+    return _registry
+
+
+def get_carbon_calculator() -> "CarbonCalculator":
+    """Return the shared calculator backed by the shared factor registry."""
+    global _calculator
+    if _calculator is None:
+        with _singleton_lock:
+            if _calculator is None:
+                _calculator = CarbonCalculator()
+    return _calculator
+
+
+class CarbonCalculator:
+    def __init__(self, use_local_factors: bool = True, registry: Optional[FactorRegistry] = None):
+        """
+        Args:
+            use_local_factors (bool): Prefer factors from data/emission_factor.csv over model estimates
+            registry (Optional[FactorRegistry]): Factor table source, the shared registry by default
+        """
+        self.registry = registry if registry is not None else get_factor_registry()
+        self.use_local_factors = use_local_factors
+
+    @property
+    def emission_factors(self) -> pd.DataFrame:
+        return self.registry.emission_factors
+
+    @property
+    def factor_index(self) -> EmissionFactorIndex:
+        return self.registry.index
+
+    def resolve_factor(self, activity: Dict):
+        """
+        Return (co2e_per_unit, source) for an activity, or (None, None) if no factor is known.
+
+        A trusted local factor (see is_trusted_match) wins over the model's; a fuzzy
+        local match is only used when the model gave no factor, with source "fuzzy".
+        """
+        type_label = activity.get('type_obj', activity.get('type'))
+        match = None
+        if self.use_local_factors:
+            match = self.factor_index.resolve(
+                activity.get('category'), type_label, activity.get('activity'), activity.get('unit')
+            )
+            if match is not None and is_trusted_match(match, activity.get('category'), type_label, activity.get('activity')):
+                return match.co2e_per_unit, 'local'
+        co2e_per_unit = activity.get('co2e_per_unit')
+        if co2e_per_unit is not None and co2e_per_unit != 'NA':
+            return co2e_per_unit, 'model'
+        if match is not None:
+            return match.co2e_per_unit, 'fuzzy'
+        return None, None
     
     def calculate_carbon_footprint(self, activities: List[Dict]) -> List[Dict]:
         """Calculate carbon footprint for a list of activities"""
+        return [record.to_dict() for record in self.calculate_records(activities)]
+
+    def calculate_records(self, activities: List[Dict]) -> List[ActivityRecord]:
+        """Calculate carbon footprint for a list of activities, returning typed records"""
         results = []
         
         try:
             for activity in activities:
                 try:
-                    if activity['co2e_per_unit'] is not None and activity['co2e_per_unit']!='NA':
-                        co2e = float(activity['quantity']) * float(activity['co2e_per_unit'])
-                        results.append({
-                            'text': activity['activity'],
-                            'category': activity['category'],
-                            'type': activity['type_obj'],
-                            'co2e_per_unit': activity['co2e_per_unit'],
-                            'co2e': co2e,
-                            'quantity': activity['quantity'],
-                            'unit': activity['unit'],
-                            'co2e_impact_level': activity['co2e_impact_level'],
-                            'suggestion': activity['suggestion']
-                        })
+                    co2e_per_unit, factor_source = self.resolve_factor(activity)
+                    if co2e_per_unit is not None:
+                        co2e = float(activity['quantity']) * float(co2e_per_unit)
+                        results.append(ActivityRecord(
+                            text=activity['activity'],
+                            category=activity['category'],
+                            type=activity.get('type_obj', activity.get('type')),
+                            co2e_per_unit=co2e_per_unit,
+                            factor_source=factor_source,
+                            co2e=co2e,
+                            quantity=activity['quantity'],
+                            unit=activity['unit'],
+                            co2e_impact_level=activity.get('co2e_impact_level', 'LOW'),
+                            suggestion=activity.get('suggestion', '')
+                        ))
                     else:
-                        logger.warning(f"No emission factor found for activity: {activity['text']}")
+                        logger.warning(f"No emission factor found for activity: {activity.get('activity')}")
                 except Exception as e:
                     logger.error(f"Error processing activity {activity}: {str(e)}")
                     continue
@@ -75,5 +192,86 @@ class CarbonCalculator:
         except Exception as e:
             logger.error(f"Error in calculate_carbon_footprint: {str(e)}")
             raise
-    
-    
\ No newline at end of file
+
+    def calculate_batch(self, activities: Union[List[Dict], pd.DataFrame, Any]) -> pd.DataFrame:
+        """
+        Calculate carbon footprint for many activities in one vectorized pass.
+
+        Factors are resolved once per distinct (category, type, activity, unit)
+        key and broadcast to the rows, preferred as in resolve_factor; rows
+        without a usable factor or quantity are flagged in the ``has_factor``
+        mask instead of raising. Rows priced from the table name the table
+        activity in ``matched_activity``, so fuzzy matches can be checked.
+
+        Args:
+            activities: List of activity dicts, a DataFrame, an ActivityBatch or a pyarrow Table
+
+        Returns:
+            pd.DataFrame: Input columns plus co2e_per_unit, factor_source (local, fuzzy or model),
+                matched_activity, co2e and has_factor
+        """
+        frame = self._activity_frame(activities)
+        rows = len(frame)
+
+        quantity = pd.to_numeric(frame['quantity'], errors='coerce').to_numpy(dtype=float)
+        model_factor = pd.to_numeric(frame['co2e_per_unit'], errors='coerce').to_numpy(dtype=float)
+
+        trusted_factor = np.full(rows, np.nan)
+        fuzzy_factor = np.full(rows, np.nan)
+        matched_activity = np.full(rows, None, dtype=object)
+        if self.use_local_factors and rows:
+            # Combine per-column codes into one key code per row
+            key_codes = np.zeros(rows, dtype=np.int64)
+            for column in FACTOR_KEY_COLUMNS:
+                codes, uniques = pd.factorize(frame[column], use_na_sentinel=False)
+                key_codes = key_codes * (len(uniques) + 1) + codes
+            _, first_rows, inverse = np.unique(key_codes, return_index=True, return_inverse=True)
+            index = self.factor_index
+            key_values = frame[FACTOR_KEY_COLUMNS].to_numpy()[first_rows]
+            matches = [index.resolve(*key) for key in key_values]
+            trusted = np.array([
+                match.co2e_per_unit if match is not None and is_trusted_match(match, *key[:3]) else np.nan
+                for match, key in zip(matches, key_values)
+            ], dtype=float)
+            fuzzy = np.array([getattr(match, 'co2e_per_unit', np.nan) for match in matches], dtype=float)
+            activities = np.array([getattr(match, 'activity', None) for match in matches], dtype=object)
+            trusted_factor, fuzzy_factor = trusted[inverse], fuzzy[inverse]
+            matched_activity = activities[inverse]
+
+        is_trusted = ~np.isnan(trusted_factor)
+        is_local = is_trusted | (np.isnan(model_factor) & ~np.isnan(fuzzy_factor))
+        factor = np.where(is_trusted, trusted_factor, np.where(is_local, fuzzy_factor, model_factor))
+        has_factor = ~np.isnan(factor) & ~np.isnan(quantity)
+
+        result = frame.copy()
+        result['co2e_per_unit'] = factor
+        result['factor_source'] = np.where(
+            is_trusted, 'local', np.where(is_local, 'fuzzy', np.where(np.isnan(model_factor), None, 'model'))
+        )
+        result['matched_activity'] = np.where(is_local, matched_activity, None)
+        result['co2e'] = np.where(has_factor, quantity * factor, np.nan)
+        result['has_factor'] = has_factor
+
+        missing = rows - int(has_factor.sum())
+        if missing:
+            logger.warning(f"No emission factor found for {missing} of {rows} activities")
+        return result
+
+    @staticmethod
+    def _activity_frame(activities: Union[List[Dict], pd.DataFrame, Any]) -> pd.DataFrame:
+        if isinstance(activities, pd.DataFrame):
+            frame = activities
+        elif isinstance(activities, ActivityBatch):
+            frame = activities.to_frame().rename(columns={'text': 'activity'}, copy=False)
+        elif hasattr(activities, 'to_pandas'):
+            frame = activities.to_pandas()
+        else:
+            frame = pd.DataFrame.from_records(list(activities))
+        if 'type_obj' in frame.columns:
+            type_labels = frame['type_obj'] if 'type' not in frame.columns else frame['type'].fillna(frame['type_obj'])
+            frame = frame.drop(columns=['type_obj']).assign(type=type_labels)
+        # 'NA' strings and missing columns both become NaN factors
+        for column in FACTOR_KEY_COLUMNS + ['quantity', 'co2e_per_unit']:
+            if column not in frame.columns:
+                frame = frame.assign(**{column: np.nan})
+        return frame
@@ -0,0 +1,316 @@
+import json
+import logging
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .emission_factors import STOPWORDS, _stem
+
+logger = logging.getLogger(__name__)
+
+# Words that do not change which activity a clause describes
+CLAUSE_FILLERS = frozenset({
+    "i", "me", "my", "we", "our", "had", "have", "ate", "eaten", "drank", "took", "got", "went",
+    "did", "today", "yesterday", "this", "morning", "afternoon", "evening", "just", "some", "also",
+})
+
+# "and" and commas only start a new clause when a verb follows them, so "fish and chips"
+# and "drove to work, about 20 km" stay whole
+ACTIVITY_VERBS = (
+    "ate", "had", "drank", "drove", "took", "rode", "flew", "used", "burned", "bought", "cooked",
+    "walked", "cycled", "caught", "boarded", "travelled", "traveled", "heated", "ran", "consumed",
+)
+_VERB_AHEAD = r"(?=(?:i\s+|we\s+|and\s+|then\s+)*(?:%s)\b)" % "|".join(ACTIVITY_VERBS)
+# A full stop before a digit is a decimal point, not a clause break ("0.5 kg")
+CLAUSE_BREAK = re.compile(
+    r"(?:[;!?\n]|\.(?!\d))+|,\s*%s|\b(?:and then|then|after that|afterwards|plus)\b|\band\s+%s"
+    % (_VERB_AHEAD, _VERB_AHEAD),
+    re.IGNORECASE,
+)
+_ACTIVITY_VERB = re.compile(r"\b(?:%s)\b" % "|".join(ACTIVITY_VERBS), re.IGNORECASE)
+# A fragment without a verb that starts like this only qualifies the clause before it ("About 20 km.")
+_CONTINUATION = re.compile(
+    r"^(?:\d|(?:about|around|roughly|approximately|approx|nearly|almost|over|under|for|of|with|in|at|to|"
+    r"from|by|each|which|that|so|total|altogether)\b)",
+    re.IGNORECASE,
+)
+# Decimals stay one token, and "20km" splits into "20" and "km"
+CLAUSE_TOKEN = re.compile(r"\d+(?:\.\d+)?|[a-z%]+")
+# Words that state a count on their own ("a coffee", "two bananas")
+COUNT_WORDS = frozenset({
+    "a", "an", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "couple", "dozen", "half",
+})
+
+DEFAULT_THRESHOLD = 0.8
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+SHINGLE_SIZE = 3
+DEFAULT_MAX_CLAUSES = 10_000
+
+# Universal hashing modulus, a prime just above 2**32
+_PRIME = np.uint64(4294967311)
+
+
+def split_clauses(text: str) -> List[str]:
+    """
+    Split a free-text day description into activity clauses, in order.
+
+    Breaks on sentence punctuation, "then"/"plus" and on commas or "and"
+    followed by an activity verb. A fragment that only qualifies the clause
+    before it (no verb, starts with a number or "about", "for", ...) is
+    joined back to that clause, so a quantity stays with its activity.
+    """
+    clauses: List[str] = []
+    for fragment in CLAUSE_BREAK.split(text or ""):
+        fragment = fragment.strip() if fragment else ""
+        if not fragment:
+            continue
+        if clauses and _CONTINUATION.match(fragment) and not _ACTIVITY_VERB.search(fragment):
+            clauses[-1] = f"{clauses[-1]}, {fragment}"
+        else:
+            clauses.append(fragment)
+    return clauses
+
+
+def clause_quantities(clause: str) -> Tuple[str, ...]:
+    """
+    Each number of a clause with the word after it, in order.
+
+    "2 coffees with 3 croissants" gives ("2 coffee", "3 croissant").
+    """
+    return _split_quantities(_clause_tokens(clause))[0]
+
+
+def normalize_clause(clause: str) -> str:
+    """
+    Canonical form of a clause for matching.
+
+    Its quantities in order, then the other folded tokens without fillers,
+    sorted: "Had a beef burger" and "ate beef burgers" both become
+    "beef burger", "drove 20km" and "Drove 20 km" both "20 km drove".
+    """
+    quantities, words = _split_quantities(_clause_tokens(clause))
+    return " ".join(list(quantities) + sorted(set(words) - CLAUSE_FILLERS))
+
+
+def states_quantity(clause: str) -> bool:
+    """
+    Whether a clause gives its own quantity, as a number or a count word.
+
+    Records of a clause without one ("drove my car to work") carry a quantity
+    the model took from elsewhere in the text or guessed, so they are not
+    reusable for the clause alone.
+    """
+    return any(token[0].isdigit() or token in COUNT_WORDS for token in CLAUSE_TOKEN.findall((clause or "").lower()))
+
+
+def _clause_tokens(clause: str) -> List[str]:
+    return [_stem(token) for token in CLAUSE_TOKEN.findall((clause or "").lower()) if token not in STOPWORDS]
+
+
+def _split_quantities(tokens: List[str]) -> Tuple[Tuple[str, ...], List[str]]:
+    # A number keeps its position and the word it counts, so "2 coffee 3 croissant" != "3 coffee 2 croissant"
+    quantities, words = [], []
+    i = 0
+    while i < len(tokens):
+        if tokens[i][0].isdigit():
+            if i + 1 < len(tokens) and not tokens[i + 1][0].isdigit():
+                quantities.append(f"{tokens[i]} {tokens[i + 1]}")
+                i += 2
+                continue
+            quantities.append(tokens[i])
+        else:
+            words.append(tokens[i])
+        i += 1
+    return tuple(quantities), words
+
+
+class MinHashIndex:
+    """
+    Character n-gram MinHash signatures with LSH banding.
+
+    Each key is shingled into ``shingle_size`` character n-grams, hashed
+    with ``num_perm`` universal hash functions and split into ``bands``
+    bands; keys sharing any band bucket are candidates, ranked by the
+    fraction of equal signature slots (an estimate of n-gram Jaccard).
+    """
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, bands: int = DEFAULT_BANDS,
+                 shingle_size: int = SHINGLE_SIZE, seed: int = 1):
+        """
+        Args:
+            num_perm (int): Hash functions per signature, a multiple of ``bands``
+            bands (int): LSH bands; more bands find less similar candidates
+            shingle_size (int): Characters per n-gram
+            seed (int): Seed of the hash parameters
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        # Below 2**31 so a * hash + b stays inside uint64
+        self._a = rng.integers(1, 2**31, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, 2**31, size=num_perm, dtype=np.uint64)
+        self._signatures: Dict[int, np.ndarray] = {}
+        self._buckets: Dict[Tuple[int, bytes], set] = {}
+
+    def signature(self, key: str) -> np.ndarray:
+        """MinHash signature of a key's character n-grams."""
+        size = self.shingle_size
+        shingles = {key[i:i + size] for i in range(max(len(key) - size + 1, 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        return ((np.outer(self._a, hashes) + self._b[:, None]) % _PRIME).min(axis=1)
+
+    def add(self, item_id: int, key: str) -> None:
+        signature = self.signature(key)
+        self._signatures[item_id] = signature
+        for band in self._bands(signature):
+            self._buckets.setdefault(band, set()).add(item_id)
+
+    def remove(self, item_id: int) -> None:
+        signature = self._signatures.pop(item_id, None)
+        if signature is None:
+            return
+        for band in self._bands(signature):
+            bucket = self._buckets.get(band)
+            if bucket is not None:
+                bucket.discard(item_id)
+                if not bucket:
+                    del self._buckets[band]
+
+    def query(self, key: str, threshold: float) -> List[Tuple[int, float]]:
+        """
+        Return (item id, estimated similarity) of candidates at or above ``threshold``, best first.
+        """
+        signature = self.signature(key)
+        candidates = set()
+        for band in self._bands(signature):
+            candidates |= self._buckets.get(band, set())
+        if not candidates:
+            return []
+        ids = list(candidates)
+        similarity = (np.stack([self._signatures[i] for i in ids]) == signature).mean(axis=1)
+        order = np.argsort(-similarity, kind="stable")
+        return [(ids[i], float(similarity[i])) for i in order if similarity[i] >= threshold]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def _bands(self, signature: np.ndarray):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+
+class ClauseEntry(NamedTuple):
+    item_id: int
+    # clause_quantities of the cached clause
+    quantities: Tuple[str, ...]
+    records: str
+
+
+class ClauseCache:
+    """
+    Near-duplicate cache of extracted emission records per activity clause.
+
+    Clauses are normalized (quantities in order, other folded tokens sorted,
+    fillers dropped) and looked up exactly first, then through a MinHash
+    index so reworded or misspelled clauses ("had a cappuccino" /
+    "capuccino") reuse earlier records. A near match is only accepted when
+    both clauses carry the same quantities in the same order, so "drove 20
+    km" never reuses the records of "drove 30 km", nor "2 coffees with 3
+    croissants" those of "3 coffees with 2 croissants". The least recently
+    used clauses are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD, max_entries: int = DEFAULT_MAX_CLAUSES,
+                 index: Optional[MinHashIndex] = None):
+        """
+        Args:
+            threshold (float): Minimum estimated n-gram similarity for a near match
+            max_entries (int): Upper bound on cached clauses
+            index (Optional[MinHashIndex]): Similarity index, a default one when omitted
+        """
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.index = index if index is not None else MinHashIndex()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, ClauseEntry]" = OrderedDict()
+        self._keys: Dict[int, str] = {}
+        self._next_id = 0
+
+    @staticmethod
+    def split(text: str) -> List[str]:
+        return split_clauses(text)
+
+    def lookup(self, clause: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the records cached for this clause or a near duplicate of it.
+
+        Args:
+            clause (str): One activity clause
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: A private copy of the records, None on a miss
+        """
+        key = normalize_clause(clause)
+        if not key:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.hits += 1
+            else:
+                quantities = clause_quantities(clause)
+                for item_id, _ in self.index.query(key, self.threshold):
+                    candidate = self._entries[self._keys[item_id]]
+                    if candidate.quantities == quantities:
+                        entry, key = candidate, self._keys[item_id]
+                        self.near_hits += 1
+                        break
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+        return json.loads(entry.records)
+
+    def add(self, clause: str, records: List[Dict[str, Any]]) -> None:
+        """Cache the records extracted from one clause, unless the clause states no quantity."""
+        key = normalize_clause(clause)
+        if not key or not states_quantity(clause):
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.index.remove(previous.item_id)
+                del self._keys[previous.item_id]
+            item_id = self._next_id
+            self._next_id += 1
+            self._entries[key] = ClauseEntry(item_id, clause_quantities(clause), json.dumps(records))
+            self._keys[item_id] = key
+            self.index.add(item_id, key)
+            while len(self._entries) > self.max_entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.index.remove(evicted.item_id)
+                del self._keys[evicted.item_id]
+
+    def stats(self) -> Dict[str, int]:
+        """Return exact/near hit and miss counters and the number of cached clauses."""
+        return {"hits": self.hits, "near_hits": self.near_hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def clear(self) -> None:
+        with self._lock:
+            for entry in self._entries.values():
+                self.index.remove(entry.item_id)
+            self._entries.clear()
+            self._keys.clear()
@@ -0,0 +1,277 @@
+import re
+import logging
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+import pandas as pd
+
+from .units import UnitConverter, canonical_unit
+
+logger = logging.getLogger(__name__)
+
+# Words that carry no meaning when matching activity names
+STOPWORDS = frozenset({"a", "an", "and", "by", "for", "from", "in", "of", "on", "only", "the", "to", "with"})
+
+FactorKey = Tuple[str, str, str, str]
+# (category, type, activity) as labelled in the table
+ActivityLabel = Tuple[str, str, str]
+
+# Everyday names the table spells differently; a fuel word in front of "car" still means a car trip
+EXTRA_ALIASES: Dict[str, ActivityLabel] = {
+    "petrol car": ("Transport", "Cars (by size)", "Average car"),
+    "diesel car": ("Transport", "Cars (by size)", "Average car"),
+    "motorcycle": ("Transport", "Motorbike", "Average"),
+}
+
+# Serving words dropped from food names, so "Coffee Cup" also matches "coffee"
+CONTAINER_WORDS = frozenset({"cup", "glass", "bowl", "slice", "block", "portion", "fillet", "chop", "dish", "bar", "loaf", "of"})
+
+# When several table entries share an alias, the one qualified as the typical case wins
+PREFERRED_QUALIFIERS = ("average", "domestic")
+
+
+def normalize(text: Optional[str]) -> str:
+    """Lower-case a label and collapse punctuation and whitespace."""
+    if text is None:
+        return ""
+    text = re.sub(r"[^0-9a-z%]+", " ", str(text).lower())
+    return " ".join(text.split())
+
+
+def _stem(token: str) -> str:
+    # Cheap plural folding: "burgers" -> "burger", "oils" -> "oil", but "glass" stays
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+
+def tokenize(text: Optional[str]) -> Set[str]:
+    """Return the meaningful, plural-folded tokens of a label."""
+    return {_stem(token) for token in normalize(text).split() if token not in STOPWORDS}
+
+
+def _activity_aliases(category: str, type_label: str, activity: str) -> List[str]:
+    """Names a user would write for one table activity."""
+    full = normalize(activity)
+    base = normalize(re.sub(r"\s*\(.*?\)", "", activity))
+    aliases = {full, base}
+    category_key = normalize(category)
+    if category_key == "transport":
+        # Sizes and segments are bare adjectives in the table: "Small" under Motorbike means "small motorbike"
+        noun = _stem(normalize(re.sub(r"\s*\(.*?\)", "", type_label)).split()[-1])
+        tokens = base.split()
+        if noun not in tokens:
+            aliases = {f"{base} {noun}"}
+        if "average" in tokens:
+            aliases.add(noun)
+    elif category_key == "food":
+        stripped = " ".join(token for token in base.split() if token not in CONTAINER_WORDS)
+        if stripped:
+            aliases.add(stripped)
+    return [alias for alias in aliases if alias]
+
+
+def build_aliases(activities: Iterable[ActivityLabel]) -> Dict[str, ActivityLabel]:
+    """
+    Map the plain-text names of the table's activities to their labels.
+
+    Every activity is known by its name without the parenthetical qualifier,
+    "<size> <vehicle>" for transport sizes and the food without its serving
+    word. When names collide the entry named exactly so wins, then the one
+    qualified as average or domestic ("diesel" is the average biofuel
+    blend), then the first in the table.
+
+    Args:
+        activities: Distinct (category, type, activity) labels in table order
+
+    Returns:
+        Dict[str, ActivityLabel]: Normalized name -> activity label
+    """
+    candidates: Dict[str, List[Tuple[int, ActivityLabel]]] = {}
+    for position, label in enumerate(activities):
+        for alias in _activity_aliases(*label):
+            candidates.setdefault(alias, []).append((position, label))
+
+    def priority(alias: str, position: int, label: ActivityLabel):
+        full = normalize(label[2])
+        return full == alias, any(word in full for word in PREFERRED_QUALIFIERS), -position
+
+    aliases = {
+        alias: max(entries, key=lambda entry: priority(alias, *entry))[1]
+        for alias, entries in candidates.items()
+    }
+    aliases.update(EXTRA_ALIASES)
+    return aliases
+
+
+class FactorMatch(NamedTuple):
+    category: str
+    type: str
+    activity: str
+    # Table unit the factor was taken from
+    unit: str
+    # Emissions per requested unit (the table factor scaled by ``conversion``)
+    co2e_per_unit: float
+    exact: bool
+    # Requested-unit quantity * conversion = quantity in ``unit``
+    conversion: float = 1.0
+
+
+def labels_agree(match: FactorMatch, category: Optional[str], type_: Optional[str]) -> bool:
+    """Whether the category and type labels a query gives (if any) are those of the matched factor."""
+    return all(
+        not normalize(label) or normalize(label) == normalize(matched)
+        for label, matched in ((category, match.category), (type_, match.type))
+    )
+
+
+class EmissionFactorIndex:
+    """
+    Resolves (category, type, activity, unit) to an emission factor from the local table.
+
+    An exact hash index over the normalized keys answers well-formed queries;
+    the plain-text activity names of build_aliases ("diesel", "small
+    motorbike") come next, shared with the rule-based fast path; a token
+    inverted index over activity names handles other loose labels such as
+    "beef burgers", and a precompiled UnitConverter maps units the
+    table does not list (grams, gallons, kWh) onto ones it does. Rows without
+    a numeric factor are skipped.
+    """
+
+    def __init__(self, emission_factors: pd.DataFrame):
+        """
+        Args:
+            emission_factors (pd.DataFrame): Table with category, type, activity, unit and co2e_per_unit columns
+        """
+        factors = emission_factors.copy()
+        factors['co2e_per_unit'] = pd.to_numeric(factors['co2e_per_unit'], errors='coerce')
+        skipped = int(factors['co2e_per_unit'].isna().sum())
+        if skipped:
+            logger.warning(f"Skipping {skipped} emission factor rows without a numeric factor")
+        factors = factors.dropna(subset=['co2e_per_unit'])
+
+        self._exact: Dict[FactorKey, FactorMatch] = {}
+        # (activity, unit) -> match, for queries whose category/type labels differ from the table
+        self._by_activity_unit: Dict[Tuple[str, str], FactorMatch] = {}
+        # normalized activity -> {normalized unit: match}
+        self._units_by_activity: Dict[str, Dict[str, FactorMatch]] = {}
+        self._activity_meta: Dict[str, Tuple[str, str, Set[str]]] = {}
+        self._token_index: Dict[str, Set[str]] = {}
+        labels: Dict[ActivityLabel, None] = {}
+        # Normalized units spelled in the table
+        self.units: Set[str] = set()
+
+        for row in factors.itertuples(index=False):
+            match = FactorMatch(
+                str(row.category), str(row.type), str(row.activity), str(row.unit), float(row.co2e_per_unit), True
+            )
+            activity_key = normalize(row.activity)
+            unit_key = normalize(row.unit)
+            self._exact[(normalize(row.category), normalize(row.type), activity_key, unit_key)] = match
+            self._by_activity_unit.setdefault((activity_key, unit_key), match)
+            self._units_by_activity.setdefault(activity_key, {})[canonical_unit(unit_key) or unit_key] = match
+            labels.setdefault((match.category.strip(), match.type.strip(), match.activity.strip()))
+            self.units.add(unit_key)
+            if activity_key not in self._activity_meta:
+                activity_tokens = tokenize(row.activity)
+                self._activity_meta[activity_key] = (normalize(row.category), normalize(row.type), activity_tokens)
+                for token in activity_tokens:
+                    self._token_index.setdefault(token, set()).add(activity_key)
+
+        self.aliases = build_aliases(labels)
+
+        self.converter = UnitConverter({
+            activity_key: {unit: match.co2e_per_unit for unit, match in units.items()}
+            for activity_key, units in self._units_by_activity.items()
+        })
+
+    @classmethod
+    def from_csv(cls, path: str) -> "EmissionFactorIndex":
+        return cls(pd.read_csv(path))
+
+    def __len__(self) -> int:
+        return len(self._exact)
+
+    def resolve(
+        self,
+        category: Optional[str],
+        type_: Optional[str],
+        activity: Optional[str],
+        unit: Optional[str]
+    ) -> Optional[FactorMatch]:
+        """
+        Find the emission factor for an activity.
+
+        Args:
+            category (Optional[str]): Category label, e.g. "Food"
+            type_ (Optional[str]): Type label, e.g. "Non-vegetarian"
+            activity (Optional[str]): Activity label, e.g. "Beef Burger"
+            unit (Optional[str]): Unit of the quantity, e.g. "kg"
+
+        Returns:
+            Optional[FactorMatch]: The matching factor, or None if the table has no factor for it
+        """
+        activity_key = normalize(activity)
+        unit_key = normalize(unit)
+
+        match = self._exact.get((normalize(category), normalize(type_), activity_key, unit_key))
+        if match is not None:
+            return match
+        # The same activity label under another category/type ("Small" car vs motorbike)
+        # is only a fuzzy match
+        match = self._by_activity_unit.get((activity_key, unit_key))
+        if match is not None:
+            return match._replace(exact=labels_agree(match, category, type_))
+
+        if activity_key in self._units_by_activity:
+            match = self._match_unit(activity_key, unit_key, exact=True)
+            if match is not None and not labels_agree(match, category, type_):
+                match = match._replace(exact=False)
+            return match
+        alias = self.aliases.get(activity_key) or self.aliases.get(" ".join(_stem(t) for t in activity_key.split()))
+        if alias is not None:
+            return self._match_unit(normalize(alias[2]), unit_key, exact=False)
+        best_activity = self.closest_activity(category, type_, activity)
+        if best_activity is None:
+            return None
+        return self._match_unit(best_activity, unit_key, exact=False)
+
+    def _match_unit(self, activity_key: str, unit_key: str, exact: bool) -> Optional[FactorMatch]:
+        units = self._units_by_activity[activity_key]
+        match = units.get(canonical_unit(unit_key) or unit_key)
+        if match is not None:
+            return match._replace(exact=exact)
+        conversion = self.converter.convert(activity_key, unit_key)
+        if conversion is None:
+            return None
+        match = units[conversion.target_unit]
+        return match._replace(
+            co2e_per_unit=match.co2e_per_unit * conversion.multiplier,
+            exact=False,
+            conversion=conversion.multiplier
+        )
+
+    def closest_activity(self, category: Optional[str], type_: Optional[str], activity: Optional[str]) -> Optional[str]:
+        """Return the normalized table activity sharing the most tokens with the query."""
+        query = tokenize(activity)
+        candidates: Set[str] = set()
+        for token in query:
+            candidates |= self._token_index.get(token, set())
+        if not candidates:
+            return None
+
+        category_key = normalize(category)
+        type_key = normalize(type_)
+
+        def score(candidate: str):
+            candidate_category, candidate_type, candidate_tokens = self._activity_meta[candidate]
+            coverage = len(query & candidate_tokens) / len(query)
+            return (
+                coverage,
+                candidate_category == category_key,
+                candidate_type == type_key,
+                -len(candidate_tokens)
+            )
+
+        best = max(sorted(candidates), key=score)
+        # Require at least half of the query tokens to be present in the match
+        return best if score(best)[0] >= 0.5 else None
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import pandas as pd
+
+from .carbon_service import EMISSION_FACTOR_PATH
+
+logger = logging.getLogger(__name__)
+
+EMISSION_FACTOR_PDF = os.path.join('data', 'emission_factor.pdf')
+DEFAULT_VOCABULARY_PATH = os.path.join('data', 'cache', 'factor_vocabulary.txt')
+
+# "vocabulary" embeds the compiled keys in the prompt, "pdf" attaches emission_factor.pdf
+FACTOR_CONTEXT_ENV = 'ECOMATE_FACTOR_CONTEXT'
+FACTOR_CONTEXT_MODES = ('vocabulary', 'pdf')
+
+_HEADER_PREFIX = '# source-sha256: '
+
+
+def compile_vocabulary(emission_factors: pd.DataFrame) -> str:
+    """
+    Compile the factor table into the compact vocabulary embedded in prompts.
+
+    Only the lookup keys are kept (no factor values): one line per category
+    and type, with activities that accept the same units sharing one unit
+    list. Duplicate keys are dropped and table order is preserved, e.g.::
+
+        Fuels > Gaseous fuels: Butane; CNG; LNG [tonnes | litres | kWh (Net CV)]
+
+    Args:
+        emission_factors (pd.DataFrame): Table with category, type, activity and unit columns
+
+    Returns:
+        str: The vocabulary, one line per (category, type)
+    """
+    groups: "OrderedDict[Tuple[str, str], OrderedDict[str, List[str]]]" = OrderedDict()
+    keys = emission_factors[['category', 'type', 'activity', 'unit']].dropna().astype(str)
+    for category, type_label, activity, unit in keys.itertuples(index=False):
+        units = groups.setdefault((category.strip(), type_label.strip()), OrderedDict()).setdefault(activity.strip(), [])
+        if unit.strip() not in units:
+            units.append(unit.strip())
+
+    lines = []
+    for (category, type_label), activities in groups.items():
+        by_units: "OrderedDict[Tuple[str, ...], List[str]]" = OrderedDict()
+        for activity, units in activities.items():
+            by_units.setdefault(tuple(units), []).append(activity)
+        entries = [f"{'; '.join(names)} [{' | '.join(units)}]" for units, names in by_units.items()]
+        lines.append(f"{category} > {type_label}: {'; '.join(entries)}")
+    return '\n'.join(lines)
+
+
+def build_vocabulary_file(source: str = EMISSION_FACTOR_PATH, destination: str = DEFAULT_VOCABULARY_PATH) -> str:
+    """
+    Compile the vocabulary of ``source`` and write it to ``destination``.
+
+    The file starts with the SHA-256 of the source table, so a stale build is
+    detected and rebuilt on load.
+
+    Returns:
+        str: The compiled vocabulary
+    """
+    digest = _file_sha256(source)
+    vocabulary = compile_vocabulary(pd.read_csv(source))
+    directory = os.path.dirname(destination) or '.'
+    os.makedirs(directory, exist_ok=True)
+    # A temp file of its own, so concurrent builds never write into each other's file
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(destination)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(f"{_HEADER_PREFIX}{digest}\n{vocabulary}")
+        os.replace(tmp_path, destination)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logger.info(f"Wrote factor vocabulary for {source} to {destination} ({len(vocabulary)} chars)")
+    return vocabulary
+
+
+class FactorVocabulary:
+    """
+    Prebuilt factor vocabulary string, loaded once per process.
+
+    The compiled text is read from ``cache_path`` when it was built from the
+    current table and rebuilt otherwise; in memory it is refreshed only when
+    the table's modification time changes, like FactorRegistry.
+    """
+
+    def __init__(self, path: str = EMISSION_FACTOR_PATH, cache_path: Optional[str] = DEFAULT_VOCABULARY_PATH):
+        """
+        Args:
+            path (str): Emission factor CSV
+            cache_path (Optional[str]): Prebuilt vocabulary file, None to compile in memory only
+        """
+        self.path = path
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._text = ''
+
+    @property
+    def text(self) -> str:
+        mtime = os.stat(self.path).st_mtime
+        if mtime != self._mtime:
+            with self._lock:
+                if mtime != self._mtime:
+                    self._text, self._mtime = self._load(), mtime
+        return self._text
+
+    def _load(self) -> str:
+        if self.cache_path is None:
+            return compile_vocabulary(pd.read_csv(self.path))
+        digest = _file_sha256(self.path)
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                header, _, vocabulary = f.read().partition('\n')
+            if header == f"{_HEADER_PREFIX}{digest}":
+                return vocabulary
+            logger.info("Factor vocabulary is stale, rebuilding it")
+        except OSError:
+            logger.info("No prebuilt factor vocabulary, building it")
+        try:
+            return build_vocabulary_file(self.path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Could not write factor vocabulary: {str(e)}")
+            return compile_vocabulary(pd.read_csv(self.path))
+
+
+_vocabulary: Optional[FactorVocabulary] = None
+_vocabulary_lock = threading.Lock()
+
+
+def get_factor_vocabulary() -> str:
+    """Return the shared prebuilt vocabulary string, building it on first use."""
+    global _vocabulary
+    if _vocabulary is None:
+        with _vocabulary_lock:
+            if _vocabulary is None:
+                _vocabulary = FactorVocabulary()
+    return _vocabulary.text
+
+
+def factor_context(mode: Optional[str] = None) -> Tuple[Optional[str], List[str]]:
+    """
+    Factor reference to give the model: a vocabulary to embed or files to attach.
+
+    Args:
+        mode (Optional[str]): "vocabulary" or "pdf", read from ECOMATE_FACTOR_CONTEXT when omitted
+
+    Returns:
+        Tuple[Optional[str], List[str]]: (vocabulary or None, context files)
+    """
+    mode = (mode or os.getenv(FACTOR_CONTEXT_ENV) or 'vocabulary').lower()
+    if mode not in FACTOR_CONTEXT_MODES:
+        raise ValueError(f"Unknown factor context mode: {mode}; expected one of {', '.join(FACTOR_CONTEXT_MODES)}")
+    if mode == 'pdf':
+        return None, [EMISSION_FACTOR_PDF]
+    return get_factor_vocabulary(), []
+
+
+def _file_sha256(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
@@ -0,0 +1,261 @@
+import logging
+import re
+import threading
+from typing import Any, Dict, List, NamedTuple, Optional, Pattern, Tuple
+
+from .carbon_service import FactorRegistry, get_factor_registry
+from .clause_cache import split_clauses
+from .emission_factors import EmissionFactorIndex, FactorMatch, normalize
+from .units import LINEAR_UNITS, UNIT_ALIASES, canonical_unit
+
+logger = logging.getLogger(__name__)
+
+# Clauses the grammar must not read literally are left to the model: vehicles the table
+# has no factors for, and negated or avoided activities ("didn't drive", "instead of driving").
+# Words are tokens as split by _TOKEN, so "didn't" is "didn" and "t".
+DEFER_WORDS = frozenset({
+    "electric", "hybrid", "ev", "plug",
+    "not", "never", "instead", "skip", "skipped", "avoid", "avoided", "saved", "cancelled", "canceled",
+    "didn", "don", "doesn", "wasn", "weren", "isn", "aren", "haven", "hadn", "won", "wouldn", "couldn",
+    "didnt", "dont", "doesnt", "wasnt", "werent", "havent", "hadnt",
+})
+
+NUMBER_WORDS = {
+    "a": 1, "an": 1, "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10, "a couple of": 2,
+}
+_NUMBER = r"\d+(?:\.\d+)?"
+_NUMBER_WORD = "|".join(re.escape(word).replace(r"\ ", r"\s+") for word in sorted(NUMBER_WORDS, key=len, reverse=True))
+# A count right before an activity name, at most two words ahead of it ("two large coffees")
+_COUNT = re.compile(r"\b(?P<count>%s|%s)\s+(?:[a-z]+\s+){0,2}$" % (_NUMBER, _NUMBER_WORD))
+_DIGIT = re.compile(r"\d")
+# Same word boundaries as emission_factors.normalize
+_TOKEN = re.compile(r"[0-9a-z%]+")
+
+# Upper bounds (kg CO2e per activity) of the impact levels; anything above is VERY HIGH
+IMPACT_LEVELS = ((1.0, "LOW"), (5.0, "MEDIUM"), (20.0, "HIGH"))
+
+SUGGESTIONS = {
+    "transport": "Walk, cycle or take public transport for trips like this where you can.",
+    "fuels": "Use less of this fuel where you can, or switch to electricity from renewable sources.",
+    "food": "Swap in a plant-based option more often.",
+}
+LOW_IMPACT_SUGGESTION = "Low-impact choice, keep it up."
+
+
+class ActivityKey(NamedTuple):
+    category: str
+    type: str
+    activity: str
+
+
+class FastPathGrammar(NamedTuple):
+    index: EmissionFactorIndex
+    quantities: Pattern
+    # Alias tokens -> table activity
+    aliases: Dict[Tuple[str, ...], ActivityKey]
+    # First alias token -> token counts of the aliases starting with it, longest first
+    starts: Dict[str, Tuple[int, ...]]
+    # (activity, unit) -> resolved factor, filled on first use
+    factors: Dict[Tuple[ActivityKey, str], Optional[FactorMatch]]
+
+
+def _phrase_pattern(phrase: str) -> str:
+    return r"[\s-]+".join(re.escape(token) for token in phrase.split())
+
+
+def _alternation(phrases) -> str:
+    # Longest first, so "kwh net cv" wins over "kwh"
+    return "|".join(_phrase_pattern(phrase) for phrase in sorted(set(phrases), key=len, reverse=True))
+
+
+def compile_grammar(index: EmissionFactorIndex) -> FastPathGrammar:
+    """
+    Compile the activity keywords and quantity pattern of a factor index.
+
+    Activities are the index's plain-text names (emission_factors.build_aliases),
+    looked up by their tokens, so a name resolves to the same table entry here
+    and in EmissionFactorIndex.resolve; units are the table's plus the unit
+    aliases of services.units.
+
+    Args:
+        index (EmissionFactorIndex): Index of the factor table
+
+    Returns:
+        FastPathGrammar: Compiled pattern and the alias lookup
+    """
+    aliases = {alias: ActivityKey(*label) for alias, label in index.aliases.items()}
+    units = set(LINEAR_UNITS) | set(UNIT_ALIASES) | index.units
+    quantities = re.compile(
+        r"(?:\b(?P<number>%s)\s*|\b(?P<word>%s)\s+)(?P<unit>%s)\b" % (_NUMBER, _NUMBER_WORD, _alternation(units)),
+        re.IGNORECASE
+    )
+    token_aliases = {tuple(alias.split()): key for alias, key in aliases.items()}
+    starts: Dict[str, set] = {}
+    for tokens in token_aliases:
+        starts.setdefault(tokens[0], set()).add(len(tokens))
+    return FastPathGrammar(
+        index, quantities, token_aliases, {word: tuple(sorted(counts, reverse=True)) for word, counts in starts.items()}, {}
+    )
+
+
+def find_activities(grammar: FastPathGrammar, clause: str, tokens: Optional[List[Any]] = None) -> List[Tuple[ActivityKey, int, int]]:
+    """
+    Return (activity, start, end) of the known activity names in a lower-case clause.
+
+    Scans left to right taking the longest alias at each word, so "almond
+    milk" wins over "milk"; a trailing plural "s"/"es" is ignored.
+    """
+    tokens = tokens if tokens is not None else list(_TOKEN.finditer(clause))
+    words = [token.group() for token in tokens]
+    found = []
+    i = 0
+    while i < len(words):
+        first = words[i]
+        counts = grammar.starts.get(first)
+        if counts is None and first.endswith("s"):
+            counts = grammar.starts.get(first[:-1]) or grammar.starts.get(first[:-2])
+        for n in counts or ():
+            if i + n > len(words):
+                continue
+            phrase = words[i:i + n]
+            key = grammar.aliases.get(tuple(phrase))
+            if key is None and phrase[-1].endswith("s"):
+                *head, last = phrase
+                key = grammar.aliases.get((*head, last[:-1])) or grammar.aliases.get((*head, last[:-2]))
+            if key is not None:
+                found.append((key, tokens[i].start(), tokens[i + n - 1].end()))
+                i += n
+                break
+        else:
+            i += 1
+    return found
+
+
+def impact_level(co2e: float) -> str:
+    """Impact level of an activity's emissions in kg CO2e."""
+    for upper, level in IMPACT_LEVELS:
+        if co2e < upper:
+            return level
+    return "VERY HIGH"
+
+
+class FastPathExtractor:
+    """
+    Rule-based extraction of formulaic activity clauses, ahead of the model.
+
+    A clause such as "drove 20 km in a small car" or "used 3 litres of
+    diesel" is matched against a grammar compiled from the factor table:
+    exactly one known activity, one quantity with a unit the table can
+    convert to (or a plain count for per-item foods) and no other numbers.
+    Anything else, including clauses naming several activities, is left to
+    the model. The grammar is recompiled when the factor table changes.
+    """
+
+    def __init__(self, registry: Optional[FactorRegistry] = None):
+        """
+        Args:
+            registry (Optional[FactorRegistry]): Factor table source, the shared registry by default
+        """
+        self.registry = registry if registry is not None else get_factor_registry()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._source: Optional[EmissionFactorIndex] = None
+        self._grammar: Optional[FastPathGrammar] = None
+
+    @property
+    def grammar(self) -> FastPathGrammar:
+        index = self.registry.index
+        if index is not self._source:
+            with self._lock:
+                if index is not self._source:
+                    self._grammar, self._source = compile_grammar(index), index
+        return self._grammar
+
+    @staticmethod
+    def split(text: str) -> List[str]:
+        return split_clauses(text)
+
+    def extract_clause(self, clause: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Extract the emission record of one clause without the model.
+
+        Args:
+            clause (str): One activity clause
+
+        Returns:
+            Optional[List[Dict[str, Any]]]: The clause's record, None when the grammar does not cover it
+        """
+        records = self._extract(clause.lower())
+        with self._lock:
+            if records is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return records
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    def _extract(self, clause: str) -> Optional[List[Dict[str, Any]]]:
+        tokens = list(_TOKEN.finditer(clause))
+        if not DEFER_WORDS.isdisjoint(token.group() for token in tokens):
+            return None
+        grammar = self.grammar
+        found = find_activities(grammar, clause, tokens)
+        keys = {key for key, _, _ in found}
+        if len(keys) != 1:
+            return None
+        key = keys.pop()
+        spans = [(start, end) for _, start, end in found]
+
+        quantities = list(grammar.quantities.finditer(clause))
+        if len(quantities) > 1:
+            return None
+        if quantities:
+            found_quantity = quantities[0]
+            spans.append(found_quantity.span())
+            number, word = found_quantity.group("number"), found_quantity.group("word")
+            quantity = float(number) if number else float(NUMBER_WORDS[" ".join(word.split())])
+            unit = normalize(found_quantity.group("unit"))
+            unit = canonical_unit(unit) or unit
+        else:
+            # No unit: a count of a per-item food, "two coffees" or just "a coffee"
+            count = _COUNT.search(clause, 0, found[0][1])
+            quantity = 1.0
+            if count is not None:
+                spans.append(count.span("count"))
+                value = count.group("count")
+                quantity = float(value) if value[0].isdigit() else float(NUMBER_WORDS[" ".join(value.split())])
+            unit = "item"
+        # Any number left over ("with 2 friends") could change the reading
+        position = 0
+        for start, end in sorted(spans):
+            if _DIGIT.search(clause, position, max(start, position)):
+                return None
+            position = max(position, end)
+        if _DIGIT.search(clause, position):
+            return None
+
+        if (key, unit) not in grammar.factors:
+            match = grammar.index.resolve(key.category, key.type, key.activity, unit)
+            # A fuzzy fallback to some other activity is not a fast-path answer
+            if match is not None and normalize(match.activity) != normalize(key.activity):
+                match = None
+            grammar.factors[key, unit] = match
+        match = grammar.factors[key, unit]
+        if match is None:
+            return None
+        co2e = quantity * match.co2e_per_unit
+        level = impact_level(co2e)
+        return [{
+            "category": match.category,
+            "type_obj": match.type,
+            "activity": match.activity,
+            "quantity": quantity,
+            "unit": unit,
+            "co2e_per_unit": match.co2e_per_unit,
+            "co2e_impact_level": level,
+            "suggestion": LOW_IMPACT_SUGGESTION if level == "LOW" else SUGGESTIONS.get(normalize(match.category), ""),
+        }]
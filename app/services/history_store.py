@@ -0,0 +1,291 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Iterable, List, Optional, Tuple
+
+from .rollups import PERIODS, RollupAggregator, RunningStats, TrendPoint, period_start, shift_period
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_HISTORY_PATH = os.path.join("data", "history.sqlite3")
+
+# Columns a rollup row needs; older databases are rebuilt from the raw activities
+ROLLUP_COLUMNS = ("count", "co2e", "co2e_min", "co2e_max", "co2e_sum_sq")
+
+
+class HistoryStore:
+    """
+    Per-user footprint history in an embedded SQLite database.
+
+    Raw activities go to ``activities`` (indexed on user, day, category) and
+    every insert also merges the RunningStats of the new rows into
+    ``rollups``, which keeps count, sum, min, max and sum of squares per
+    user, period (day/week/month), period start and category. Trend queries
+    read the rollups, so their cost depends on the number of periods asked
+    for, not on how many activities were ever recorded.
+    """
+
+    def __init__(self, path: str = DEFAULT_HISTORY_PATH):
+        """
+        Args:
+            path (str): SQLite database file, or ":memory:"
+        """
+        self.path = path
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        # WAL lets the UI read while the API writes; NORMAL sync is durable across app crashes
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS activities (
+                id INTEGER PRIMARY KEY,
+                user TEXT NOT NULL,
+                analysis_id TEXT NOT NULL,
+                recorded_at REAL NOT NULL,
+                day TEXT NOT NULL,
+                category TEXT NOT NULL,
+                text TEXT,
+                quantity REAL,
+                unit TEXT,
+                co2e REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_activities_user_day_category
+                ON activities (user, day, category);
+            CREATE TABLE IF NOT EXISTS rollups (
+                user TEXT NOT NULL,
+                period TEXT NOT NULL,
+                period_start TEXT NOT NULL,
+                category TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                co2e REAL NOT NULL,
+                co2e_min REAL NOT NULL,
+                co2e_max REAL NOT NULL,
+                co2e_sum_sq REAL NOT NULL,
+                PRIMARY KEY (user, period, period_start, category)
+            ) WITHOUT ROWID;
+            """
+        )
+        self._db.commit()
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(rollups)")}
+        if not set(ROLLUP_COLUMNS) <= columns:
+            logger.info("Rollup table predates running stats, rebuilding it from the raw activities")
+            self.rebuild_rollups()
+
+    def record(self, user: str, records: Iterable[Any], recorded_at: Optional[float] = None,
+               digest: Optional[str] = None) -> str:
+        """
+        Store the activities of one analysis.
+
+        All rows go in with a single executemany and the rollups are updated
+        in the same transaction, once per touched (period, category).
+
+        Args:
+            user (str): User the analysis belongs to
+            records (Iterable): Objects with text, category, quantity, unit and co2e
+                attributes (ResultsView rows, ActivityRecords) or dicts with those keys
+            recorded_at (Optional[float]): Unix time of the analysis, defaults to now
+            digest (Optional[str]): Content digest of the analysis (analysis_digest); the
+                same analysis recorded again by the user on the same day is skipped
+
+        Returns:
+            str: Id shared by the stored rows of this analysis
+        """
+        recorded_at = time.time() if recorded_at is None else recorded_at
+        day = datetime.fromtimestamp(recorded_at).date()
+        analysis_id = f"{day.isoformat()}:{digest}" if digest is not None else uuid.uuid4().hex
+
+        rows = []
+        aggregator = RollupAggregator()
+        for record in records:
+            text, category, quantity, unit, co2e = (
+                _field(record, name) for name in ("text", "category", "quantity", "unit", "co2e")
+            )
+            category = category or "Unknown"
+            co2e = float(co2e or 0.0)
+            rows.append((user, analysis_id, recorded_at, day.isoformat(), category, text, quantity, unit, co2e))
+            aggregator.add(day, category, co2e)
+
+        if not rows:
+            return analysis_id
+        with self._lock, self._db:
+            if digest is not None and self._db.execute(
+                "SELECT 1 FROM activities WHERE user = ? AND day = ? AND analysis_id = ? LIMIT 1",
+                (user, day.isoformat(), analysis_id),
+            ).fetchone():
+                logger.debug(f"Analysis {analysis_id} of {user} already recorded")
+                return analysis_id
+            self._db.executemany(
+                "INSERT INTO activities (user, analysis_id, recorded_at, day, category, text, quantity, unit, co2e) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._merge_rollups(user, aggregator)
+        logger.debug(f"Recorded {len(rows)} activities for {user} on {day}")
+        return analysis_id
+
+    def totals(self, user: str, period: str = "day", days: Optional[int] = 90,
+               by_category: bool = True, today: Optional[date] = None) -> List[Tuple]:
+        """
+        Footprint totals per period, from the rollups.
+
+        Args:
+            user (str): User to query
+            period (str): "day", "week" or "month"
+            days (Optional[int]): Only periods starting within this many days, None for all
+            by_category (bool): Split each period by category
+            today (Optional[date]): Reference day for ``days``, defaults to today
+
+        Returns:
+            List[Tuple]: (period_start, category, count, co2e) rows, or
+            (period_start, count, co2e) when not split by category, oldest first
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        since = "0000-00-00"
+        if days is not None:
+            since = period_start((today or date.today()) - timedelta(days=days - 1), period)
+        if by_category:
+            query = (
+                "SELECT period_start, category, count, co2e FROM rollups "
+                "WHERE user = ? AND period = ? AND period_start >= ? ORDER BY period_start, category"
+            )
+        else:
+            query = (
+                "SELECT period_start, SUM(count), SUM(co2e) FROM rollups "
+                "WHERE user = ? AND period = ? AND period_start >= ? GROUP BY period_start ORDER BY period_start"
+            )
+        with self._lock:
+            return self._db.execute(query, (user, period, since)).fetchall()
+
+    def trend(self, user: str, period: str = "week", periods: int = 12, category: Optional[str] = None,
+              by_category: bool = False, today: Optional[date] = None) -> List[TrendPoint]:
+        """
+        Running stats for the last ``periods`` periods, oldest first.
+
+        Reads one rollup row per period and category, so the cost grows with
+        the periods asked for, not with the user's history.
+
+        Args:
+            user (str): User to query
+            period (str): "day", "week" or "month"
+            periods (int): Number of periods ending with the current one
+            category (Optional[str]): Only this category
+            by_category (bool): One point per period and category instead of one per period
+            today (Optional[date]): Reference day, defaults to today
+
+        Returns:
+            List[TrendPoint]: Per-period points; without by_category, periods
+            with no activity are included with empty stats
+        """
+        if period not in PERIODS:
+            raise ValueError(f"Unknown period: {period}")
+        current = date.fromisoformat(period_start(today or date.today(), period))
+        starts = [shift_period(current, period, -steps).isoformat() for steps in range(periods - 1, -1, -1)]
+        query = (
+            "SELECT period_start, category, count, co2e, co2e_min, co2e_max, co2e_sum_sq FROM rollups "
+            "WHERE user = ? AND period = ? AND period_start BETWEEN ? AND ?"
+        )
+        params = [user, period, starts[0], starts[-1]]
+        if category is not None:
+            query += " AND category = ?"
+            params.append(category)
+        with self._lock:
+            rows = self._db.execute(query + " ORDER BY period_start, category", params).fetchall()
+
+        if by_category:
+            return [TrendPoint(start, row_category, RunningStats(*values)) for start, row_category, *values in rows]
+        merged = {start: RunningStats() for start in starts}
+        for start, _, *values in rows:
+            merged[start].merge(RunningStats(*values))
+        return [TrendPoint(start, category, stats) for start, stats in merged.items()]
+
+    def rebuild_rollups(self) -> None:
+        """Recompute every rollup from the raw activities."""
+        with self._lock, self._db:
+            self._db.execute("DROP TABLE IF EXISTS rollups")
+            self._db.execute(
+                "CREATE TABLE rollups (user TEXT NOT NULL, period TEXT NOT NULL, period_start TEXT NOT NULL, "
+                "category TEXT NOT NULL, count INTEGER NOT NULL, co2e REAL NOT NULL, co2e_min REAL NOT NULL, "
+                "co2e_max REAL NOT NULL, co2e_sum_sq REAL NOT NULL, "
+                "PRIMARY KEY (user, period, period_start, category)) WITHOUT ROWID"
+            )
+            aggregators = defaultdict(RollupAggregator)
+            for user, day, category, co2e in self._db.execute("SELECT user, day, category, co2e FROM activities"):
+                aggregators[user].add(date.fromisoformat(day), category, co2e)
+            for user, aggregator in aggregators.items():
+                self._merge_rollups(user, aggregator)
+
+    def _merge_rollups(self, user: str, aggregator: RollupAggregator) -> None:
+        # Caller holds the lock and the transaction
+        self._db.executemany(
+            "INSERT INTO rollups (user, period, period_start, category, count, co2e, co2e_min, co2e_max, co2e_sum_sq) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (user, period, period_start, category) DO UPDATE SET "
+            "count = count + excluded.count, co2e = co2e + excluded.co2e, "
+            "co2e_min = MIN(co2e_min, excluded.co2e_min), co2e_max = MAX(co2e_max, excluded.co2e_max), "
+            "co2e_sum_sq = co2e_sum_sq + excluded.co2e_sum_sq",
+            [(user, period, start, category, stats.count, stats.total, stats.minimum, stats.maximum, stats.sum_sq)
+             for (period, start, category), stats in aggregator],
+        )
+
+    def daily_average(self, user: str, days: Optional[int] = 30, today: Optional[date] = None) -> Optional[float]:
+        """
+        Mean daily footprint over the days the user recorded anything.
+
+        Args:
+            user (str): User to query
+            days (Optional[int]): Look-back window in days, None for all history
+            today (Optional[date]): Reference day for ``days``, defaults to today
+
+        Returns:
+            Optional[float]: kg CO2e per active day, None without history
+        """
+        rows = self.totals(user, "day", days=days, by_category=False, today=today)
+        if not rows:
+            return None
+        return sum(co2e for _, _, co2e in rows) / len(rows)
+
+    def count(self, user: Optional[str] = None) -> int:
+        """Number of stored activities, for one user or in total."""
+        with self._lock:
+            if user is None:
+                return self._db.execute("SELECT COUNT(*) FROM activities").fetchone()[0]
+            return self._db.execute("SELECT COUNT(*) FROM activities WHERE user = ?", (user,)).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+def analysis_digest(records: Iterable[Any]) -> str:
+    """Content digest of an analysis's activities, for HistoryStore.record."""
+    fields = [
+        [_field(record, "text"), _field(record, "category"), _number(_field(record, "quantity")),
+         _field(record, "unit"), _number(_field(record, "co2e"))]
+        for record in records
+    ]
+    return hashlib.sha256(json.dumps(fields, default=str).encode("utf-8")).hexdigest()
+
+
+def _field(record: Any, name: str) -> Any:
+    if isinstance(record, dict):
+        return record.get(name)
+    return getattr(record, name, None)
+
+
+def _number(value: Any) -> Any:
+    # 20 and 20.0 are the same quantity whether it came from a dict or an ActivityRecord
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
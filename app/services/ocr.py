@@ -0,0 +1,157 @@
+import io
+import os
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import threading
+from typing import Dict, Optional, Tuple
+
+import pytesseract
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Receipts rarely need more than this many pixels on the long side for Tesseract
+DEFAULT_MAX_SIDE = 1600
+
+# Mean word confidence (0-100) above which OCR text is trusted without the image
+DEFAULT_CONFIDENCE_THRESHOLD = 80.0
+
+
+class OCRPoolFull(Exception):
+    """Raised when the OCR queue is at capacity; callers should retry later."""
+
+
+def otsu_threshold(image: Image.Image) -> int:
+    """Return the Otsu binarization threshold of a grayscale image."""
+    histogram = image.histogram()
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = background_sum = 0
+    best_threshold, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += level * count
+        mean_background = background_sum / background
+        mean_foreground = (weighted_total - background_sum) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = level, variance
+    return best_threshold
+
+
+def preprocess_image(image: Image.Image, max_side: int = DEFAULT_MAX_SIDE) -> Image.Image:
+    """
+    Prepare a receipt photo for OCR: upright, grayscale, downscaled and binarized.
+
+    Args:
+        image (Image.Image): Source image
+        max_side (int): Longest side in pixels after downscaling
+
+    Returns:
+        Image.Image: Black-and-white image
+    """
+    image = ImageOps.exif_transpose(image)
+    image = ImageOps.grayscale(image)
+    if max(image.size) > max_side:
+        image.thumbnail((max_side, max_side), Image.LANCZOS)
+    image = ImageOps.autocontrast(image)
+    threshold = otsu_threshold(image)
+    return image.point(lambda level: 255 if level > threshold else 0, mode="1")
+
+
+def ocr_image_bytes(image_bytes: bytes, max_side: int = DEFAULT_MAX_SIDE) -> str:
+    """Decode, pre-process and OCR an image. Runs inside the worker processes."""
+    try:
+        image = Image.open(io.BytesIO(image_bytes))
+        return pytesseract.image_to_string(preprocess_image(image, max_side))
+    except Exception as e:
+        # Some pytesseract/PIL errors cannot be unpickled and would break the pool
+        raise RuntimeError(f"{type(e).__name__}: {str(e)}") from None
+
+
+def ocr_with_confidence(image: Image.Image, max_side: int = DEFAULT_MAX_SIDE) -> Tuple[str, float]:
+    """
+    OCR an image and estimate how trustworthy the text is.
+
+    Returns:
+        Tuple[str, float]: Recognized text, one line per OCR line, and the
+        mean word confidence (0-100; 0 when nothing was recognized)
+    """
+    data = pytesseract.image_to_data(preprocess_image(image, max_side), output_type=pytesseract.Output.DICT)
+    lines: Dict[Tuple[int, int, int], list] = {}
+    confidences = []
+    for i, word in enumerate(data['text']):
+        confidence = float(data['conf'][i])
+        if not word.strip() or confidence < 0:
+            continue
+        confidences.append(confidence)
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append(word)
+    text = "\n".join(" ".join(words) for _, words in sorted(lines.items()))
+    mean_confidence = sum(confidences) / len(confidences) if confidences else 0.0
+    return text, mean_confidence
+
+
+class TierStats:
+    """Running mean latency per receipt tier, used to estimate the time a cheaper tier saved."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._totals: Dict[str, Tuple[int, float]] = {}
+
+    def record(self, tier: str, elapsed_ms: float) -> None:
+        with self._lock:
+            count, total = self._totals.get(tier, (0, 0.0))
+            self._totals[tier] = (count + 1, total + elapsed_ms)
+
+    def mean(self, tier: str) -> Optional[float]:
+        count, total = self._totals.get(tier, (0, 0.0))
+        return total / count if count else None
+
+
+class OCRPool:
+    """
+    Process pool for CPU-bound OCR with a bounded queue.
+
+    At most ``max_pending`` images may be queued or running; beyond that
+    ``run`` raises OCRPoolFull so the API can answer 503 instead of piling
+    up work it cannot finish.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None, max_side: int = DEFAULT_MAX_SIDE):
+        """
+        Args:
+            workers (Optional[int]): Worker processes, OCR_WORKERS or the CPU count by default
+            max_pending (Optional[int]): Queue bound, OCR_MAX_PENDING or four per worker by default
+            max_side (int): Longest image side passed to Tesseract
+        """
+        self.workers = workers or int(os.getenv("OCR_WORKERS", 0)) or os.cpu_count() or 1
+        self.max_pending = max_pending or int(os.getenv("OCR_MAX_PENDING", 0)) or self.workers * 4
+        self.max_side = max_side
+        self.pending = 0
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    async def run(self, image_bytes: bytes) -> str:
+        """
+        OCR an image in the pool without blocking the event loop.
+
+        Raises:
+            OCRPoolFull: If ``max_pending`` images are already queued
+        """
+        if self.pending >= self.max_pending:
+            raise OCRPoolFull(f"OCR queue is full ({self.pending} pending)")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, ocr_image_bytes, image_bytes, self.max_side)
+        finally:
+            self.pending -= 1
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
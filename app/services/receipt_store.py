@@ -0,0 +1,120 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RECEIPT_DIR = os.path.join('data', 'cache', 'receipts')
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+RESULT_SUFFIX = '.result.json'
+
+
+class ReceiptStore:
+    """
+    Content-addressed store for uploaded receipts and their analysis results.
+
+    Receipts are saved as ``<sha256><ext>``, so identical uploads share one
+    file and concurrent sessions never overwrite each other. Each receipt's
+    analysis result is kept next to it. Reading a receipt or its result
+    refreshes its mtime, and the least recently used receipts are evicted
+    once the stored bytes exceed ``max_bytes``.
+    """
+
+    def __init__(self, root: str = DEFAULT_RECEIPT_DIR, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            root (str): Directory holding the receipts
+            max_bytes (int): Upper bound on the total size of stored receipts
+        """
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def put(self, data: bytes, suffix: str = '') -> Tuple[str, str]:
+        """
+        Store receipt bytes unless an identical receipt is already stored.
+
+        Args:
+            data (bytes): Raw upload
+            suffix (str): File extension to keep, e.g. ".jpg"
+
+        Returns:
+            Tuple[str, str]: SHA-256 digest of the bytes and the stored file path
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = os.path.join(self.root, digest + suffix.lower())
+        with self._lock:
+            if os.path.exists(path):
+                os.utime(path)
+            else:
+                # Write under a unique name, then publish atomically
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                self._evict(keep=path)
+        return digest, path
+
+    def get_result(self, digest: str) -> Optional[Any]:
+        """Return the cached analysis result for a receipt digest, if any."""
+        result_path = self._result_path(digest)
+        try:
+            with open(result_path, 'r') as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        for path in (result_path, *self._receipt_paths(digest)):
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return result
+
+    def put_result(self, digest: str, result: Any) -> None:
+        """Cache the analysis result of a receipt."""
+        result_path = self._result_path(digest)
+        tmp_path = f"{result_path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(result, f)
+        os.replace(tmp_path, result_path)
+
+    def _result_path(self, digest: str) -> str:
+        return os.path.join(self.root, digest + RESULT_SUFFIX)
+
+    def _receipt_paths(self, digest: str):
+        return [
+            os.path.join(self.root, name) for name in os.listdir(self.root)
+            if name.startswith(digest) and not name.endswith(RESULT_SUFFIX) and not name.endswith('.tmp')
+        ]
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            if name.endswith(RESULT_SUFFIX) or name.endswith('.tmp'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            digest = os.path.splitext(os.path.basename(path))[0]
+            for stale in (path, self._result_path(digest)):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+            logger.info(f"Evicted cached receipt {os.path.basename(path)}")
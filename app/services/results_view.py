@@ -0,0 +1,102 @@
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Sequence, Tuple
+
+# Production footprint of one smartphone / one cotton t-shirt, kg CO2e
+SMARTPHONE_KG_CO2E = 404
+TSHIRT_KG_CO2E = 190
+# Average car, g CO2e per km
+CAR_G_CO2E_PER_KM = 200
+
+
+class Equivalents(NamedTuple):
+    smartphones: float
+    tshirts: float
+    car_km: float
+
+
+def co2e_equivalents(co2e: float) -> Equivalents:
+    """Express a footprint in kg CO2e as everyday equivalents."""
+    if not isinstance(co2e, (int, float)) or co2e <= 0:
+        return Equivalents(0.0, 0.0, 0.0)
+    return Equivalents(
+        smartphones=co2e * 1000 / SMARTPHONE_KG_CO2E,
+        tshirts=co2e * 1000 / TSHIRT_KG_CO2E,
+        car_km=co2e * 1000 / CAR_G_CO2E_PER_KM,
+    )
+
+
+class ActivityRow(NamedTuple):
+    text: str
+    category: str
+    quantity: float
+    unit: str
+    co2e: float
+    co2e_impact_level: str
+    suggestion: str
+
+
+class CategoryTotal(NamedTuple):
+    category: str
+    co2e: float
+    count: int
+
+
+class ResultsView(NamedTuple):
+    """
+    Everything the results page shows, derived once per analysis.
+
+    Built from sanitized carbon data right after the footprint is calculated;
+    the page sections only read from it, so nothing is re-summed or
+    re-validated on a rerun.
+    """
+    # Activities in the order they were analyzed
+    rows: Tuple[ActivityRow, ...]
+    # The same activities, highest emissions first
+    ranked_rows: Tuple[ActivityRow, ...]
+    # Per-category totals, highest emissions first
+    categories: Tuple[CategoryTotal, ...]
+    total_co2e: float
+    equivalents: Equivalents
+    # Stable hash of the rows, used to key cached charts
+    digest: str
+
+    @property
+    def positive_rows(self) -> Tuple[ActivityRow, ...]:
+        """Ranked rows with non-zero emissions."""
+        return tuple(row for row in self.ranked_rows if row.co2e > 0)
+
+
+def build_results_view(carbon_data: Sequence[Any]) -> ResultsView:
+    """
+    Build the results view-model from sanitized carbon data.
+
+    Args:
+        carbon_data (Sequence[Any]): ActivityRecords as returned by validate_and_sanitize_carbon_data.
+
+    Returns:
+        ResultsView: Totals, per-category aggregates, ranked rows and equivalents.
+    """
+    rows = tuple(ActivityRow(**{field: getattr(item, field) for field in ActivityRow._fields}) for item in carbon_data)
+
+    totals: Dict[str, List[float]] = {}
+    for row in rows:
+        entry = totals.setdefault(row.category, [0.0, 0])
+        entry[0] += row.co2e
+        entry[1] += 1
+    categories = tuple(sorted(
+        (CategoryTotal(category, co2e, int(count)) for category, (co2e, count) in totals.items()),
+        key=lambda total: total.co2e,
+        reverse=True,
+    ))
+
+    total_co2e = sum(row.co2e for row in rows)
+    payload = json.dumps([list(row) for row in rows], default=str)
+    return ResultsView(
+        rows=rows,
+        ranked_rows=tuple(sorted(rows, key=lambda row: row.co2e, reverse=True)),
+        categories=categories,
+        total_co2e=total_co2e,
+        equivalents=co2e_equivalents(total_co2e),
+        digest=hashlib.sha256(payload.encode("utf-8")).hexdigest(),
+    )
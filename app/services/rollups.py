@@ -0,0 +1,124 @@
+import math
+from collections import defaultdict
+from datetime import date, timedelta
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+# Rollup periods and how a day maps to the first day of its period
+PERIODS = ("day", "week", "month")
+
+RollupKey = Tuple[str, str, str]
+
+
+def period_start(day: date, period: str) -> str:
+    """First day of the period containing ``day``, as YYYY-MM-DD (weeks start on Monday)."""
+    if period == "day":
+        start = day
+    elif period == "week":
+        start = day - timedelta(days=day.weekday())
+    elif period == "month":
+        start = day.replace(day=1)
+    else:
+        raise ValueError(f"Unknown period: {period}")
+    return start.isoformat()
+
+
+def shift_period(start: date, period: str, steps: int) -> date:
+    """Start of the period ``steps`` periods before (negative) or after ``start``."""
+    if period == "day":
+        return start + timedelta(days=steps)
+    if period == "week":
+        return start + timedelta(weeks=steps)
+    if period == "month":
+        months = start.year * 12 + start.month - 1 + steps
+        return date(months // 12, months % 12 + 1, 1)
+    raise ValueError(f"Unknown period: {period}")
+
+
+class RunningStats:
+    """
+    Count, sum, min, max and sum of squares of a stream of values.
+
+    Adding a value or merging another RunningStats is O(1), and mean and
+    standard deviation are derived on demand, so a rollup never needs the
+    values it summarizes.
+    """
+
+    __slots__ = ("count", "total", "minimum", "maximum", "sum_sq")
+
+    def __init__(self, count: int = 0, total: float = 0.0, minimum: float = math.inf,
+                 maximum: float = -math.inf, sum_sq: float = 0.0):
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+        self.sum_sq = sum_sq
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.sum_sq += value * value
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: "RunningStats") -> None:
+        self.count += other.count
+        self.total += other.total
+        self.sum_sq += other.sum_sq
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def std(self) -> float:
+        """Population standard deviation."""
+        if not self.count:
+            return 0.0
+        return math.sqrt(max(self.sum_sq / self.count - self.mean ** 2, 0.0))
+
+    def as_dict(self) -> Dict[str, float]:
+        empty = not self.count
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.mean,
+            "min": 0.0 if empty else self.minimum,
+            "max": 0.0 if empty else self.maximum,
+            "std": self.std,
+        }
+
+    def __repr__(self) -> str:
+        return f"RunningStats(count={self.count}, total={self.total:.3f}, mean={self.mean:.3f})"
+
+
+class TrendPoint(NamedTuple):
+    period_start: str
+    category: Optional[str]
+    stats: RunningStats
+
+
+class RollupAggregator:
+    """
+    Running stats per (period, period start, category) for a stream of activities.
+
+    Each activity updates one RunningStats per period, so the cost per
+    activity is constant; HistoryStore merges the result into its rollup
+    table in one statement per touched key.
+    """
+
+    def __init__(self):
+        self.stats: Dict[RollupKey, RunningStats] = defaultdict(RunningStats)
+
+    def add(self, day: date, category: str, co2e: float) -> None:
+        for period in PERIODS:
+            self.stats[(period, period_start(day, period), category)].add(co2e)
+
+    def __iter__(self) -> Iterator[Tuple[RollupKey, RunningStats]]:
+        return iter(self.stats.items())
+
+    def __len__(self) -> int:
+        return len(self.stats)
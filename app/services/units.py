@@ -0,0 +1,138 @@
+from collections import deque
+from typing import Dict, NamedTuple, Optional, Tuple
+
+# Canonical unit keys are the normalized spellings used in data/emission_factor.csv
+# (see emission_factors.normalize), plus a few common units the table does not use.
+LINEAR_UNITS: Dict[str, Tuple[str, float]] = {
+    # unit: (dimension, size in the dimension's base unit)
+    'km': ('length', 1.0),
+    'm': ('length', 0.001),
+    'miles': ('length', 1.609344),
+    'kg': ('mass', 1.0),
+    'g': ('mass', 0.001),
+    'lb': ('mass', 0.45359237),
+    'tonnes': ('mass', 1000.0),
+    'litres': ('volume', 1.0),
+    'ml': ('volume', 0.001),
+    'gallons': ('volume', 4.54609),
+    'us gallons': ('volume', 3.785411784),
+    'cubic metres': ('volume', 1000.0),
+    # An unqualified kWh is read as net calorific value, the usual reporting basis
+    'kwh': ('energy_net', 1.0),
+    'mwh': ('energy_net', 1000.0),
+    'kwh net cv': ('energy_net', 1.0),
+    'kwh gross cv': ('energy_gross', 1.0),
+    'item': ('count', 1.0),
+}
+
+UNIT_ALIASES: Dict[str, str] = {
+    'kms': 'km', 'kilometre': 'km', 'kilometres': 'km', 'kilometer': 'km', 'kilometers': 'km',
+    'metre': 'm', 'metres': 'm', 'meter': 'm', 'meters': 'm',
+    'mi': 'miles', 'mile': 'miles',
+    'kgs': 'kg', 'kilo': 'kg', 'kilos': 'kg', 'kilogram': 'kg', 'kilograms': 'kg',
+    'gm': 'g', 'gms': 'g', 'gram': 'g', 'grams': 'g',
+    'lbs': 'lb', 'pound': 'lb', 'pounds': 'lb',
+    't': 'tonnes', 'tonne': 'tonnes', 'ton': 'tonnes', 'tons': 'tonnes', 'metric tons': 'tonnes',
+    'l': 'litres', 'ltr': 'litres', 'litre': 'litres', 'liter': 'litres', 'liters': 'litres',
+    'millilitre': 'ml', 'millilitres': 'ml', 'milliliter': 'ml', 'milliliters': 'ml',
+    'gal': 'gallons', 'gallon': 'gallons', 'us gallon': 'us gallons',
+    'm3': 'cubic metres', 'cubic metre': 'cubic metres', 'cubic meter': 'cubic metres',
+    'cubic meters': 'cubic metres', 'cbm': 'cubic metres',
+    'kilowatt hour': 'kwh', 'kilowatt hours': 'kwh', 'kw h': 'kwh',
+    'megawatt hour': 'mwh', 'megawatt hours': 'mwh',
+    'kwh net': 'kwh net cv', 'kwh gross': 'kwh gross cv',
+    'items': 'item', 'piece': 'item', 'pieces': 'item', 'pc': 'item', 'pcs': 'item',
+    'unit': 'item', 'units': 'item', 'serving': 'item', 'servings': 'item',
+    'portion': 'item', 'portions': 'item', 'cup': 'item', 'cups': 'item',
+    'glass': 'item', 'glasses': 'item', 'slice': 'item', 'slices': 'item',
+    'bowl': 'item', 'bowls': 'item', 'plate': 'item', 'plates': 'item',
+}
+
+
+def canonical_unit(unit_key: str) -> Optional[str]:
+    """Map a normalized unit spelling to its canonical key, or None if unknown."""
+    if unit_key in LINEAR_UNITS:
+        return unit_key
+    return UNIT_ALIASES.get(unit_key)
+
+
+class Conversion(NamedTuple):
+    target_unit: str
+    # Quantity in target_unit = quantity in the source unit * multiplier
+    multiplier: float
+
+
+class UnitConverter:
+    """
+    Precompiled unit-conversion graph over the units that have emission factors.
+
+    For every activity the graph joins the generic same-dimension conversions
+    (miles<->km, g<->kg<->tonnes, gallons<->litres, MWh<->kWh) with fuel-specific
+    bridges implied by the factor table itself: two factors for the same fuel
+    describe the same emissions, so their ratio is the density or calorific
+    value linking those units (e.g. litres<->tonnes<->kWh). All shortest paths
+    are expanded at build time, so a lookup is a single dict access.
+    """
+
+    def __init__(self, factors_by_activity: Dict[str, Dict[str, float]]):
+        """
+        Args:
+            factors_by_activity: normalized activity -> {canonical unit: co2e per unit}
+        """
+        self._table: Dict[Tuple[str, str], Conversion] = {}
+        for activity_key, factors in factors_by_activity.items():
+            for source, conversion in self._expand(factors).items():
+                self._table[(activity_key, source)] = conversion
+
+    def convert(self, activity_key: str, unit_key: str) -> Optional[Conversion]:
+        """
+        Return how to express a quantity of ``activity_key`` in ``unit_key`` in a unit that has a factor.
+
+        Args:
+            activity_key (str): Normalized activity name
+            unit_key (str): Normalized unit spelling, aliases allowed
+
+        Returns:
+            Optional[Conversion]: Target unit and multiplier, or None if no path exists
+        """
+        unit = canonical_unit(unit_key)
+        if unit is None:
+            return None
+        return self._table.get((activity_key, unit))
+
+    @staticmethod
+    def _edges(factors: Dict[str, float]) -> Dict[str, Dict[str, float]]:
+        edges: Dict[str, Dict[str, float]] = {unit: {} for unit in LINEAR_UNITS}
+        for source, (dimension, size) in LINEAR_UNITS.items():
+            for target, (target_dimension, target_size) in LINEAR_UNITS.items():
+                if source != target and dimension == target_dimension:
+                    edges[source][target] = size / target_size
+        # Same emissions expressed in two units: q_b = q_a * f_a / f_b
+        for source, source_factor in factors.items():
+            for target, target_factor in factors.items():
+                if source != target and target_factor:
+                    edges.setdefault(source, {})[target] = source_factor / target_factor
+        return edges
+
+    @classmethod
+    def _expand(cls, factors: Dict[str, float]) -> Dict[str, Conversion]:
+        edges = cls._edges(factors)
+        expanded: Dict[str, Conversion] = {}
+        for start in edges:
+            # Breadth-first: the fewest hops gives the least rounding drift
+            seen = {start}
+            queue = deque([(start, 1.0)])
+            while queue:
+                unit, multiplier = queue.popleft()
+                if unit in factors:
+                    expanded[start] = Conversion(unit, multiplier)
+                    break
+                for target, step in edges.get(unit, {}).items():
+                    if target not in seen:
+                        seen.add(target)
+                        queue.append((target, multiplier * step))
+        return expanded
+
+    def __len__(self) -> int:
+        return len(self._table)
+
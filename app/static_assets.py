@@ -0,0 +1,187 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_SOURCE_DIR = os.path.join(APP_DIR, "assets", "css")
+STATIC_DIR = os.path.join(APP_DIR, "static")
+MANIFEST_NAME = "manifest.json"
+BUNDLE_NAME = "ecomate"
+ASSET_URL_ENV = "ECOMATE_ASSET_URL"
+
+# Stylesheets in cascade order. These apply to every page...
+GLOBAL_STYLESHEETS = ("global", "dark_theme")
+# ...and these only while the section using them has put its marker on the page
+SCOPED_STYLESHEETS = (
+    "welcome_input", "main_banner", "method_selection", "input_section", "back_button", "results",
+    "riskometer", "activity_analysis", "impact_comparison", "explanation",
+)
+# Stylesheets of components.html iframes, which the page's bundle does not reach
+EMBEDDED_STYLESHEETS = ("summary",)
+
+_COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+_ROOT_SELECTOR = re.compile(r"^(html|body|\.stApp)(?![\w-])")
+
+
+def scope_marker(name: str) -> str:
+    """Class of the marker element that turns on a scoped stylesheet."""
+    return f"ecomate-{name.replace('_', '-')}"
+
+
+def scope_css(css: str, marker: str) -> str:
+    """
+    Restrict a stylesheet to pages containing an element with class ``marker``.
+
+    Each selector is prefixed with ``.stApp:has(.marker)`` (``html``, ``body``
+    and ``.stApp`` selectors get the ``:has`` directly); rules inside @media
+    are scoped too, @keyframes are left alone.
+    """
+    css = _COMMENT.sub("", css)
+    condition = f":has(.{marker})"
+    rules: List[str] = []
+    position = 0
+    while True:
+        brace = css.find("{", position)
+        if brace < 0:
+            break
+        depth, end = 1, brace + 1
+        while depth:
+            depth += {"{": 1, "}": -1}.get(css[end], 0)
+            end += 1
+        prelude, body = css[position:brace].strip(), css[brace + 1:end - 1]
+        if prelude.startswith(("@media", "@supports")):
+            rules.append(f"{prelude} {{\n{scope_css(body, marker)}}}\n")
+        elif prelude.startswith("@"):
+            rules.append(f"{prelude} {{{body}}}\n")
+        else:
+            selectors = []
+            for selector in _split_selectors(prelude):
+                if _ROOT_SELECTOR.match(selector):
+                    selectors.append(_ROOT_SELECTOR.sub(lambda m: m.group(1) + condition, selector, count=1))
+                else:
+                    selectors.append(f".stApp{condition} {selector}")
+            rules.append(f"{', '.join(selectors)} {{{body}}}\n")
+        position = end
+    return "".join(rules)
+
+
+def _split_selectors(prelude: str) -> List[str]:
+    # Commas inside :not(...)/:is(...) do not separate selectors
+    selectors, depth, start = [], 0, 0
+    for i, char in enumerate(prelude):
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if char == "," and depth == 0:
+            selectors.append(prelude[start:i])
+            start = i + 1
+    selectors.append(prelude[start:])
+    return [" ".join(selector.split()) for selector in selectors if selector.strip()]
+
+
+class AssetBundle:
+    """
+    The UI stylesheets as one content-hashed bundle.
+
+    The sources under app/assets/css/ are joined in cascade order, the
+    section stylesheets scoped to their marker, and written to app/static/
+    as ``ecomate.<hash>.css``, which the API serves with an immutable cache
+    header. With a base URL the page links the bundle; without one the
+    bundle is inlined, which Streamlit re-sends on every rerun.
+    """
+
+    def __init__(self, source_dir: str = ASSET_SOURCE_DIR, static_dir: str = STATIC_DIR,
+                 base_url: Optional[str] = None):
+        """
+        Args:
+            source_dir (str): Directory holding the ``<name>.css`` sources
+            static_dir (str): Directory the bundle and manifest are written to
+            base_url (Optional[str]): Public URL of ``static_dir``, None to inline the bundle
+        """
+        self.source_dir = source_dir
+        self.static_dir = static_dir
+        self.base_url = base_url.rstrip("/") if base_url else None
+        self.css = ""
+        self.sources: Dict[str, str] = {}
+        self.manifest: Dict[str, str] = {}
+
+    def build(self) -> Dict[str, str]:
+        """
+        Write the bundle under its content hash, unless that file already exists.
+
+        Returns:
+            Dict[str, str]: Bundle name -> versioned file name
+        """
+        for filename in sorted(os.listdir(self.source_dir)):
+            if filename.endswith(".css"):
+                with open(os.path.join(self.source_dir, filename), "r", encoding="utf-8") as f:
+                    self.sources[filename[:-len(".css")]] = f.read()
+        parts = []
+        for name in GLOBAL_STYLESHEETS + SCOPED_STYLESHEETS:
+            css = self.sources[name]
+            if name in SCOPED_STYLESHEETS:
+                css = scope_css(css, scope_marker(name))
+            parts.append(f"/* {name} */\n{css}")
+        unbundled = set(self.sources) - set(GLOBAL_STYLESHEETS + SCOPED_STYLESHEETS + EMBEDDED_STYLESHEETS)
+        if unbundled:
+            logger.warning(f"Stylesheets not in the bundle order, left out: {sorted(unbundled)}")
+        self.css = "\n".join(parts)
+        data = self.css.encode("utf-8")
+        versioned = f"{BUNDLE_NAME}.{hashlib.sha256(data).hexdigest()[:8]}.css"
+
+        os.makedirs(self.static_dir, exist_ok=True)
+        target = os.path.join(self.static_dir, versioned)
+        if not os.path.exists(target):
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        self.manifest = {BUNDLE_NAME: versioned}
+        manifest_path = os.path.join(self.static_dir, MANIFEST_NAME)
+        with open(f"{manifest_path}.{os.getpid()}.tmp", "w") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(f"{manifest_path}.{os.getpid()}.tmp", manifest_path)
+        logger.info(f"Built {versioned} from {len(parts)} stylesheets into {self.static_dir}")
+        return self.manifest
+
+    def url(self) -> str:
+        """Public URL of the versioned bundle."""
+        return f"{self.base_url}/{self.manifest[BUNDLE_NAME]}"
+
+    def tag(self) -> str:
+        """Markup loading the bundle, for one ``st.markdown`` at the top of the page."""
+        if self.base_url:
+            return f'<link rel="stylesheet" href="{self.url()}">'
+        return f"<style>\n{self.css}</style>"
+
+    def stylesheet(self, name: str) -> str:
+        """Markup turning on a scoped stylesheet of the bundle where it is rendered."""
+        if name not in SCOPED_STYLESHEETS:
+            raise KeyError(f"Unknown scoped stylesheet: {name}")
+        return f'<span class="{scope_marker(name)}"></span>'
+
+    def embedded(self, name: str) -> str:
+        """Inline ``<style>`` of a stylesheet used inside a components.html iframe."""
+        if name not in EMBEDDED_STYLESHEETS:
+            raise KeyError(f"Unknown embedded stylesheet: {name}")
+        return f"<style>\n{self.sources[name]}</style>"
+
+
+def build_asset_bundle(base_url: Optional[str] = None) -> AssetBundle:
+    """
+    Build the app's stylesheet bundle.
+
+    Args:
+        base_url (Optional[str]): Public URL of the static directory, ECOMATE_ASSET_URL by default;
+            the bundle is only linked when one is given, since only the deployer knows which URL
+            the browser can reach
+
+    Returns:
+        AssetBundle: The built bundle
+    """
+    bundle = AssetBundle(base_url=base_url or os.getenv(ASSET_URL_ENV))
+    bundle.build()
+    return bundle
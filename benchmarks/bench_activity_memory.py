@@ -0,0 +1,72 @@
+"""
+Memory held by N analyzed activities as dicts, ActivityRecords and an ActivityBatch.
+
+Activities are sampled from data/emission_factor.csv and run through
+CarbonCalculator.calculate_records once; the same results are then held as
+result dicts, as __slots__ records and packed into a columnar ActivityBatch.
+Each representation is built under tracemalloc from the same string
+objects, so the numbers are what the container itself costs per row.
+
+    python benchmarks/bench_activity_memory.py --rows 1000000
+"""
+import argparse
+import gc
+import logging
+import os
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+os.chdir(ROOT)
+from services.activity_record import ActivityBatch, ActivityRecord  # noqa: E402
+from services.carbon_service import CarbonCalculator  # noqa: E402
+from bench_batch_footprint import make_activities  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+
+def measure(build):
+    """Return (object, bytes allocated, seconds) for build()."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    obj = build()
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    args = parser.parse_args()
+
+    calculator = CarbonCalculator()
+    # Distinct per-row strings, as real activity text would be
+    activities = make_activities(calculator, args.rows)
+    for n, activity in enumerate(activities):
+        activity['activity'] = f"{activity['activity']} #{n}"
+    records = calculator.calculate_records(activities)
+    dicts = [record.to_dict() for record in records]
+    rows = len(records)
+
+    results = [
+        ("dicts", lambda: [dict(item) for item in dicts]),
+        ("ActivityRecord", lambda: [ActivityRecord(**item) for item in dicts]),
+        ("ActivityBatch", lambda: ActivityBatch.from_records(records)),
+    ]
+    print(f"{rows} activities")
+    print(f"{'representation':<16} {'MB':>10} {'bytes/row':>10} {'build s':>8}")
+    baseline = None
+    for name, build in results:
+        obj, size, elapsed = measure(build)
+        baseline = baseline or size
+        print(f"{name:<16} {size / 2**20:>10.1f} {size / rows:>10.0f} {elapsed:>8.2f}  ({baseline / size:.1f}x smaller)")
+        del obj
+
+
+if __name__ == "__main__":
+    main()
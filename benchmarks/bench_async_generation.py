@@ -0,0 +1,84 @@
+"""
+Requests/sec of the blocking vs. async GenAIModel paths against a local fake model.
+
+Each fake call sleeps for a fixed latency to stand in for a network round-trip,
+so the numbers show how many calls one event loop keeps in flight.
+
+    python benchmarks/bench_async_generation.py --requests 256 --latency 0.05
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+from genai_model import GenAIModel, LocalUploader, ResponseCache, UploadCache  # noqa: E402
+
+SCHEMA = {"type": "object", "properties": {"emission_record": {"type": "array"}}}
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Stand-in for genai.GenerativeModel with a fixed response latency."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.payload = json.dumps({"emission_record": []})
+
+    def generate_content(self, content, generation_config=None):
+        time.sleep(self.latency)
+        return FakeResponse(self.payload)
+
+    async def generate_content_async(self, content, generation_config=None):
+        await asyncio.sleep(self.latency)
+        return FakeResponse(self.payload)
+
+
+def build_model(latency: float, max_concurrency: int) -> GenAIModel:
+    model = GenAIModel(
+        api_key="offline",
+        upload_cache=UploadCache(uploader=LocalUploader(), index_path=None),
+        response_cache=ResponseCache(max_bytes=0),
+        max_concurrency=max_concurrency
+    )
+    model.model = FakeModel(latency)
+    return model
+
+
+async def run_blocking(model: GenAIModel, requests: int) -> float:
+    # What the handlers did before: sync calls made from async code
+    async def handler(i):
+        return model.analyze_emissions(f"request {i}", SCHEMA)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(i) for i in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+async def run_async(model: GenAIModel, requests: int) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(model.aanalyze_emissions(f"request {i}", SCHEMA) for i in range(requests)))
+    return requests / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=256)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake model latency in seconds")
+    args = parser.parse_args()
+
+    blocking = asyncio.run(run_blocking(build_model(args.latency, 1), min(args.requests, 32)))
+    print(f"{'blocking':>12}: {blocking:8.1f} req/s")
+    for concurrency in (1, 8, 32, 64):
+        rate = asyncio.run(run_async(build_model(args.latency, concurrency), args.requests))
+        print(f"{'async x' + str(concurrency):>12}: {rate:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
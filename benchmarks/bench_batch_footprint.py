@@ -0,0 +1,64 @@
+"""
+Per-activity loop vs. vectorized batch carbon computation.
+
+Rows are sampled from data/emission_factor.csv (plus some unknown activities
+and 'NA' factors) and run through CarbonCalculator.calculate_carbon_footprint
+and CarbonCalculator.calculate_batch, the latter both from the same list of
+dicts and from a prebuilt DataFrame (speedup is loop vs. DataFrame input).
+
+    python benchmarks/bench_batch_footprint.py
+"""
+import logging
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+os.chdir(ROOT)
+from services.carbon_service import CarbonCalculator  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+
+def make_activities(calculator: CarbonCalculator, rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    table = calculator.emission_factors.to_dict('records')
+    activities = []
+    for _ in range(rows):
+        row = dict(rng.choice(table))
+        row['type_obj'] = row.pop('type')
+        row['quantity'] = round(rng.uniform(0.1, 50), 2)
+        if rng.random() < 0.05:
+            row['activity'] = 'Unlisted activity'
+            row['co2e_per_unit'] = 'NA'
+        activities.append(row)
+    return activities
+
+
+def timed(fn, *args, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    calculator = CarbonCalculator()
+    print(f"{'rows':>8} {'loop ms':>10} {'batch ms':>10} {'frame ms':>10} {'speedup':>8}")
+    for rows in (10, 1_000, 100_000):
+        activities = make_activities(calculator, rows)
+        frame = pd.DataFrame.from_records(activities)
+        loop = timed(calculator.calculate_carbon_footprint, activities)
+        batch = timed(calculator.calculate_batch, activities)
+        columnar = timed(calculator.calculate_batch, frame)
+        print(f"{rows:>8} {loop * 1e3:>10.2f} {batch * 1e3:>10.2f} {columnar * 1e3:>10.2f} {loop / columnar:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Bulk ingest throughput (rows/sec) and peak memory against file size.
+
+Writes synthetic activity logs sampled from data/emission_factor.csv, with
+export-style column names, then runs services.bulk_ingest.ingest_file on
+each (CSV in, CSV out). Throughput is timed on a plain run and peak memory
+taken from a second, traced run; the peak should stay roughly flat as the
+file grows, since only one chunk is alive at a time.
+
+    python benchmarks/bench_bulk_ingest.py --rows 100000 400000
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+os.chdir(ROOT)
+from services.bulk_ingest import DEFAULT_CHUNK_ROWS, ColumnMapping, ingest_file  # noqa: E402
+from services.carbon_service import CarbonCalculator  # noqa: E402
+from bench_batch_footprint import make_activities  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+EXPORT_COLUMNS = {"category": "Group", "type_obj": "Kind", "activity": "Item", "unit": "UOM", "quantity": "Qty"}
+MAPPING = ColumnMapping.parse(["Group=category", "Kind=type", "Item=activity", "UOM=unit", "Qty=quantity"])
+
+
+def write_log(calculator: CarbonCalculator, path: str, rows: int) -> None:
+    frame = pd.DataFrame.from_records(make_activities(calculator, rows))
+    frame = frame.drop(columns=["co2e_per_unit"]).rename(columns=EXPORT_COLUMNS)
+    frame["Vehicle"] = [f"VH-{n % 500:04d}" for n in range(rows)]
+    frame.to_csv(path, index=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[50_000, 200_000])
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    args = parser.parse_args()
+
+    calculator = CarbonCalculator()
+    print(f"{'rows':>9} {'file MB':>8} {'seconds':>8} {'rows/s':>10} {'peak MB':>8} {'matched':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            source = os.path.join(tmp, f"log_{rows}.csv")
+            destination = os.path.join(tmp, f"out_{rows}.csv")
+            write_log(calculator, source, rows)
+
+            start = time.perf_counter()
+            stats = ingest_file(source, destination, calculator, MAPPING, chunk_rows=args.chunk_rows)
+            elapsed = time.perf_counter() - start
+
+            # Second pass under tracemalloc for the peak; tracing slows it down too much to time
+            tracemalloc.start()
+            ingest_file(source, destination, calculator, MAPPING, chunk_rows=args.chunk_rows)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f"{stats.rows:>9} {os.path.getsize(source) / 2**20:>8.1f} {elapsed:>8.2f} "
+                  f"{stats.rows / elapsed:>10,.0f} {peak / 2**20:>8.1f} {stats.matched / stats.rows:>7.0%}")
+
+
+if __name__ == "__main__":
+    main()
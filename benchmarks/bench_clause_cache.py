@@ -0,0 +1,134 @@
+"""
+Model calls and tokens saved by the clause cache on repetitive daily logs.
+
+Generates a month of daily logs per user from a small pool of routine
+activities, each written in varying words, order, case and spacing ("had a
+beef burger and took an uber" / "Took Uber, ate beef burger"), with an
+occasional new activity. The logs go through GenAIModel.extract_tasks
+against a local fake model, once with only the exact response cache and
+once with the clause cache (unknown clauses of a log share one batched
+call), counting model calls and prompt tokens sent, preamble included.
+Clause lookup latency is timed separately.
+
+    python benchmarks/bench_clause_cache.py --users 20 --days 30
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+from genai_model import GenAIModel, LocalUploader, ResponseCache, UploadCache, estimate_tokens  # noqa: E402
+from services.clause_cache import ClauseCache  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+SCHEMA = {"type": "object", "properties": {"emission_record": {"type": "array", "items": {"type": "object"}}}}
+
+# Each routine activity in a few phrasings
+ROUTINES = [
+    ["had a beef burger", "ate beef burger", "Had a Beef Burger", "ate a beef burgers"],
+    ["took an uber", "took Uber", "took the uber"],
+    ["drove 20 km in my car", "drove 20km in the car", "Drove 20 km in car"],
+    ["had a coffee", "drank a coffee", "had coffee this morning"],
+    ["took the bus to work", "took bus to work", "Took the bus to work"],
+    ["had a bowl of rice", "ate a bowl of rice", "had bowl of rice"],
+    ["rode the motorbike 8 miles", "rode motorbike 8 miles", "Rode the motorbike 8 miles"],
+    ["used 3 litres of LPG for the heater", "used 3 litres of lpg for heater"],
+    ["had a glass of milk", "drank a glass of milk"],
+    ["cooked with natural gas", "cooked with the natural gas"],
+    ["had a cappuccino with oat milk", "had a capuccino with oat milk", "drank a cappucino with oat milk"],
+]
+SEPARATORS = [", ", " and ", ". ", "; ", " then "]
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Returns one record per input (clause or batched input id) and counts calls and prompt tokens."""
+
+    def __init__(self):
+        self.calls = 0
+        self.tokens = 0
+
+    def generate_content(self, content, generation_config=None):
+        self.calls += 1
+        self.tokens += estimate_tokens(content[0])
+        tagged = re.findall(r"\[input_id: (\w+)\] (.*)", content[0])
+        if tagged:
+            results = [{"input_id": input_id, "emission_record": [{"activity": clause}]} for input_id, clause in tagged]
+            return FakeResponse(json.dumps({"results": results}))
+        return FakeResponse(json.dumps({"emission_record": [{"activity": content[0][-40:]}]}))
+
+
+def make_logs(users: int, days: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    logs = []
+    for user in range(users):
+        routine = rng.sample(range(len(ROUTINES)), 4)
+        for day in range(days):
+            picks = [rng.choice(ROUTINES[i]) for i in rng.sample(routine, rng.randint(2, 4))]
+            if rng.random() < 0.2:
+                picks.append(f"bought {rng.randint(1, 5)} new item {user}-{day}")
+            text = picks[0]
+            for clause in picks[1:]:
+                text += rng.choice(SEPARATORS) + clause
+            logs.append(text)
+    return logs
+
+
+def run(logs: list, clause_cache) -> tuple:
+    model = GenAIModel(
+        api_key="offline",
+        upload_cache=UploadCache(uploader=LocalUploader(), index_path=None),
+        response_cache=ResponseCache(),
+        clause_cache=clause_cache,
+    )
+    fake = model.model = FakeModel()
+    for text in logs:
+        model.extract_tasks(text, SCHEMA)
+    return fake, model
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--threshold", type=float, default=0.8)
+    args = parser.parse_args()
+
+    logs = make_logs(args.users, args.days)
+    print(f"{len(logs)} logs, e.g. {logs[0]!r}")
+    print(f"{'cache':<16} {'model calls':>12} {'prompt tokens':>14}")
+    baseline, _ = run(logs, None)
+    print(f"{'exact only':<16} {baseline.calls:>12} {baseline.tokens:>14,}")
+    cache = ClauseCache(threshold=args.threshold)
+    clauses, model = run(logs, cache)
+    print(f"{'clause cache':<16} {clauses.calls:>12} {clauses.tokens:>14,}")
+    print(f"calls saved {1 - clauses.calls / baseline.calls:.0%}, lookups {cache.stats()}")
+    stats = model.clause_stats.as_dict()
+    print(f"clause hit ratio {stats['hit_ratio']:.0%}, ~{stats['tokens_saved']:,} prompt tokens saved "
+          f"(preamble included) of {stats['tokens_saved'] + stats['tokens_sent']:,}")
+
+    samples = []
+    for text in logs[:500]:
+        for clause in cache.split(text):
+            begin = time.perf_counter()
+            cache.lookup(clause)
+            samples.append(time.perf_counter() - begin)
+    samples.sort()
+    print(f"lookup latency: median {statistics.median(samples) * 1e6:.1f} us, "
+          f"p99 {samples[int(len(samples) * 0.99)] * 1e6:.1f} us over {len(samples)} clauses")
+
+
+if __name__ == "__main__":
+    main()
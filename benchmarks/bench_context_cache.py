@@ -0,0 +1,116 @@
+"""
+Server-side preamble caching: handle lifecycle and prompt tokens sent per call.
+
+Runs analyze_emissions and extract_tasks calls spread over a simulated day
+against an offline cached-content client with a fake clock. Every call made
+through cached content checks that its handle is still alive, so the run
+fails if ContextCache ever hands out an expired handle; the counters show
+handles created once, extended before expiry and recreated after idle gaps.
+A second run makes creation fail, checking that calls fall back to sending
+the preamble inline. Token counts are estimated (about four characters per
+token, 258 per attached PDF page). The cache runs with its default size
+floor (MIN_CACHED_TOKENS), which the shared preamble of all tasks meets in
+both modes.
+
+    python benchmarks/bench_context_cache.py --calls 2000 --hours 24
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+os.chdir(ROOT)
+from genai_model import (  # noqa: E402
+    ContextCache, GenAIModel, LocalContextCacheClient, LocalUploader, ResponseCache, UploadCache, estimate_tokens
+)
+from services.factor_vocabulary import factor_context  # noqa: E402
+from bench_prompt_slimming import TOKENS_PER_PDF_PAGE, pdf_pages  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+SCHEMA = {"type": "object", "properties": {"emission_record": {"type": "array", "items": {"type": "object"}}}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeResponse:
+    text = json.dumps({"emission_record": []})
+
+
+class FakeModel:
+    """Counts the estimated input tokens it is sent; bound models check their handle is alive."""
+
+    def __init__(self, meter: dict, client: LocalContextCacheClient = None, handle=None):
+        self.meter = meter
+        self.client = client
+        self.handle = handle
+
+    def generate_content(self, content, generation_config=None):
+        if self.handle is not None and not self.client.live(self.handle):
+            raise AssertionError(f"Call referenced expired cached content {self.handle.name}")
+        self.meter["calls"] += 1
+        self.meter["tokens"] += sum(
+            estimate_tokens(part) if isinstance(part, str) else self.meter["file_tokens"] for part in content
+        )
+        return FakeResponse()
+
+
+class FailingClient(LocalContextCacheClient):
+    def create(self, *args, **kwargs):
+        raise RuntimeError("Cached content too small")
+
+
+def run(mode: str, calls: int, hours: float, client: LocalContextCacheClient, clock: FakeClock, seed: int = 0) -> tuple:
+    vocabulary, factor_files = factor_context(mode)
+    meter = {"calls": 0, "tokens": 0, "file_tokens": TOKENS_PER_PDF_PAGE * pdf_pages(factor_files[0]) if factor_files else 0}
+    cache = ContextCache(client=client, model_factory=lambda cached_content: FakeModel(meter, client, cached_content),
+                         clock=clock)
+    model = GenAIModel(
+        api_key="offline",
+        upload_cache=UploadCache(uploader=LocalUploader(), index_path=None),
+        response_cache=ResponseCache(max_bytes=0),
+        factor_vocabulary=vocabulary,
+        factor_files=factor_files,
+        context_cache=cache,
+    )
+    model.model = FakeModel(meter)
+
+    rng = random.Random(seed)
+    # Bursty traffic: mostly seconds apart, with occasional idle gaps longer than the cache TTL
+    for n in range(calls):
+        clock.now += rng.expovariate(calls / (hours * 3600)) * (8 if rng.random() < 0.02 else 1)
+        text = f"Drove {n % 50 + 1} km in a small car and had a coffee"
+        if n % 2:
+            model.analyze_emissions(text, SCHEMA)
+        else:
+            model.extract_tasks(text, SCHEMA)
+    return cache.stats(), meter
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--hours", type=float, default=24.0)
+    args = parser.parse_args()
+
+    print(f"{'run':<22} {'creates':>8} {'refreshes':>9} {'hits':>6} {'failures':>8} {'sent tokens/call':>16}")
+    for mode in ("vocabulary", "pdf"):
+        clock = FakeClock()
+        for label, client in ((f"{mode}, cached", LocalContextCacheClient(clock)), (f"{mode}, create fails", FailingClient(clock))):
+            stats, meter = run(mode, args.calls, args.hours, client, clock)
+            print(f"{label:<22} {stats['creates']:>8} {stats['refreshes']:>9} {stats['hits']:>6} "
+                  f"{stats['failures']:>8} {meter['tokens'] / meter['calls']:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Coverage, accuracy and latency of the rule-based fast path in front of extract_tasks.
+
+Runs a corpus of activity clauses, from formulaic ("used 3 litres of
+diesel") to free-form ("grabbed lunch at the canteen"), through the
+FastPathExtractor. Coverage is the share of clauses it answers without the
+model; accuracy compares each answered clause with the reference record
+(same table activity, and emissions within 1%). Offline the references are
+hand-labelled model answers for these clauses; with --live and
+GOOGLE_API_KEY set they come from real extract_tasks calls instead.
+Latency is per clause, split by covered and routed clauses. Finally the
+corpus is combined into daily logs and sent through
+GenAIModel.extract_tasks against a local fake model, with and without the
+fast path, counting the model calls and clauses that still reach it.
+
+    python benchmarks/bench_fast_path.py
+    python benchmarks/bench_fast_path.py --live
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+os.chdir(ROOT)
+from genai_model import GenAIModel, LocalUploader, ResponseCache, UploadCache  # noqa: E402
+from services.carbon_service import get_factor_registry  # noqa: E402
+from services.clause_cache import split_clauses  # noqa: E402
+from services.emission_factors import normalize  # noqa: E402
+from services.factor_vocabulary import factor_context  # noqa: E402
+from services.fast_path import FastPathExtractor  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+SCHEMA = {"type": "object", "properties": {"emission_record": {"type": "array", "items": {"type": "object"}}}}
+
+# Clause -> reference (activity, quantity, unit) records, as the model extracts them
+CORPUS = [
+    ("drove 20 km in a petrol car", [("Average car", 20, "km")]),
+    ("drove 20km in my car", [("Average car", 20, "km")]),
+    ("Drove 12 miles in my small car", [("Small car", 12, "miles")]),
+    ("drove 35 km in the large car", [("Large car", 35, "km")]),
+    ("took the diesel car 50 km to the coast", [("Average car", 50, "km")]),
+    ("rode the motorbike 8 miles", [("Average", 8, "miles")]),
+    ("rode my small motorbike 6 km", [("Small", 6, "km")]),
+    ("15 km on a motorcycle", [("Average", 15, "km")]),
+    ("drove 40 miles in an executive car", [("Executive", 40, "miles")]),
+    ("used 3 litres of diesel", [("Diesel (average biofuel blend)", 3, "litres")]),
+    ("filled up 30 litres of petrol", [("Petrol (average biofuel blend)", 30, "litres")]),
+    ("used 2 gallons of petrol", [("Petrol (average biofuel blend)", 9.09218, "litres")]),
+    ("used 3 litres of LPG for the heater", [("LPG", 3, "litres")]),
+    ("burned 10 kWh of natural gas", [("Natural gas", 10, "kWh (Net CV)")]),
+    ("heated the house with 25 kwh of natural gas", [("Natural gas", 25, "kWh (Net CV)")]),
+    ("used 5 litres of propane for the barbecue", [("Propane", 5, "litres")]),
+    ("had two coffees", [("Coffee Cup", 2, "item")]),
+    ("had a coffee", [("Coffee Cup", 1, "item")]),
+    ("drank a cup of tea", [("Tea Cup", 1, "item")]),
+    ("had 3 cups of tea", [("Tea Cup", 3, "item")]),
+    ("ate a croissant", [("Croissant", 1, "item")]),
+    ("had an avocado", [("Avocado", 1, "item")]),
+    ("ate 300 g of tofu", [("Tofu Block", 0.3, "kg")]),
+    ("ate 200g of rice", [("Bowl of Rice", 0.2, "kg")]),
+    ("bought 1 kg of tomatoes", [("Tomato", 1, "kg")]),
+    ("0.5 kg potatoes for dinner", [("Potato", 0.5, "kg")]),
+    ("had a glass of almond milk", [("Almond Milk (Glass)", 1, "item")]),
+    ("ate a slice of pizza", [("Pizza Slice (Cheese)", 1, "item")]),
+    ("ate a chocolate bar", [("Chocolate Bar", 1, "item")]),
+    ("ate 200g chicken", [("Chicken Sandwich", 0.2, "kg")]),
+    ("had a beef burger", [("Beef Burger", 0.25, "kg")]),
+    ("ate 2 bananas", [("Banana", 0.24, "kg")]),
+    ("had a glass of milk", [("Glass of Milk", 0.25, "kg")]),
+    ("drove 30 km in an electric car", [("Average car", 30, "km")]),
+    ("drove to work", [("Average car", 10, "km")]),
+    ("drove 20 km with 2 friends", [("Average car", 20, "km")]),
+    ("had a croissant and a coffee", [("Croissant", 1, "item"), ("Coffee Cup", 1, "item")]),
+    ("took the bus to work", [("Average car", 10, "km")]),
+    ("grabbed lunch at the canteen", [("Mixed Veg Bowl", 0.4, "kg")]),
+    ("had a cappuccino with oat milk", [("Coffee Cup", 1, "item")]),
+]
+SEPARATORS = [", ", ". ", "; ", " then "]
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Answers with the corpus references and counts calls and the clauses sent to it."""
+
+    def __init__(self, references: dict):
+        self.references = references
+        self.calls = 0
+        self.clauses = 0
+
+    def answer(self, text: str) -> list:
+        clauses = split_clauses(text)
+        self.clauses += len(clauses)
+        return [record for clause in clauses for record in self.references.get(clause, [])]
+
+    def generate_content(self, content, generation_config=None):
+        self.calls += 1
+        tagged = re.findall(r"\[input_id: (\w+)\] (.*)", content[0])
+        if tagged:
+            results = [{"input_id": input_id, "emission_record": self.answer(clause)} for input_id, clause in tagged]
+            return FakeResponse(json.dumps({"results": results}))
+        text = content[0].rsplit("InputText: ", 1)[-1].strip()
+        return FakeResponse(json.dumps({"emission_record": self.answer(text)}))
+
+
+def reference_records(index, references) -> list:
+    records = []
+    for activity, quantity, unit in references:
+        match = index.resolve(None, None, activity, unit)
+        records.append({
+            "category": match.category, "type_obj": match.type, "activity": match.activity,
+            "quantity": quantity, "unit": unit, "co2e_per_unit": match.co2e_per_unit,
+        })
+    return records
+
+
+def build_model(live: bool, references: dict = None, fast_path=None) -> GenAIModel:
+    vocabulary, factor_files = factor_context()
+    model = GenAIModel(
+        api_key=os.getenv("GOOGLE_API_KEY") if live else "offline",
+        upload_cache=UploadCache(index_path=None) if live else UploadCache(uploader=LocalUploader(), index_path=None),
+        response_cache=ResponseCache(max_bytes=0),
+        factor_vocabulary=vocabulary,
+        factor_files=factor_files,
+        fast_path=fast_path,
+    )
+    if not live:
+        model.model = FakeModel(references)
+    return model
+
+
+def emissions(index, record: dict) -> float:
+    match = index.resolve(record.get("category"), record.get("type_obj"), record.get("activity"), record.get("unit"))
+    return float(record.get("quantity", 0)) * match.co2e_per_unit if match is not None else float("nan")
+
+
+def agrees(index, fast: list, reference: list) -> tuple:
+    """(same activities, emissions within 1%) of a fast-path answer and its reference."""
+    same_activity = sorted(normalize(r["activity"]) for r in fast) == sorted(normalize(r["activity"]) for r in reference)
+    fast_co2e = sum(emissions(index, r) for r in fast)
+    reference_co2e = sum(emissions(index, r) for r in reference)
+    return same_activity, abs(fast_co2e - reference_co2e) <= 0.01 * max(abs(reference_co2e), 1e-9)
+
+
+def percentiles(samples: list) -> str:
+    if not samples:
+        return "-"
+    samples = sorted(samples)
+    pick = lambda q: samples[min(int(len(samples) * q), len(samples) - 1)] * 1e6  # noqa: E731
+    return f"p50 {pick(0.5):.1f}  p90 {pick(0.9):.1f}  p99 {pick(0.99):.1f}  max {samples[-1] * 1e6:.1f} us"
+
+
+def make_logs(clauses: list, count: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    logs = []
+    for _ in range(count):
+        picks = rng.sample(clauses, rng.randint(2, 4))
+        text = picks[0]
+        for clause in picks[1:]:
+            text += rng.choice(SEPARATORS) + clause
+        logs.append(text)
+    return logs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Take the references from real extract_tasks calls")
+    parser.add_argument("--repeat", type=int, default=200, help="Timed passes over the corpus")
+    parser.add_argument("--logs", type=int, default=500)
+    args = parser.parse_args()
+    if args.live and not os.getenv("GOOGLE_API_KEY"):
+        parser.error("--live needs GOOGLE_API_KEY")
+
+    index = get_factor_registry().index
+    fast_path = FastPathExtractor()
+    references = {clause: reference_records(index, records) for clause, records in CORPUS}
+    if args.live:
+        model = build_model(live=True)
+        references = {clause: model.extract_tasks(clause, SCHEMA)["emission_record"] for clause, _ in CORPUS}
+
+    covered = activity_ok = co2e_ok = 0
+    print(f"{'clause':<42} {'fast path':<32} {'agrees':>6}")
+    for clause, _ in CORPUS:
+        records = fast_path.extract_clause(clause)
+        if records is None:
+            print(f"{clause:<42} {'-> model':<32}")
+            continue
+        covered += 1
+        same_activity, same_co2e = agrees(index, records, references[clause])
+        activity_ok += same_activity
+        co2e_ok += same_activity and same_co2e
+        label = "; ".join(f"{r['activity']} {r['quantity']:g} {r['unit']}" for r in records)
+        print(f"{clause:<42} {label:<32} {'yes' if same_activity and same_co2e else 'NO':>6}")
+    print(f"coverage {covered / len(CORPUS):.0%} ({covered}/{len(CORPUS)} clauses), "
+          f"accuracy on covered: activity {activity_ok / max(covered, 1):.0%}, "
+          f"activity and emissions {co2e_ok / max(covered, 1):.0%}")
+
+    hit_samples, miss_samples = [], []
+    for _ in range(args.repeat):
+        for clause, _ in CORPUS:
+            begin = time.perf_counter()
+            records = fast_path.extract_clause(clause)
+            (miss_samples if records is None else hit_samples).append(time.perf_counter() - begin)
+    print(f"latency covered: {percentiles(hit_samples)}")
+    print(f"latency routed:  {percentiles(miss_samples)}")
+
+    if args.live:
+        return
+    logs = make_logs([clause for clause, _ in CORPUS], args.logs)
+    print(f"{len(logs)} logs, e.g. {logs[0]!r}")
+    print(f"{'extract_tasks':<16} {'model calls':>12} {'clauses to model':>17} {'records':>8}")
+    for label, extractor in (("model only", None), ("fast path", FastPathExtractor())):
+        model = build_model(live=False, references=references, fast_path=extractor)
+        records = sum(len(model.extract_tasks(text, SCHEMA)["emission_record"]) for text in logs)
+        print(f"{label:<16} {model.model.calls:>12} {model.model.clauses:>17} {records:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+HistoryStore insert throughput and "last 90 days by category" query latency.
+
+Fills a fresh database with a year of analyses for a few users, then times
+the 90-day per-category query three ways: from the day rollups, from the
+week rollups, and as a GROUP BY over the raw activities (which still uses
+the (user, day, category) index), plus the running-stats trend queries
+behind the trends endpoint.
+
+    python benchmarks/bench_history_store.py --activities 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+from services.history_store import HistoryStore  # noqa: E402
+
+CATEGORIES = ["Food", "Transport", "Energy", "Shopping", "Waste"]
+
+
+def fill(store: HistoryStore, users: int, activities: int, per_analysis: int, today: date, seed: int = 0) -> float:
+    rng = random.Random(seed)
+    start = datetime.combine(today - timedelta(days=364), datetime.min.time()).timestamp()
+    began = time.perf_counter()
+    for n in range(activities // per_analysis):
+        records = [
+            {"text": f"activity {n}.{i}", "category": rng.choice(CATEGORIES),
+             "quantity": rng.uniform(0.1, 20), "unit": "kg", "co2e": rng.uniform(0.01, 5)}
+            for i in range(per_analysis)
+        ]
+        store.record(f"user{n % users}", records, recorded_at=start + rng.uniform(0, 365 * 86400))
+    return time.perf_counter() - began
+
+
+def timed(fn, repeat: int = 20) -> float:
+    samples = []
+    for _ in range(repeat):
+        begin = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - begin)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--activities", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--per-analysis", type=int, default=8)
+    args = parser.parse_args()
+
+    today = date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = HistoryStore(os.path.join(tmp, "history.sqlite3"))
+        elapsed = fill(store, args.users, args.activities, args.per_analysis, today)
+        rows = store.count()
+        print(f"inserted {rows} activities in {elapsed:.1f} s ({rows / elapsed:,.0f} rows/s)")
+
+        since = (today - timedelta(days=89)).isoformat()
+        raw = (
+            "SELECT day, category, COUNT(*), SUM(co2e) FROM activities "
+            "WHERE user = ? AND day >= ? GROUP BY day, category"
+        )
+        queries = [
+            ("day rollups", lambda: store.totals("user0", "day", days=90, today=today)),
+            ("week rollups", lambda: store.totals("user0", "week", days=90, today=today)),
+            ("raw GROUP BY", lambda: store._db.execute(raw, ("user0", since)).fetchall()),
+            ("trend, 12 weeks", lambda: store.trend("user0", "week", 12, today=today)),
+            ("trend, 12 months", lambda: store.trend("user0", "month", 12, today=today)),
+        ]
+        print(f"{'query (user0)':<26} {'ms':>8}")
+        for name, query in queries:
+            print(f"{name:<26} {timed(query) * 1e3:>8.2f}")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
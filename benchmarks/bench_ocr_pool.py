@@ -0,0 +1,85 @@
+"""
+OCR throughput of the receipt pipeline on synthetic receipts drawn with PIL.
+
+Reports pre-processing cost and images/sec (total and per worker) for the
+OCRPool at several worker counts. Needs the tesseract binary for the OCR
+rows; without it only pre-processing is measured.
+
+    python benchmarks/bench_ocr_pool.py --images 32
+"""
+import argparse
+import asyncio
+import io
+import os
+import random
+import sys
+import time
+
+import pytesseract
+from PIL import Image, ImageDraw, ImageFilter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+from services.ocr import OCRPool, preprocess_image  # noqa: E402
+
+ITEMS = ["Beef Burger", "Chicken Sandwich", "Coffee Cup", "Bowl of Rice", "Diesel 40L", "Banana", "Tofu Block"]
+
+
+def synthetic_receipt(seed: int, size=(1240, 2480)) -> bytes:
+    """A phone-photo sized receipt: tinted paper, dark text lines and a little blur."""
+    rng = random.Random(seed)
+    image = Image.new("RGB", size, (235 + rng.randint(0, 20), 230, 215))
+    draw = ImageDraw.Draw(image)
+    y = 120
+    draw.text((100, y), "GREEN GROCER LTD", fill=(20, 20, 20))
+    for _ in range(rng.randint(8, 20)):
+        y += 90
+        draw.text((100, y), f"{rng.choice(ITEMS):<24} {rng.uniform(1, 30):6.2f}", fill=(30, 30, 30))
+    image = image.rotate(rng.uniform(-2, 2), expand=False, fillcolor=(200, 200, 200))
+    image = image.filter(ImageFilter.GaussianBlur(0.8))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def tesseract_available() -> bool:
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+async def run_pool(images, workers: int) -> float:
+    pool = OCRPool(workers=workers, max_pending=len(images))
+    try:
+        await pool.run(images[0])  # warm up the worker processes
+        start = time.perf_counter()
+        await asyncio.gather(*(pool.run(image) for image in images))
+        return len(images) / (time.perf_counter() - start)
+    finally:
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=32)
+    args = parser.parse_args()
+
+    images = [synthetic_receipt(seed) for seed in range(args.images)]
+    start = time.perf_counter()
+    for image in images:
+        preprocess_image(Image.open(io.BytesIO(image)))
+    per_image = (time.perf_counter() - start) / len(images)
+    print(f"pre-processing: {per_image * 1e3:.1f} ms/image")
+
+    if not tesseract_available():
+        print("tesseract not found; skipping OCR throughput")
+        return
+    cores = os.cpu_count() or 1
+    for workers in sorted({1, max(1, cores // 2), cores}):
+        rate = asyncio.run(run_pool(images, workers))
+        print(f"{workers:>2} workers: {rate:6.2f} images/s, {rate / workers:6.2f} images/s per worker")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Input tokens and latency of the embedded factor vocabulary vs. attaching emission_factor.pdf.
+
+Builds the extract_tasks and analyze_emissions requests for a few sample
+texts in both factor context modes. Offline, tokens are estimated (about
+four characters per token, and 258 tokens per attached PDF page as Gemini
+bills documents) and latency covers request preparation only: prompt
+building, file hashing and the upload cache lookup. With --live and
+GOOGLE_API_KEY set, tokens come from the model's count_tokens and latency
+is the median round-trip of uncached generate_content calls.
+
+    python benchmarks/bench_prompt_slimming.py
+    python benchmarks/bench_prompt_slimming.py --live --repeat 5
+"""
+import argparse
+import logging
+import os
+import re
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+os.chdir(ROOT)
+from genai_model import GenAIModel, LocalUploader, ResponseCache, UploadCache, estimate_tokens  # noqa: E402
+from services.factor_vocabulary import EMISSION_FACTOR_PDF, compile_vocabulary, factor_context  # noqa: E402
+from services.carbon_service import get_factor_registry  # noqa: E402
+
+logging.disable(logging.CRITICAL)
+
+# Gemini counts every document page as this many input tokens
+TOKENS_PER_PDF_PAGE = 258
+
+SCHEMA = {"type": "object", "properties": {"emission_record": {"type": "array", "items": {"type": "object"}}}}
+
+SAMPLES = [
+    "I drove 20 km in my medium car and had a beef burger for lunch.",
+    "Took the motorbike 8 miles to work, drank two coffees and ate a banana.",
+    "Used 3 litres of LPG for the heater and had a bowl of rice with tofu for dinner.",
+]
+
+
+def pdf_pages(path: str) -> int:
+    with open(path, "rb") as f:
+        return len(re.findall(rb"/Type\s*/Page[^s]", f.read()))
+
+
+def build_model(mode: str, live: bool) -> tuple:
+    vocabulary, context_files = factor_context(mode)
+    model = GenAIModel(
+        api_key=os.getenv("GOOGLE_API_KEY") if live else "offline",
+        upload_cache=UploadCache(index_path=None) if live else UploadCache(uploader=LocalUploader(), index_path=None),
+        response_cache=ResponseCache(max_bytes=0),
+        factor_vocabulary=vocabulary,
+    )
+    return model, context_files
+
+
+def requests_for(model: GenAIModel, text: str) -> list:
+    return [
+        ("extract_tasks", model._extract_tasks_instructions() + model._input_text_prompt(text)),
+        ("analyze_emissions", model._analyze_emissions_instructions() + model._analyze_emissions_prompt(text)),
+    ]
+
+
+def median_ms(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--live", action="store_true", help="Count tokens and time calls against the real model")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    if args.live and not os.getenv("GOOGLE_API_KEY"):
+        parser.error("--live needs GOOGLE_API_KEY")
+
+    factors = get_factor_registry().emission_factors
+    print(f"vocabulary: compile {median_ms(lambda: compile_vocabulary(factors), 20):.2f} ms, "
+          f"prebuilt lookup {median_ms(lambda: factor_context('vocabulary'), args.repeat) * 1e3:.1f} us")
+    pages = pdf_pages(EMISSION_FACTOR_PDF)
+
+    # Offline only request preparation is timed, which is far below a millisecond
+    unit, scale = ("ms", 1) if args.live else ("us", 1e3)
+    print(f"{'mode':<11} {'request':<18} {'input tokens':>13} {'latency ' + unit:>11}")
+    totals = {}
+    for mode in ("pdf", "vocabulary"):
+        model, context_files = build_model(mode, args.live)
+        for name, _ in requests_for(model, SAMPLES[0]):
+            tokens, latencies = [], []
+            for text in SAMPLES:
+                prompt = dict(requests_for(model, text))[name]
+                if args.live:
+                    tokens.append(model.model.count_tokens(model._build_content(prompt, context_files)).total_tokens)
+                    latencies.append(median_ms(lambda: model.generate_content(prompt, SCHEMA, context_files), args.repeat))
+                else:
+                    tokens.append(estimate_tokens(prompt) + TOKENS_PER_PDF_PAGE * pages * len(context_files))
+                    latencies.append(median_ms(lambda: model._build_content(prompt, context_files), args.repeat))
+            totals[mode, name] = statistics.mean(tokens)
+            print(f"{mode:<11} {name:<18} {totals[mode, name]:>13,.0f} {statistics.mean(latencies) * scale:>11.2f}")
+
+    for name in ("extract_tasks", "analyze_emissions"):
+        saved = 1 - totals["vocabulary", name] / totals["pdf", name]
+        print(f"{name}: {saved:.0%} fewer input tokens per call with the vocabulary")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Script execution time of app/main.py per Streamlit rerun, driven with AppTest.
+
+Measures the first (cold) run and the mean of warm reruns on the welcome
+page and on the results page with sample carbon data, plus the per-section
+render times the results page records in session state. To compare against
+an older revision, export its script and pass it with --script:
+
+    git show <rev>:app/main.py > /tmp/main_before.py
+    python benchmarks/bench_streamlit_rerun.py --script /tmp/main_before.py
+    python benchmarks/bench_streamlit_rerun.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from streamlit.testing.v1 import AppTest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+os.chdir(ROOT)
+
+SAMPLE_CARBON_DATA = [
+    {'text': 'Beef Burger', 'category': 'Food', 'type': 'Non-vegetarian', 'co2e': 1.8, 'quantity': 0.2,
+     'unit': 'kg', 'co2e_impact_level': 'HIGH', 'suggestion': 'Try a bean burrito'},
+    {'text': 'Average car', 'category': 'Transport', 'type': 'Cars (by size)', 'co2e': 2.55, 'quantity': 15,
+     'unit': 'km', 'co2e_impact_level': 'MEDIUM', 'suggestion': 'Take the bus'},
+]
+
+
+def timed_run(app: AppTest) -> float:
+    start = time.perf_counter()
+    app.run()
+    elapsed = time.perf_counter() - start
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return elapsed
+
+
+def bench(script: str, reruns: int) -> None:
+    app = AppTest.from_file(script, default_timeout=120)
+    cold = timed_run(app)
+    welcome = [timed_run(app) for _ in range(reruns)]
+
+    app.session_state.page = 'main'
+    app.session_state.user_name = 'Bench'
+    app.session_state.input_method_selected = 'Text Input'
+    app.session_state.carbon_data = SAMPLE_CARBON_DATA
+    timed_run(app)
+    results = [timed_run(app) for _ in range(reruns)]
+
+    print(f"script: {os.path.relpath(script)}")
+    print(f"  cold run:              {cold * 1e3:8.1f} ms")
+    print(f"  welcome rerun (mean):  {statistics.mean(welcome) * 1e3:8.1f} ms")
+    print(f"  results rerun (mean):  {statistics.mean(results) * 1e3:8.1f} ms")
+    if "section_timings" in app.session_state:
+        for name, stats in app.session_state.section_timings.items():
+            print(f"    {name + ' (mean):':<27}{stats['total_ms'] / stats['runs']:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--script", default=os.path.join(ROOT, "app", "main.py"))
+    parser.add_argument("--reruns", type=int, default=10)
+    args = parser.parse_args()
+    bench(os.path.abspath(args.script), args.reruns)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+# The API is imported as app.api, since it uses package-relative imports
+sys.path.insert(1, ROOT)
+# Data paths such as data/emission_factor.csv are relative to the repository root
+os.chdir(ROOT)
@@ -0,0 +1,42 @@
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import api
+from app.services.carbon_service import CarbonCalculator
+from app.services.history_store import HistoryStore
+
+ACTIVITIES = [
+    {"category": "Food", "type_obj": "Non-vegetarian", "activity": "Beef Burger", "quantity": 0.2, "unit": "kg",
+     "co2e_per_unit": 9, "co2e_impact_level": "HIGH", "suggestion": "Try beans"},
+    {"category": "Transport", "type_obj": "Motorbike", "activity": "Small", "quantity": 10, "unit": "km",
+     "co2e_per_unit": 0.08, "co2e_impact_level": "LOW", "suggestion": ""},
+]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def astream_analyze_emissions(text, emission_schema, context_files=None):
+        for activity in ACTIVITIES:
+            yield activity
+
+    monkeypatch.setattr(api.genai_model, "astream_analyze_emissions", astream_analyze_emissions)
+    monkeypatch.setattr(api.app.state, "calculator", CarbonCalculator(), raising=False)
+    monkeypatch.setattr(api.app.state, "history", HistoryStore(":memory:"), raising=False)
+    return TestClient(api.app)
+
+
+def test_streamed_analysis_is_recorded_for_the_user(client):
+    response = client.post("/analyze/text", params={"text": "burger and a ride", "stream": "true", "user": "a"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["footprint"]["text"] for line in lines] == ["Beef Burger", "Small"]
+    history = api.app.state.history
+    assert history.count("a") == 2
+    [(_, count, co2e)] = history.totals("a", "day", by_category=False)
+    assert count == 2 and co2e == pytest.approx(sum(line["footprint"]["co2e"] for line in lines))
+
+
+def test_streamed_analysis_without_a_user_is_not_recorded(client):
+    client.post("/analyze/text", params={"text": "burger and a ride", "stream": "true"})
+    assert api.app.state.history.count() == 0
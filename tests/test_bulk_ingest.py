@@ -0,0 +1,25 @@
+import io
+
+import pytest
+
+from services.bulk_ingest import ColumnMapping, IngestStats, ingest_chunks
+from services.carbon_service import CarbonCalculator
+
+
+@pytest.fixture(scope="module")
+def calculator():
+    return CarbonCalculator()
+
+
+def test_fuzzy_matches_are_marked_and_counted(calculator):
+    log = io.StringIO("Fuel,Litres\nDiesel (average biofuel blend),10\nUnknown Fuel,5\n")
+    mapping = ColumnMapping.parse(
+        ["Fuel=activity", "Litres=quantity"], ["category=Fuels", "type=Liquid fuels", "unit=litres"]
+    )
+    stats = IngestStats()
+    result = next(ingest_chunks(log, calculator, mapping, stats=stats))
+
+    assert list(result["factor_source"]) == ["local", "fuzzy"]
+    assert result["matched_activity"].iloc[0] == "Diesel (average biofuel blend)"
+    assert result["matched_activity"].iloc[1] not in (None, "Unknown Fuel")
+    assert stats.as_dict()["matched"] == 2 and stats.as_dict()["fuzzy"] == 1
@@ -0,0 +1,61 @@
+import pytest
+
+from services.carbon_service import CarbonCalculator
+
+MODEL_FACTOR = 27.0
+
+
+@pytest.fixture(scope="module")
+def calculator():
+    return CarbonCalculator()
+
+
+def activity(name, unit, category="Food", type_label="Non-vegetarian", co2e_per_unit=MODEL_FACTOR):
+    return {"category": category, "type_obj": type_label, "activity": name, "unit": unit,
+            "quantity": 1, "co2e_per_unit": co2e_per_unit}
+
+
+@pytest.mark.parametrize("name, unit, category, type_label", [
+    ("Beef", "kg", "Food", "Non-vegetarian"),
+    ("Chicken", "kg", "Food", "Non-vegetarian"),
+    ("Coffee", "cup", "Food", "Vegetarian"),
+    ("Electricity", "kWh", "Energy", "Electricity"),
+    ("Gas", "kWh", "Fuels", "Gaseous fuels"),
+])
+def test_fuzzy_match_keeps_model_factor(calculator, name, unit, category, type_label):
+    record = activity(name, unit, category, type_label)
+    assert calculator.resolve_factor(record) == (MODEL_FACTOR, "model")
+    batch = calculator.calculate_batch([record])
+    assert batch["co2e_per_unit"].iloc[0] == MODEL_FACTOR
+    assert batch["factor_source"].iloc[0] == "model"
+
+
+def test_exact_match_overrides_model(calculator):
+    factor, source = calculator.resolve_factor(activity("Beef Burger", "kg"))
+    assert source == "local" and factor != MODEL_FACTOR
+
+
+def test_same_activity_with_unit_conversion_is_local(calculator):
+    per_kg, _ = calculator.resolve_factor(activity("Beef Burger", "kg"))
+    factor, source = calculator.resolve_factor(activity("beef burgers", "g"))
+    assert source == "local"
+    assert factor == pytest.approx(per_kg / 1000)
+
+
+def test_fuzzy_match_is_a_fallback_without_model_factor(calculator):
+    factor, source = calculator.resolve_factor(activity("Beef", "kg", co2e_per_unit="NA"))
+    assert source == "fuzzy" and factor is not None
+    batch = calculator.calculate_batch([activity("Beef", "kg", co2e_per_unit=None)])
+    assert batch["factor_source"].iloc[0] == "fuzzy"
+    assert batch["matched_activity"].iloc[0] == "Beef Burger"
+
+
+def test_same_activity_in_another_category_is_not_trusted(calculator):
+    # "Small" is a motorbike activity in the table; a small car must not take its factor
+    small_car = activity("Small", "km", category="Transport", type_label="Cars (by size)")
+    match = calculator.factor_index.resolve("Transport", "Cars (by size)", "Small", "km")
+    assert match.type == "Motorbike" and not match.exact
+    assert calculator.resolve_factor(small_car) == (MODEL_FACTOR, "model")
+    assert calculator.calculate_batch([small_car])["factor_source"].iloc[0] == "model"
+    motorbike = activity("Small", "km", category="Transport", type_label="Motorbike")
+    assert calculator.resolve_factor(motorbike)[1] == "local"
@@ -0,0 +1,60 @@
+from services.clause_cache import ClauseCache, clause_quantities, normalize_clause, split_clauses
+
+SMALL_CAR = [{"activity": "Small car", "quantity": 5, "unit": "km"}]
+
+
+def test_normalize_clause_ignores_wording_and_spacing():
+    assert normalize_clause("Drove 20km in car") == normalize_clause("drove 20 km in the car")
+    assert normalize_clause("Had a beef burger") == normalize_clause("ate beef burgers")
+
+
+def test_decimals_are_single_tokens():
+    assert normalize_clause("drove 5.5 km in a small car") != normalize_clause("drove 5 km in a small car")
+    assert normalize_clause("drove 1.5 km") != normalize_clause("drove 5.1 km")
+    assert clause_quantities("drove 5.5 km in a small car") == ("5.5 km",)
+
+
+def test_swapped_quantities_differ():
+    assert normalize_clause("2 coffees with 3 croissants") != normalize_clause("3 coffees with 2 croissants")
+    assert clause_quantities("2 coffees with 3 croissants") == ("2 coffee", "3 croissant")
+
+
+def test_decimal_quantity_is_not_a_hit_for_integer_quantity():
+    cache = ClauseCache()
+    cache.add("drove 5 km in a small car", SMALL_CAR)
+    assert cache.lookup("drove 5.5 km in a small car") is None
+    assert cache.lookup("drove 5 km in the small car") == SMALL_CAR
+
+
+def test_swapped_quantities_are_not_near_hits():
+    cache = ClauseCache(threshold=0.0)
+    cache.add("had 2 coffees with 3 croissants", [{"activity": "Coffee Cup", "quantity": 2}])
+    assert cache.lookup("had 3 coffees with 2 croissants") is None
+    assert cache.lookup("had 2 croissants with 3 coffees") is None
+
+
+def test_near_hit_keeps_working_for_same_quantities():
+    cache = ClauseCache()
+    cache.add("had a cappuccino with oat milk", [{"activity": "Coffee Cup"}])
+    assert cache.lookup("had a capuccino with oat milk") == [{"activity": "Coffee Cup"}]
+    assert cache.stats()["near_hits"] == 1
+
+
+def test_quantity_after_a_comma_stays_with_its_activity():
+    assert split_clauses("Drove my car to work, about 20 km, then had a beef burger") == [
+        "Drove my car to work, about 20 km", "had a beef burger"
+    ]
+
+
+def test_fragment_without_activity_joins_the_previous_clause():
+    assert split_clauses("Drove my car to work. About 20 km. Had a coffee") == [
+        "Drove my car to work, About 20 km", "Had a coffee"
+    ]
+
+
+def test_commas_and_and_split_before_an_activity_verb():
+    assert split_clauses("drove 20 km in my car, had a coffee, and ate a banana") == [
+        "drove 20 km in my car", "had a coffee", "ate a banana"
+    ]
+    assert split_clauses("had fish and chips, with a coffee") == ["had fish and chips, with a coffee"]
+    assert split_clauses("0.5 kg potatoes for dinner; drove 20 km") == ["0.5 kg potatoes for dinner", "drove 20 km"]
@@ -0,0 +1,64 @@
+import pytest
+
+from services.fast_path import FastPathExtractor
+
+
+@pytest.fixture(scope="module")
+def fast_path():
+    return FastPathExtractor()
+
+
+@pytest.mark.parametrize("clause, activity, quantity, unit", [
+    ("drove 20 km in a small car", "Small car", 20, "km"),
+    ("used 3 litres of diesel", "Diesel (average biofuel blend)", 3, "litres"),
+    ("had two coffees", "Coffee Cup", 2, "item"),
+    ("0.5 kg potatoes for dinner", "Potato", 0.5, "kg"),
+])
+def test_formulaic_clauses_are_extracted(fast_path, clause, activity, quantity, unit):
+    [record] = fast_path.extract_clause(clause)
+    assert (record["activity"], record["quantity"], record["unit"]) == (activity, quantity, unit)
+
+
+@pytest.mark.parametrize("clause", [
+    "I didn't drive 20 km in my small car",
+    "I did not drive 20 km in my small car",
+    "didnt drive 20 km in my small car",
+    "I didn’t drive 20 km in my small car",
+    "instead of driving 20 km in my small car",
+    "never drove 20 km in a small car",
+    "skipped the 2 coffees",
+    "avoided 3 litres of diesel",
+    "saved 3 litres of diesel",
+    "drove 30 km in an electric car",
+])
+def test_negated_and_avoided_clauses_go_to_the_model(fast_path, clause):
+    assert fast_path.extract_clause(clause) is None
+
+
+@pytest.mark.parametrize("clause", [
+    "ate 200g chicken",
+    "had a croissant and a coffee",
+    "drove 20 km with 2 friends",
+])
+def test_uncovered_clauses_go_to_the_model(fast_path, clause):
+    assert fast_path.extract_clause(clause) is None
+
+
+def test_aliases_resolve_like_the_factor_index(fast_path):
+    index = fast_path.grammar.index
+    for alias, (_, _, activity) in index.aliases.items():
+        unit = next(unit for unit in sorted(index.units) if index.resolve(None, None, activity, unit) is not None)
+        match = index.resolve(None, None, alias, unit)
+        assert match is not None and match.activity == activity, alias
+
+
+@pytest.mark.parametrize("clause, name, unit", [
+    ("used 3 litres of diesel", "diesel", "litres"),
+    ("used 2 litres of petrol", "Petrol", "litres"),
+    ("burned 10 kWh of natural gas", "natural gas", "kWh"),
+    ("rode my small motorbike 6 km", "small motorbike", "km"),
+])
+def test_fast_path_and_index_pick_the_same_factor(fast_path, clause, name, unit):
+    [record] = fast_path.extract_clause(clause)
+    match = fast_path.grammar.index.resolve(None, None, name, unit)
+    assert (match.activity, match.co2e_per_unit) == (record["activity"], record["co2e_per_unit"])
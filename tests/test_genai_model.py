@@ -0,0 +1,352 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from genai_model import (
+    ContextCache, GenAIModel, IncrementalRecordParser, LocalContextCacheClient, LocalUploader, ResponseCache, UploadCache,
+    estimate_tokens, pack_inputs
+)
+from services.clause_cache import ClauseCache
+from services.factor_vocabulary import factor_context
+
+SCHEMA = {"type": "object", "properties": {"emission_record": {"type": "array", "items": {"type": "object"}}}}
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeModel:
+    """Answers every input (whole text or batched input id) with one record naming it."""
+
+    def __init__(self, fail_batches: bool = False):
+        self.prompts = []
+        self.fail_batches = fail_batches
+
+    def generate_content(self, content, generation_config=None):
+        prompt = content[0]
+        self.prompts.append(prompt)
+        tagged = re.findall(r"\[input_id: (\w+)\] (.*)", prompt)
+        if tagged:
+            if self.fail_batches and len(tagged) > 1:
+                raise RuntimeError("batch rejected")
+            results = [{"input_id": input_id, "emission_record": [{"activity": clause}]} for input_id, clause in tagged]
+            return FakeResponse(json.dumps({"results": results}))
+        text = prompt.rsplit("InputText: ", 1)[-1].strip()
+        return FakeResponse(json.dumps({"emission_record": [{"activity": text}]}))
+
+
+def build_model(fake: FakeModel, **kwargs) -> GenAIModel:
+    model = GenAIModel(
+        api_key="offline",
+        upload_cache=UploadCache(uploader=LocalUploader(), index_path=None),
+        response_cache=ResponseCache(max_bytes=0),
+        **kwargs
+    )
+    model.model = fake
+    return model
+
+
+def test_receipt_text_is_extracted_whole():
+    fake = FakeModel()
+    model = build_model(fake, clause_cache=ClauseCache())
+    receipt = "Receipt text:\nFRESH MART\nBeef burger 2.50\nCoffee 1.80\nTOTAL 4.30"
+    model.extract_tasks(receipt, SCHEMA, by_clause=False)
+    assert len(fake.prompts) == 1
+    assert "[input_id:" not in fake.prompts[0] and "TOTAL 4.30" in fake.prompts[0]
+    assert model.clause_cache.stats()["entries"] == 0
+
+
+def test_batched_clauses_are_sent_with_their_description():
+    fake = FakeModel()
+    model = build_model(fake, clause_cache=ClauseCache())
+    text = "Drove my car to work. Had two coffees"
+    records = model.extract_tasks(text, SCHEMA)["emission_record"]
+    assert [record["activity"] for record in records] == ["Drove my car to work", "Had two coffees"]
+    assert len(fake.prompts) == 1 and f"Description: {text}" in fake.prompts[0]
+
+
+def test_clause_without_its_own_quantity_is_not_cached():
+    model = build_model(FakeModel(), clause_cache=ClauseCache())
+    model.extract_tasks("Drove my car to work. Had two coffees", SCHEMA)
+    assert model.clause_cache.lookup("Drove my car to work") is None
+    assert model.clause_cache.lookup("Had two coffees") is not None
+
+
+def test_failed_batch_counts_only_the_calls_that_answered():
+    model = build_model(FakeModel(fail_batches=True), clause_cache=ClauseCache())
+    records = model.extract_tasks("drove 5 km. had two coffees", SCHEMA)["emission_record"]
+    assert len(records) == 2
+    assert model.clause_stats.calls == 2
+
+
+def test_default_context_cache_caches_the_vocabulary_preamble():
+    fake = FakeModel()
+    vocabulary, factor_files = factor_context("vocabulary")
+    cache = ContextCache(client=LocalContextCacheClient(), model_factory=lambda cached_content: fake)
+    model = build_model(FakeModel(), factor_vocabulary=vocabulary, factor_files=factor_files, context_cache=cache)
+    model.extract_tasks("drove 5 km", SCHEMA)
+    model.analyze_emissions("had two coffees", SCHEMA)
+    assert cache.stats()["creates"] == 1 and cache.stats()["skipped"] == 0 and cache.stats()["hits"] == 1
+    assert fake.prompts[0].startswith("Task: extract_tasks\n") and fake.prompts[1].startswith("Task: analyze_emissions\n")
+    # The shared preamble is built once, not on every call
+    assert model._shared_context() is model._shared_context()
+
+
+class SlowContextClient(LocalContextCacheClient):
+    """Blocks creation until released."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def create(self, model, **kwargs):
+        self.release.wait(5)
+        return super().create(model, **kwargs)
+
+
+def test_concurrent_context_gets_share_one_create_made_outside_the_lock():
+    client = SlowContextClient()
+    cache = ContextCache(client=client, model_factory=lambda cached_content: None, min_tokens=0)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        waiting = [pool.submit(cache.get, "m", "preamble", [], []) for _ in range(3)]
+        time.sleep(0.05)
+        # The lock is free while the create is in flight
+        assert cache._lock.acquire(timeout=1)
+        cache._lock.release()
+        client.release.set()
+        handles = {future.result().name for future in waiting}
+    assert len(handles) == 1 and client.create_count == 1
+    assert cache.stats()["creates"] == 1 and cache.stats()["hits"] == 2
+
+
+class SlowUploader(LocalUploader):
+    """Blocks uploads until released, recording how many run at once."""
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def upload_file(self, path, display_name=None):
+        self.release.wait(5)
+        return super().upload_file(path, display_name)
+
+
+def test_concurrent_gets_share_one_upload_made_outside_the_lock(tmp_path):
+    first, second = tmp_path / "a.txt", tmp_path / "b.txt"
+    first.write_text("a")
+    second.write_text("b")
+    uploader = SlowUploader()
+    cache = UploadCache(uploader=uploader, index_path=None)
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        waiting = [pool.submit(cache.get, str(first)) for _ in range(3)]
+        time.sleep(0.05)
+        # The lock is free while the first upload is in flight
+        assert cache._lock.acquire(timeout=1)
+        cache._lock.release()
+        uploader.release.set()
+        handles = {future.result().name for future in waiting}
+        cache.get(str(second))
+    assert len(handles) == 1 and uploader.upload_count == 2
+    assert cache.stats() == {"hits": 2, "misses": 2, "entries": 2}
+
+
+def test_expired_uploads_are_evicted_on_access(tmp_path, monkeypatch):
+    path = tmp_path / "a.txt"
+    path.write_text("a")
+    uploader = LocalUploader()
+    cache = UploadCache(uploader=uploader, index_path=None, ttl_seconds=60)
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now)
+    cache.get(str(path))
+    monkeypatch.setattr(time, "time", lambda: now + 120)
+    cache.get(str(path))
+    assert uploader.upload_count == 2 and cache.stats()["entries"] == 1
+
+
+def test_upload_index_is_merged_and_replaced_atomically(tmp_path):
+    index_path = tmp_path / "upload_index.json"
+    first, second = tmp_path / "a.txt", tmp_path / "b.txt"
+    first.write_text("a")
+    second.write_text("b")
+    uploader = LocalUploader()
+    one = UploadCache(uploader=uploader, index_path=str(index_path))
+    other = UploadCache(uploader=uploader, index_path=str(index_path))
+    one.get(str(first))
+    other.get(str(second))
+    assert len(json.loads(index_path.read_text())) == 2
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+    assert UploadCache(uploader=uploader, index_path=str(index_path)).get(str(first)).name == one.get(str(first)).name
+
+
+class NoResultsModel:
+    """Answers every call, sync or async, with an empty batch result."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def generate_content(self, content, generation_config=None):
+        self.calls += 1
+        return FakeResponse(json.dumps({"results": []}))
+
+    async def generate_content_async(self, content, generation_config=None):
+        return self.generate_content(content, generation_config)
+
+
+def test_clauses_missing_from_a_batch_are_retried_once_each():
+    fake = NoResultsModel()
+    model = build_model(fake, clause_cache=ClauseCache())
+    assert model.extract_tasks("drove 5 km. had two coffees", SCHEMA) == {"emission_record": []}
+    assert fake.calls == 3
+
+
+def test_async_clauses_missing_from_a_batch_are_retried_once_each():
+    fake = NoResultsModel()
+    model = build_model(fake, clause_cache=ClauseCache())
+    assert asyncio.run(model.aextract_tasks("drove 5 km. had two coffees", SCHEMA)) == {"emission_record": []}
+    assert fake.calls == 3
+
+
+def test_lone_clause_is_sent_with_the_plain_schema():
+    fake = FakeModel()
+    model = build_model(fake, clause_cache=ClauseCache())
+    model.extract_tasks("drove 5 km. had two coffees", SCHEMA)
+    records = model.extract_tasks("drove 5 km. had three coffees", SCHEMA)["emission_record"]
+    assert [record["activity"] for record in records][1] == "had three coffees"
+    assert "[input_id:" not in fake.prompts[-1] and "Description: drove 5 km. had three coffees" in fake.prompts[-1]
+
+
+STREAMED = json.dumps({"emission_record": [
+    {"activity": 'said "hi" \\ left', "note": "{not [a] record}"},
+    {"activity": "Bus", "legs": [{"km": 3}]},
+]})
+
+
+def feed_all(parser, chunks):
+    return [record for chunk in chunks for record in parser.feed(chunk)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, len(STREAMED)])
+def test_parser_yields_each_record_once_whatever_the_chunking(size):
+    chunks = [STREAMED[i:i + size] for i in range(0, len(STREAMED), size)]
+    parser = IncrementalRecordParser()
+    assert feed_all(parser, chunks) == json.loads(STREAMED)["emission_record"]
+    assert parser.text == STREAMED
+
+
+def test_parser_keeps_escaped_quotes_and_braces_inside_strings():
+    parser = IncrementalRecordParser()
+    first, second = feed_all(parser, [STREAMED])
+    assert first == {"activity": 'said "hi" \\ left', "note": "{not [a] record}"}
+    assert second["legs"] == [{"km": 3}]
+
+
+def test_parser_holds_back_a_truncated_record():
+    cut = STREAMED.index('{"activity": "Bus"') + 10
+    parser = IncrementalRecordParser()
+    assert feed_all(parser, [STREAMED[:cut]]) == [json.loads(STREAMED)["emission_record"][0]]
+    assert parser.feed("") == []
+
+
+class StreamingModel:
+    """Streams a fixed response in small chunks."""
+
+    def __init__(self, text: str, size: int = 5):
+        self.chunks = [text[i:i + size] for i in range(0, len(text), size)]
+
+    async def generate_content_async(self, content, generation_config=None, stream=False):
+        async def chunks():
+            for chunk in self.chunks:
+                await asyncio.sleep(0)
+                yield FakeResponse(chunk)
+        return chunks()
+
+
+def test_stream_releases_its_concurrency_slot_before_a_slow_consumer_finishes():
+    model = build_model(StreamingModel(STREAMED), max_concurrency=1)
+
+    async def consume():
+        stream = model.astream_records("prompt", SCHEMA)
+        records = [await stream.__anext__()]
+        # The consumer is still on the first record; the model stream has ended
+        await asyncio.sleep(0.05)
+        assert not model._semaphore().locked()
+        records += [record async for record in stream]
+        return records
+
+    assert asyncio.run(consume()) == json.loads(STREAMED)["emission_record"]
+
+
+def test_truncated_stream_raises_and_is_not_cached():
+    model = build_model(StreamingModel(STREAMED[:-10]))
+    model.response_cache = ResponseCache()
+
+    async def consume():
+        return [record async for record in model.astream_records("prompt", SCHEMA)]
+
+    with pytest.raises(Exception, match="Error in content generation"):
+        asyncio.run(consume())
+    assert model.response_cache.stats()["entries"] == 0
+
+
+def test_pack_inputs_fills_chunks_up_to_the_budget_in_order():
+    inputs = {str(i): "x" * 35 for i in range(5)}  # 9 tokens each
+    assert [list(chunk) for chunk in pack_inputs(inputs, token_budget=18)] == [["0", "1"], ["2", "3"], ["4"]]
+    assert [list(chunk) for chunk in pack_inputs(inputs, token_budget=17)] == [[str(i)] for i in range(5)]
+    assert len(pack_inputs(inputs, token_budget=45)) == 1
+
+
+def test_pack_inputs_gives_an_oversized_input_its_own_chunk():
+    inputs = {"a": "x" * 7, "big": "x" * 400, "b": "x" * 7}
+    assert estimate_tokens(inputs["big"]) > 50
+    assert [list(chunk) for chunk in pack_inputs(inputs, token_budget=50)] == [["a"], ["big"], ["b"]]
+    assert pack_inputs({}, token_budget=50) == []
+
+
+class BatchModel:
+    """Answers batches of up to ``max_batch`` inputs and every single input; larger batches fail."""
+
+    def __init__(self, max_batch: int, drop: str = ""):
+        self.max_batch = max_batch
+        self.drop = drop
+        self.batch_sizes = []
+
+    async def generate_content_async(self, content, generation_config=None):
+        prompt = content[0]
+        tagged = re.findall(r"\[input_id: (\w+)\]\n(.*)", prompt)
+        if not tagged:
+            text = prompt.rsplit("Input source_text: ", 1)[-1].strip()
+            self.batch_sizes.append(1)
+            return FakeResponse(json.dumps({"emission_record": [{"activity": text}]}))
+        self.batch_sizes.append(len(tagged))
+        if len(tagged) > self.max_batch:
+            raise RuntimeError("batch too large")
+        results = [{"input_id": input_id, "emission_record": [{"activity": text}]}
+                   for input_id, text in tagged if input_id != self.drop]
+        return FakeResponse(json.dumps({"results": results}))
+
+
+def test_failed_batch_is_split_in_halves_until_it_succeeds():
+    fake = BatchModel(max_batch=2)
+    model = build_model(fake)
+    inputs = {f"i{i}": f"activity {i}" for i in range(8)}
+    records = asyncio.run(model.aanalyze_emissions_batch(inputs, SCHEMA, token_budget=1000))
+    assert records == {input_id: [{"activity": text}] for input_id, text in inputs.items()}
+    # 8 fails, both 4s fail, then four batches of 2 answer
+    assert sorted(fake.batch_sizes, reverse=True) == [8, 4, 4, 2, 2, 2, 2]
+
+
+def test_inputs_missing_from_a_batch_answer_are_retried_alone():
+    fake = BatchModel(max_batch=4, drop="i1")
+    model = build_model(fake)
+    inputs = {f"i{i}": f"activity {i}" for i in range(4)}
+    records = asyncio.run(model.aanalyze_emissions_batch(inputs, SCHEMA, token_budget=1000))
+    assert records["i1"] == [{"activity": "activity 1"}] and list(records) == list(inputs)
+    # 4 misses i1, the half with i1 misses it again, then i1 goes alone
+    assert sorted(fake.batch_sizes, reverse=True) == [4, 2, 2, 1, 1]
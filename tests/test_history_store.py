@@ -0,0 +1,76 @@
+from datetime import date, datetime
+
+import pytest
+
+from services.activity_record import ActivityRecord
+from services.history_store import HistoryStore, analysis_digest
+
+RECORDS = [
+    {"text": "Drove 20 km", "category": "Transport", "quantity": 20, "unit": "km", "co2e": 3.4},
+    {"text": "Had a coffee", "category": "Food", "quantity": 1, "unit": "item", "co2e": 0.2},
+]
+MORNING = datetime(2026, 10, 16, 9).timestamp()
+EVENING = datetime(2026, 10, 16, 21).timestamp()
+NEXT_DAY = datetime(2026, 10, 17, 9).timestamp()
+
+
+def test_same_analysis_is_recorded_once_per_user_and_day():
+    store = HistoryStore(":memory:")
+    digest = analysis_digest(RECORDS)
+    store.record("a", RECORDS, recorded_at=MORNING, digest=digest)
+    store.record("a", RECORDS, recorded_at=EVENING, digest=digest)
+    assert store.count("a") == 2
+    assert store.totals("a", "day", days=None, by_category=False) == [("2026-10-16", 2, 3.6)]
+
+    store.record("a", RECORDS, recorded_at=NEXT_DAY, digest=digest)
+    store.record("b", RECORDS, recorded_at=MORNING, digest=digest)
+    assert store.count("a") == 4 and store.count("b") == 2
+
+
+def test_records_without_a_digest_are_all_kept():
+    store = HistoryStore(":memory:")
+    store.record("a", RECORDS, recorded_at=MORNING)
+    store.record("a", RECORDS, recorded_at=EVENING)
+    assert store.count("a") == 4
+
+
+def test_digest_changes_with_the_activities():
+    changed = [dict(RECORDS[0], quantity=25, co2e=4.25), RECORDS[1]]
+    assert analysis_digest(RECORDS) == analysis_digest([dict(record) for record in RECORDS])
+    assert analysis_digest(RECORDS) != analysis_digest(changed)
+
+
+def test_activity_records_are_stored_like_dicts():
+    records = [ActivityRecord.from_dict(record) for record in RECORDS]
+    assert analysis_digest(records) == analysis_digest(RECORDS)
+    store = HistoryStore(":memory:")
+    store.record("a", records, recorded_at=MORNING, digest=analysis_digest(records))
+    store.record("a", RECORDS, recorded_at=EVENING, digest=analysis_digest(RECORDS))
+    assert store.totals("a", "day", days=None, by_category=False) == [("2026-10-16", 2, 3.6)]
+
+
+def test_trend_merges_categories_and_fills_empty_periods():
+    store = HistoryStore(":memory:")
+    store.record("a", RECORDS, recorded_at=MORNING)
+    store.record("a", RECORDS[:1], recorded_at=datetime(2026, 10, 1, 9).timestamp())
+    points = store.trend("a", "week", periods=4, today=date(2026, 10, 17))
+    assert [point.period_start for point in points] == ["2026-09-21", "2026-09-28", "2026-10-05", "2026-10-12"]
+    assert [point.stats.count for point in points] == [0, 1, 0, 2]
+    assert points[0].stats.as_dict()["max"] == 0.0
+    week = points[-1].stats
+    assert week.total == pytest.approx(3.6) and week.minimum == 0.2 and week.maximum == 3.4
+    assert all(point.category is None for point in points)
+
+
+def test_trend_by_category_and_for_one_category():
+    store = HistoryStore(":memory:")
+    store.record("a", RECORDS, recorded_at=MORNING)
+    store.record("b", RECORDS, recorded_at=MORNING)
+    by_category = store.trend("a", "month", periods=2, by_category=True, today=date(2026, 10, 17))
+    assert [(point.period_start, point.category, point.stats.total) for point in by_category] == [
+        ("2026-10-01", "Food", pytest.approx(0.2)), ("2026-10-01", "Transport", pytest.approx(3.4)),
+    ]
+    food = store.trend("a", "day", periods=2, category="Food", today=date(2026, 10, 17))
+    assert [(point.period_start, point.stats.count) for point in food] == [("2026-10-16", 1), ("2026-10-17", 0)]
+    with pytest.raises(ValueError):
+        store.trend("a", "year")
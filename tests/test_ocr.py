@@ -0,0 +1,38 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import api
+# The module the API uses, so OCRPoolFull is the class it catches
+from app.services.ocr import OCRPool, OCRPoolFull
+
+
+@pytest.fixture
+def pool():
+    pool = OCRPool(workers=1, max_pending=1)
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_rejects_images_beyond_max_pending(pool):
+    async def saturate():
+        in_flight = asyncio.create_task(pool.run(b"not an image"))
+        await asyncio.sleep(0)
+        assert pool.pending == 1
+        with pytest.raises(OCRPoolFull):
+            await pool.run(b"not an image")
+        # The rejected image did not take a slot, and the finished one gives its slot back
+        with pytest.raises(RuntimeError):
+            await in_flight
+        return pool.pending
+
+    assert asyncio.run(saturate()) == 0
+
+
+def test_receipt_is_answered_503_while_the_pool_is_full(pool, monkeypatch):
+    monkeypatch.setattr(api.app.state, "ocr_pool", pool, raising=False)
+    pool.pending = pool.max_pending
+    response = TestClient(api.app).post("/analyze/receipt", files={"file": ("receipt.png", b"png", "image/png")})
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
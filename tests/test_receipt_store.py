@@ -0,0 +1,39 @@
+import os
+
+from services.receipt_store import ReceiptStore
+
+RESULT = [{"activity": "Coffee", "quantity": 2, "unit": "cup"}]
+
+
+def test_receipt_and_result_round_trip(tmp_path):
+    store = ReceiptStore(root=str(tmp_path))
+    digest, path = store.put(b"receipt bytes", ".JPG")
+    assert path == os.path.join(str(tmp_path), digest + ".jpg")
+    with open(path, "rb") as f:
+        assert f.read() == b"receipt bytes"
+    assert store.get_result(digest) is None
+    store.put_result(digest, RESULT)
+    assert ReceiptStore(root=str(tmp_path)).get_result(digest) == RESULT
+
+
+def test_identical_uploads_are_stored_once(tmp_path):
+    store = ReceiptStore(root=str(tmp_path))
+    first = store.put(b"same receipt", ".png")
+    second = store.put(b"same receipt", ".png")
+    other = store.put(b"other receipt", ".png")
+    assert first == second and other[0] != first[0]
+    assert sorted(os.listdir(tmp_path)) == sorted([os.path.basename(first[1]), os.path.basename(other[1])])
+
+
+def test_least_recently_used_receipts_are_evicted_with_their_results(tmp_path):
+    store = ReceiptStore(root=str(tmp_path), max_bytes=20)
+    old, _ = store.put(b"x" * 10)
+    recent, _ = store.put(b"y" * 10)
+    store.put_result(old, RESULT)
+    store.put_result(recent, RESULT)
+    os.utime(os.path.join(str(tmp_path), old), (1, 1))
+    os.utime(os.path.join(str(tmp_path), recent), (2, 2))
+    newest, _ = store.put(b"z" * 10)
+    assert store.get_result(old) is None and not os.path.exists(os.path.join(str(tmp_path), old))
+    assert store.get_result(recent) == RESULT
+    assert os.path.exists(os.path.join(str(tmp_path), newest))
@@ -0,0 +1,64 @@
+import json
+
+from genai_model import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def payload_bytes(result):
+    return len(json.dumps(result))
+
+
+def test_lru_evicts_the_least_recently_used_response():
+    result = {"emission_record": ["x"]}
+    cache = ResponseCache(max_bytes=2 * payload_bytes(result))
+    cache.put("a", result)
+    cache.put("b", result)
+    assert cache.get("a") == result  # "b" is now the oldest
+    cache.put("c", result)
+    assert cache.get("b") is None
+    assert cache.get("a") == result and cache.get("c") == result
+    assert cache.stats()["entries"] == 2 and cache.stats()["bytes"] == 2 * payload_bytes(result)
+
+
+def test_response_larger_than_the_memory_tier_is_not_kept():
+    cache = ResponseCache(max_bytes=10)
+    cache.put("a", {"emission_record": ["too large"]})
+    assert cache.get("a") is None and cache.stats()["bytes"] == 0
+
+
+def test_responses_expire_after_the_ttl_in_both_tiers(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "responses.sqlite3")
+    cache = ResponseCache(sqlite_path=path, ttl_seconds=60, clock=clock)
+    cache.put("a", {"emission_record": []})
+    clock.now += 59
+    assert cache.get("a") == {"emission_record": []}
+    clock.now += 1
+    assert cache.get("a") is None
+    assert ResponseCache(sqlite_path=path, ttl_seconds=60, clock=clock).get("a") is None
+
+
+def test_sqlite_tier_persists_across_instances(tmp_path):
+    path = str(tmp_path / "responses.sqlite3")
+    ResponseCache(sqlite_path=path).put("a", {"emission_record": [{"activity": "Bus"}]})
+    restarted = ResponseCache(sqlite_path=path)
+    assert restarted.stats()["entries"] == 0
+    assert restarted.get("a") == {"emission_record": [{"activity": "Bus"}]}
+    assert restarted.stats() == {"hits": 1, "misses": 0, "entries": 1,
+                                 "bytes": payload_bytes({"emission_record": [{"activity": "Bus"}]})}
+    restarted.clear()
+    assert ResponseCache(sqlite_path=path).get("a") is None
+
+
+def test_callers_get_a_private_copy():
+    cache = ResponseCache()
+    cache.put("a", {"emission_record": []})
+    cache.get("a")["emission_record"].append("changed")
+    assert cache.get("a") == {"emission_record": []}
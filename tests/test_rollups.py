@@ -0,0 +1,53 @@
+import math
+import statistics
+from datetime import date
+
+import pytest
+
+from services.rollups import RollupAggregator, RunningStats, period_start, shift_period
+
+
+@pytest.mark.parametrize("period, start", [("day", "2026-10-15"), ("week", "2026-10-12"), ("month", "2026-10-01")])
+def test_period_start(period, start):
+    assert period_start(date(2026, 10, 15), period) == start
+
+
+def test_shift_period_crosses_year_boundaries():
+    assert shift_period(date(2026, 1, 1), "month", -1) == date(2025, 12, 1)
+    assert shift_period(date(2026, 11, 1), "month", 14) == date(2028, 1, 1)
+    assert shift_period(date(2026, 10, 12), "week", -2) == date(2026, 9, 28)
+    with pytest.raises(ValueError):
+        shift_period(date(2026, 10, 12), "year", 1)
+
+
+def test_running_stats_match_the_values_and_merge():
+    values = [3.4, 0.2, 5.0, 1.1]
+    left, right = RunningStats(), RunningStats()
+    for value in values[:2]:
+        left.add(value)
+    for value in values[2:]:
+        right.add(value)
+    left.merge(right)
+    assert left.as_dict() == pytest.approx({
+        "count": 4, "total": sum(values), "mean": statistics.mean(values),
+        "min": 0.2, "max": 5.0, "std": statistics.pstdev(values),
+    })
+
+
+def test_empty_stats_report_zeros():
+    empty = RunningStats()
+    empty.merge(RunningStats())
+    assert empty.as_dict() == {"count": 0, "total": 0.0, "mean": 0.0, "min": 0.0, "max": 0.0, "std": 0.0}
+    assert empty.minimum == math.inf
+
+
+def test_aggregator_keeps_one_stats_per_period_and_category():
+    aggregator = RollupAggregator()
+    aggregator.add(date(2026, 10, 15), "Food", 1.0)
+    aggregator.add(date(2026, 10, 16), "Food", 2.0)
+    aggregator.add(date(2026, 10, 16), "Transport", 4.0)
+    stats = dict(aggregator)
+    # Three (day, category) keys, then one week and one month per category
+    assert len(aggregator) == 3 + 2 + 2
+    assert stats[("week", "2026-10-12", "Food")].total == 3.0
+    assert stats[("month", "2026-10-01", "Transport")].count == 1
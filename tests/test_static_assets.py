@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from static_assets import SCOPED_STYLESHEETS, AssetBundle, scope_css, scope_marker
+
+
+def test_scoped_rules_only_match_under_their_marker():
+    css = """/* buttons */
+.stButton > button, .card:not(.a, .b) { color: red; }
+html { scroll-behavior: smooth; }
+.stApp > header { display: none; }
+@keyframes pulse { from { opacity: 0; } to { opacity: 1; } }
+@media (max-width: 768px) { .card { padding: 0; } }
+"""
+    scoped = scope_css(css, "ecomate-x")
+    assert ".stApp:has(.ecomate-x) .stButton > button, .stApp:has(.ecomate-x) .card:not(.a, .b) { color: red; }" in scoped
+    assert "html:has(.ecomate-x) {" in scoped
+    assert ".stApp:has(.ecomate-x) > header {" in scoped
+    assert "@keyframes pulse { from { opacity: 0; } to { opacity: 1; } }" in scoped
+    assert "@media (max-width: 768px) {\n.stApp:has(.ecomate-x) .card { padding: 0; }" in scoped
+    assert "buttons" not in scoped
+
+
+def test_bundle_is_one_versioned_file(tmp_path):
+    bundle = AssetBundle(static_dir=str(tmp_path), base_url="http://assets.example/static/")
+    manifest = bundle.build()
+    files = sorted(name for name in os.listdir(tmp_path) if name.endswith(".css"))
+    assert files == [manifest["ecomate"]]
+    assert bundle.tag() == f'<link rel="stylesheet" href="http://assets.example/static/{files[0]}">'
+    assert all(f".{scope_marker(name)})" in bundle.css for name in SCOPED_STYLESHEETS)
+    assert bundle.stylesheet("results") == '<span class="ecomate-results"></span>'
+    with pytest.raises(KeyError):
+        bundle.stylesheet("global")
+    # The summary card renders in an iframe, so it carries its own rules
+    assert ".summary-box" not in bundle.css
+    assert bundle.embedded("summary").startswith("<style>\n") and "var(--summary-bg)" in bundle.embedded("summary")
+
+
+def test_bundle_is_inlined_without_a_base_url(tmp_path):
+    bundle = AssetBundle(static_dir=str(tmp_path))
+    bundle.build()
+    assert bundle.tag().startswith("<style>\n/* global */")
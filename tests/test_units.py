@@ -0,0 +1,35 @@
+import pytest
+
+from services.carbon_service import EMISSION_FACTOR_PATH
+from services.emission_factors import EmissionFactorIndex
+from services.units import UnitConverter
+
+DIESEL = {"diesel": {"litres": 2.5, "tonnes": 3000.0}}
+
+
+def test_units_convert_to_the_unit_with_a_factor():
+    converter = UnitConverter(DIESEL)
+    gallons = converter.convert("diesel", "us gallon")
+    assert gallons.target_unit == "litres" and gallons.multiplier == pytest.approx(3.785411784)
+    # Pounds reach tonnes through the mass base unit: lb -> kg -> tonnes
+    pounds = converter.convert("diesel", "lbs")
+    assert pounds.target_unit == "tonnes" and pounds.multiplier == pytest.approx(0.45359237 / 1000)
+    assert converter.convert("diesel", "litres") == ("litres", 1.0)
+
+
+def test_incompatible_and_unknown_units_have_no_conversion():
+    converter = UnitConverter(DIESEL)
+    assert converter.convert("diesel", "km") is None
+    assert converter.convert("diesel", "kwh") is None
+    assert converter.convert("diesel", "furlongs") is None
+    assert converter.convert("petrol", "litres") is None
+
+
+def test_index_prices_a_converted_unit_and_rejects_an_incompatible_one():
+    index = EmissionFactorIndex.from_csv(EMISSION_FACTOR_PATH)
+    per_kg = index.resolve("Food", "Non-vegetarian", "Beef Burger", "kg")
+    per_lb = index.resolve("Food", "Non-vegetarian", "Beef Burger", "pounds")
+    assert per_lb.unit == "kg" and per_lb.conversion == pytest.approx(0.45359237)
+    assert per_lb.co2e_per_unit == pytest.approx(per_kg.co2e_per_unit * 0.45359237)
+    assert not per_lb.exact
+    assert index.resolve("Food", "Non-vegetarian", "Beef Burger", "km") is None